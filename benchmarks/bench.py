@@ -0,0 +1,294 @@
+"""bench - End-to-end benchmark of the fetch, parse, build, load, diff,
+persist and restore stages, for every resource type and page size.
+
+Usage:
+python benchmarks/bench.py [--scales 10,100,1000,10000,100000]
+	[--resources grades,events,...] [--repeat 5] [--budget 30]
+	[--output benchmarks/results/NAME.json]
+
+Every stage is run repeat times and reports records/s (at the median),
+p50/p99 of the run durations and the peak memory of a separate, traced
+run. Once a stage takes longer than budget seconds, larger scales of that
+resource are skipped. Results are saved as JSON, to compare versions.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import librus  # noqa: E402
+import librus_replay  # noqa: E402
+import librus_synthetic  # noqa: E402
+
+GENERATOR = librus_synthetic.PageGenerator(seed=0)
+
+
+def parse_grades(parser, html):
+	return [parser.parse_grade(grade) for grade in parser.parse_html_grade(html)[1:]]
+
+
+def parse_events(parser, html):
+	return parser.parse_events(parser.parse_html_table(html), html)
+
+
+def parse_announcements(parser, html):
+	return [
+		parser.parse_announcements(str(announcement))
+		for announcement in parser.parse_html_announcements(html)
+	]
+
+
+def parse_attendance(parser, html):
+	return parser.parse_attendance(html)
+
+
+def parse_timetable(parser, html):
+	return [parser.parse_timetable(html)]
+
+
+def load_timetable(items):
+	timetable = librus.Timetable()
+	timetable.update(items)
+	return timetable
+
+
+def load_items(collection_class):
+	def load(items):
+		collection = collection_class()
+		for item in items:
+			collection.add(item)
+		return collection
+	return load
+
+
+def diff_grades(collection, old):
+	collection.old_grades = old
+	return collection.compare_old_grades()
+
+
+def diff_events(collection, old):
+	collection.old_events = old
+	return collection.compare_old_events()
+
+
+def diff_announcements(collection, old):
+	collection.old_announcements = old
+	return collection.compare_old_announcements()
+
+
+def diff_attendance(collection, old):
+	collection.old_attendance = old
+	return collection.compare_old_attendance()
+
+
+RESOURCES = {
+	'grades': {
+		'page': GENERATOR.grades_page, 'fetch': lambda f: f.fetch_grades('l', 'p'),
+		'method': 'GET', 'path': '/przegladaj_oceny/uczen', 'params': {},
+		'parse': parse_grades, 'build': librus.Grade,
+		'load': load_items(librus.GradeBook), 'diff': diff_grades
+	},
+	'events': {
+		'page': GENERATOR.events_page,
+		'fetch': lambda f: f.fetch_events('l', 'p', '3', '2016'),
+		'method': 'POST', 'path': '/terminarz', 'params': {'miesiac': '3', 'rok': '2016'},
+		'parse': parse_events, 'build': librus.Event,
+		'load': load_items(librus.EventCalendar), 'diff': diff_events
+	},
+	'announcements': {
+		'page': GENERATOR.announcements_page,
+		'fetch': lambda f: f.fetch_announcements('l', 'p'),
+		'method': 'GET', 'path': '/ogloszenia', 'params': {},
+		'parse': parse_announcements, 'build': librus.Announcement,
+		'load': load_items(librus.AnnouncementBoard), 'diff': diff_announcements
+	},
+	'attendance': {
+		'page': GENERATOR.attendance_page, 'fetch': lambda f: f.fetch_attendance('l', 'p'),
+		'method': 'GET', 'path': '/przegladaj_nb/uczen', 'params': {},
+		'parse': parse_attendance, 'build': librus.Attendance,
+		'load': load_items(librus.AttendanceTable), 'diff': diff_attendance
+	},
+	'timetable': {
+		'page': lambda n: GENERATOR.timetable_page(n, 0.05, 0.05, 0.05),
+		'fetch': lambda f: f.fetch_timetable('l', 'p'),
+		'method': 'GET', 'path': '/przegladaj_plan_lekcji', 'params': {},
+		'parse': parse_timetable, 'build': None,
+		'load': load_timetable, 'diff': None
+	}
+}
+
+
+def measure(function, repeat, budget):
+	"""measure(function, repeat, budget) - Runs function repeat times, then
+		once more under tracemalloc. Repeating stops, and the traced run is
+		skipped, once the runs took over budget seconds.
+		Returns (durations, peak bytes or None, last result).
+	"""
+	durations = []
+	result = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = function()
+		durations.append(time.perf_counter() - start)
+		if sum(durations) > budget:
+			return durations, None, result
+	tracemalloc.start()
+	function()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return durations, peak, result
+
+
+def percentile(values, fraction):
+	"""percentile(values, fraction) - Returns the nearest-rank percentile."""
+	values = sorted(values)
+	return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def bench_resource(name, scale, repeat, budget, directory):
+	"""bench_resource(name, scale, repeat, budget, directory) - Benchmarks every
+		stage of a resource at a scale. Returns a list of result dictionaries.
+	"""
+	resource = RESOURCES[name]
+	html = resource['page'](scale)
+	fixtures = os.path.join(directory, name + '_' + str(scale))
+	store = librus_replay.FixtureStore(fixtures)
+	store.add(
+		resource['method'], resource['path'], resource['params'],
+		200, 'text/html; charset=UTF-8', html
+	)
+	server = librus_replay.ReplayServer(fixtures)
+	server.start()
+	fetcher = server.point(librus.LibrusFetcher())
+	parser = librus.Parser()
+	file_handler = librus.FileHandler()
+	file_handler.directory = directory
+	filename = name + '.records'
+
+	state = {}
+
+	def build():
+		if resource['build'] is None:
+			return state['values']
+		return [resource['build'](values) for values in state['values']]
+
+	def diff():
+		return resource['diff'](state['collection'], state['old'])
+
+	stages = [
+		('fetch', lambda: resource['fetch'](fetcher)),
+		('parse', lambda: resource['parse'](parser, html)),
+		('build', build),
+		('load', lambda: resource['load'](state['items'])),
+		('diff', diff),
+		('persist', lambda: file_handler.collection_to_file(state['collection'], filename)),
+		('restore', lambda: file_handler.file_to_collection(filename))
+	]
+	results = []
+	try:
+		for stage, function in stages:
+			if stage == 'diff':
+				if resource['diff'] is None:
+					continue
+				state['old'] = resource['load'](state['items'][:len(state['items']) * 9 // 10])
+			durations, peak, result = measure(function, repeat, budget)
+			if stage == 'parse':
+				state['values'] = result
+			elif stage == 'build':
+				state['items'] = result
+			elif stage == 'load':
+				state['collection'] = result
+			if resource['build'] is None:
+				records = scale  # the timetable is a single value
+			else:
+				records = len(state.get('values', ())) or scale
+			median = statistics.median(durations)
+			results.append({
+				'resource': name, 'stage': stage, 'scale': scale, 'records': records,
+				'repeat': len(durations), 'median_s': median,
+				'p50_s': percentile(durations, 0.5), 'p99_s': percentile(durations, 0.99),
+				'records_per_s': records / median if median else None,
+				'peak_memory_bytes': peak
+			})
+	finally:
+		server.stop()
+	return results
+
+
+def git_revision():
+	"""git_revision() - Returns the current git revision, or None."""
+	try:
+		return subprocess.run(
+			['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+			capture_output=True, text=True, check=True
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def main():
+	argument_parser = argparse.ArgumentParser(description=__doc__)
+	argument_parser.add_argument('--scales', default='10,100,1000,10000,100000')
+	argument_parser.add_argument('--resources', default=','.join(RESOURCES))
+	argument_parser.add_argument('--repeat', type=int, default=5)
+	argument_parser.add_argument('--budget', type=float, default=30.0)
+	argument_parser.add_argument('--output')
+	arguments = argument_parser.parse_args()
+
+	scales = [int(scale) for scale in arguments.scales.split(',')]
+	results = []
+	skipped = []
+	with tempfile.TemporaryDirectory() as directory:
+		for name in arguments.resources.split(','):
+			for scale in scales:
+				resource_results = bench_resource(
+					name, scale, arguments.repeat, arguments.budget, directory
+				)
+				results.extend(resource_results)
+				for result in resource_results:
+					peak = result['peak_memory_bytes']
+					print((
+						"%-13s %-8s %7d records  p50 %10.4fs  p99 %10.4fs"
+						"  %12.0f rec/s  peak %s"
+					) % (
+						result['resource'], result['stage'], result['records'],
+						result['p50_s'], result['p99_s'], result['records_per_s'] or 0,
+						"%.1f KiB" % (peak / 1024) if peak is not None else "-"
+					))
+				slowest = max(result['median_s'] for result in resource_results)
+				if slowest > arguments.budget:
+					larger = [larger_scale for larger_scale in scales if larger_scale > scale]
+					skipped.extend({'resource': name, 'scale': s} for s in larger)
+					if larger:
+						print("%-13s skipping scales %s, over the budget" % (name, larger))
+					break
+
+	output = arguments.output or os.path.join(
+		ROOT, 'benchmarks', 'results',
+		time.strftime("%Y_%m_%d_%H_%M_%S", time.gmtime()) + '.json'
+	)
+	if os.path.dirname(output):
+		os.makedirs(os.path.dirname(output), exist_ok=True)
+	with open(output, 'w', encoding='utf8') as output_file:
+		json.dump({
+			'revision': git_revision(),
+			'python': platform.python_version(),
+			'platform': platform.platform(),
+			'created': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+			'results': results,
+			'skipped': skipped
+		}, output_file, indent='\t')
+	print("Saved results to " + output)
+
+
+if __name__ == '__main__':
+	main()
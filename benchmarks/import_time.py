@@ -0,0 +1,96 @@
+"""import_time - Benchmarks the import of librus and checks that importing it,
+or reading cached grades, doesn't load the HTTP and HTML stacks.
+
+Usage:
+python benchmarks/import_time.py [--runs N] [--budget-ms MS]
+
+Exits with 1 if a heavy module got loaded or the median import time
+is over the budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('bs4', 'texttable', 'requests', 'urllib3')
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import librus
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(','.join(m for m in %r if m in sys.modules))
+""" % (HEAVY_MODULES,)
+
+CACHE_SCRIPT = """
+import sys, os
+import librus
+os.chdir(%r)
+lib = librus.Librus()
+lib.file_handler.collection_to_file(lib.grade_book, 'grades.pickle')
+lib.refresh_grades('cache')
+print(','.join(m for m in %r if m in sys.modules))
+"""
+
+
+def run_script(script):
+	"""run_script(script) - Runs a script in a fresh interpreter,
+		with librus importable. Returns the lines it printed.
+
+	Parameters:
+	script (string) - the code to run.
+	"""
+	env = dict(os.environ)
+	env.pop('PYTHONDONTWRITEBYTECODE', None)  # measure a warm import
+	env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+	output = subprocess.run(
+		[sys.executable, '-c', script], env=env, cwd=ROOT,
+		capture_output=True, text=True, check=True
+	).stdout
+	return output.splitlines()
+
+
+def main():
+	argument_parser = argparse.ArgumentParser(description=__doc__)
+	argument_parser.add_argument('--runs', type=int, default=10)
+	argument_parser.add_argument('--budget-ms', type=float, default=30.0)
+	arguments = argument_parser.parse_args()
+
+	run_script('import librus')  # writes the bytecode cache
+	timings = []
+	loaded = set()
+	for _ in range(arguments.runs):
+		lines = run_script(IMPORT_SCRIPT)
+		timings.append(float(lines[0]) * 1000)
+		loaded.update(module for module in lines[1].split(',') if module)
+
+	with tempfile.TemporaryDirectory() as directory:
+		lines = run_script(CACHE_SCRIPT % (directory, HEAVY_MODULES))
+	loaded_by_cache = set(module for module in lines[0].split(',') if module)
+
+	median = statistics.median(timings)
+	print("import librus: median %.2f ms, min %.2f ms, max %.2f ms (%d runs)" % (
+		median, min(timings), max(timings), arguments.runs
+	))
+	print("Heavy modules loaded by import: " + (', '.join(sorted(loaded)) or "none"))
+	print(
+		"Heavy modules loaded by a cache-only grades read: " +
+		(', '.join(sorted(loaded_by_cache)) or "none")
+	)
+
+	failed = False
+	if loaded or loaded_by_cache:
+		print("FAIL - heavy modules are loaded eagerly.")
+		failed = True
+	if median > arguments.budget_ms:
+		print("FAIL - import is over the budget of %.2f ms." % arguments.budget_ms)
+		failed = True
+	return 1 if failed else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -1,8 +1,20 @@
-from bs4 import BeautifulSoup
-from texttable import Texttable
+import collections
+import json
+import os
 import pickle
-import requests
+import struct
+import sys
+import threading
 import time
+import urllib.parse
+
+
+def _hash_fields(*fields):
+	"""Returns a 128-bit blake2b hash of the fields, as hex."""
+	import hashlib
+	return hashlib.blake2b(
+		"\0".join(str(field) for field in fields).encode('utf8'), digest_size=16
+	).hexdigest()
 
 
 class GradeBook:
@@ -21,6 +33,10 @@ class GradeBook:
 		{subject:[grades]}
 	old_grades (GradeBook) - The GradeBook used on last launch.
 		Set upon calling update_old_grades().
+	row_fingerprints (dictionary) - identities (see Grade.identity) of the
+		grades parsed from every subject row of the grades page, by the
+		row's fingerprint. Lets unchanged rows be reused instead of parsed
+		again. {fingerprint:[identity]}
 	librus (Librus) - Reference to the parent Librus object.
 		Set in Librus object during init.
 
@@ -35,6 +51,8 @@ class GradeBook:
 	update_old_grades() - Update old_grades with grades from last launch.
 	compare_old_grades() - Compare old_grades with grades, returns new ones.
 		Returns a GradeBook object.
+	diff_old_grades() - Compare old_grades with grades by their IDs,
+		returns the added, removed and modified ones.
 	"""
 	def __init__(self):
 		"""Initializes the GradeBook by initializing variables."""
@@ -46,6 +64,7 @@ class GradeBook:
 		self.subject_grades = {}
 		self.midterm_grades = {}
 		self.old_grades = None
+		self.row_fingerprints = {}
 		self.librus = None
 
 	def add(self, grade):
@@ -80,11 +99,7 @@ class GradeBook:
 		from last launch.
 		"""
 		filename = 'grades.pickle'
-		temp_old_grades = self.librus.file_handler.file_to_class(filename)
-		self.old_grades = GradeBook()
-		for grade in temp_old_grades.grades:
-			self.old_grades.add(grade)
-
+		self.old_grades = self.librus.file_handler.file_to_collection(filename)
 		self.old_grades.sort_by_date()
 
 	def compare_old_grades(self):
@@ -96,10 +111,38 @@ class GradeBook:
 			if str(grade.grade_id) not in self.old_grades.grades_id:
 				temp_gradebook.add(grade)
 			elif str(grade.date) not in self.old_grades.dates:
-				temp_grade_book.add(grade)
+				temp_gradebook.add(grade)
 
 		return temp_gradebook
 
+	def diff_old_grades(self):
+		"""diff_old_grades() - Compares old_grades with grades by their
+		identities (see Grade.identity), in a single pass. Returns the added
+		grades, the removed grades (GradeBook objects) and a list of
+		GradeChange objects of the grades whose fields were modified.
+		"""
+		old_grades = dict((grade.identity(), grade) for grade in self.old_grades.grades)
+		added_grade_book = GradeBook()
+		removed_grade_book = GradeBook()
+		modified_grades = []
+		for grade in self.grades:
+			old_grade = old_grades.pop(grade.identity(), None)
+			if old_grade is None:
+				added_grade_book.add(grade)
+				continue
+			changes = {}
+			for field in GradeChange.fields:
+				old_value = getattr(old_grade, field)
+				new_value = getattr(grade, field)
+				if str(old_value) != str(new_value):  # restored values may be ints
+					changes[field] = (old_value, new_value)
+			if changes:
+				modified_grades.append(GradeChange(grade, old_grade, changes))
+		for old_grade in old_grades.values():
+			removed_grade_book.add(old_grade)
+
+		return added_grade_book, removed_grade_book, modified_grades
+
 	def display(self):
 		"""display() - Return the grades from the GradeBook,
 		allowing to display them.
@@ -164,21 +207,72 @@ class GradeBook:
 		return float(temp_sum/temp_count)
 
 
+class GradeChange:
+	"""GradeChange - A modified grade found by comparing grade books.
+
+	Variables:
+	fields (tuple) - the compared fields of Grade. (class)
+	grade (Grade) - the grade as it is now.
+	old_grade (Grade) - the grade as it was.
+	changes (dictionary) - the modified fields. {field:(old, new)}
+
+	Functions:
+	display() - Returns a text representation of the change,
+		which can be used for display.
+	"""
+	__slots__ = ('grade', 'old_grade', 'changes')
+	fields = (
+		'grade_value', 'weight', 'category', 'calculate_towards_avg_grade',
+		'grade_numtype', 'grade_type', 'school_subject', 'date', 'teacher',
+		'added', 'description'
+	)
+
+	def __init__(self, grade, old_grade, changes):
+		"""__init__(grade, old_grade, changes) - Initializing method."""
+		self.grade = grade
+		self.old_grade = old_grade
+		self.changes = changes
+
+	def display(self):
+		"""display() - Returns a text representation of the change,
+		which can be used for display.
+		"""
+		display_string = "[" + str(self.grade.date) + "] - <"
+		display_string += str(self.grade.school_subject) + "> zmiana oceny, id w Librusie: "
+		display_string += str(self.grade.grade_id) + ": "
+		display_string += ", ".join(
+			field + " " + str(old) + " -> " + str(new)
+			for field, (old, new) in self.changes.items()
+		)
+		display_string += "\n"
+		return display_string
+
+
 class EventCalendar:
 	"""EventCalendar - Stores events. Allows displaying all of them at once.
 
 	Variables:
 	events (list) - The list of events.
-	events_id (list) - The list of events' IDs.
-	events_date (list) - The list of events' dates.
-	events_day_date (list) - The list of events' day_dates, which are
+	events_id (set) - The set of events' IDs.
+	events_date (set) - The set of events' dates.
+	events_day_date (set) - The set of canceled lessons' day_dates, which are
 		in a <lesson>_<day> format. Spaghetti.
+	events_by_numtype (dictionary) - Events of every type. {numtype:[events]}
+	events_by_date (dictionary) - Events of every day. {YYYY-MM-DD:[events]}
+	events_by_teacher (dictionary) - Events of every teacher. {teacher:[events]}
+	search_index (SearchIndex) - full-text index of the descriptions.
+	search_terms (dictionary) - state of the search_index, stored with
+		the calendar.
 	old_events (EventCalendar) - The EventCalendar used on last launch.
 	librus (Librus) - Reference to the parent Librus object.
 		Set in Librus object during init.
 
 	Functions:
 	add(event) - Add an event into the EventCalendar.
+	find(numtypes, start, end, teacher) - Returns the events matching
+		all of the given conditions, using the indexes.
+	search(query, limit) - Returns the events matching the query,
+		the best first.
 	display() - Return the events from the EventCalendar,
 		allowing to display them.
 	update_old_events(month, year) - Update the old_events with ones
@@ -190,11 +284,28 @@ class EventCalendar:
 	def __init__(self):
 		"""Initializes the EventCalendar by initializing variables."""
 		self.events = []
-		self.events_id = []
-		self.events_date = []
-		self.events_day_date = []  # selling spaghetti
+		self.events_id = set()
+		self.events_date = set()
+		self.events_day_date = set()  # selling spaghetti
+		self.events_by_numtype = {}
+		self.events_by_date = {}
+		self.events_by_teacher = {}
+		self.search_index = SearchIndex()
 		self.old_events = None
 		self.librus = None
+		self._sorted_dates = None
+
+	@property
+	def search_terms(self):
+		"""search_terms - the state of the search_index, saved with the
+		collection by RecordCodec so it needn't be rebuilt on restore.
+		"""
+		return self.search_index.state()
+
+	@search_terms.setter
+	def search_terms(self, state):
+		"""Loads a saved state into the search_index."""
+		self.search_index.load(state)
 
 	def add(self, event):
 		"""add(event) - Add an event into the EventCalendar.
@@ -203,14 +314,97 @@ class EventCalendar:
 		event - a Event() object.
 		"""
 		self.events.append(event)
-		if event[10] not in self.events_id:  # id
-			self.events_id.append(event[10])
-		if event[1] not in self.events_date:  # day
-			self.events_date.append(event[1])
+		self.events_id.add(event[10])  # id
+		self.events_date.add(event[1])  # day
 		if event[8] == 7:  # canceled lessons
-			day_date = str(event[1])+"_"+str(event[4])  # lesson_day
-			if day_date not in self.events_day_date:
-				self.events_day_date.append(day_date)
+			self.events_day_date.add(str(event[1])+"_"+str(event[4]))  # lesson_day
+
+		self.events_by_numtype.setdefault(event.event_numtype, []).append(event)
+		self.events_by_teacher.setdefault(event.teacher, []).append(event)
+		event_date = event.event_date()
+		if event_date not in self.events_by_date:
+			self.events_by_date[event_date] = []
+			self._sorted_dates = None
+		self.events_by_date[event_date].append(event)
+		self.search_index.add(
+			self._search_key(event), event,
+			(event.description, event.description_additional)
+		)
+
+	def search(self, query, limit=None):
+		"""search(query, limit=None) - Returns the events whose description
+			or additional description match every word of the query,
+			the best first. Returns an EventCalendar.
+
+		Parameters:
+		query (string) - the searched words, see SearchIndex.
+
+		Keyword parameters:
+		limit (int) - the most events returned. (default all)
+		"""
+		found = EventCalendar()
+		for score, event in self.search_index.search(query, limit):
+			found.add(event)
+		return found
+
+	def _search_key(self, event):
+		"""Returns a stable key of the event for the search_index."""
+		return _hash_fields(
+			event.event_id, event.date, event.teacher, event.day, event.month,
+			event.year, event.event_numtype, event.description,
+			event.description_additional
+		)
+
+	def find(self, numtypes=None, start=None, end=None, teacher=None):
+		"""find(numtypes=None, start=None, end=None, teacher=None) - Returns
+			the events matching all of the given conditions, for ex. exams and
+			tests of a week: find((4, 5), '2016-03-14', '2016-03-20').
+			Only the events of the most selective index are checked.
+			Returns an EventCalendar.
+
+		Keyword parameters:
+		numtypes (list) - the accepted event_numtypes. (default any)
+		start (string) - the first accepted day, YYYY-MM-DD. (default any)
+		end (string) - the last accepted day, YYYY-MM-DD. (default any)
+		teacher (string) - the teacher of the events. (default any)
+		"""
+		candidates = []
+		if numtypes is not None:
+			numtypes = set(numtypes)
+			candidates.append([
+				event for numtype in numtypes
+				for event in self.events_by_numtype.get(numtype, ())
+			])
+		if start is not None or end is not None:
+			import bisect
+			if self._sorted_dates is None:
+				self._sorted_dates = sorted(date for date in self.events_by_date if date)
+			first = 0 if start is None else bisect.bisect_left(self._sorted_dates, start)
+			last = len(self._sorted_dates) if end is None else (
+				bisect.bisect_right(self._sorted_dates, end)
+			)
+			candidates.append([
+				event for date in self._sorted_dates[first:last]
+				for event in self.events_by_date[date]
+			])
+		if teacher is not None:
+			candidates.append(self.events_by_teacher.get(teacher, []))
+		if not candidates:
+			candidates.append(self.events)
+
+		found = EventCalendar()
+		for event in min(candidates, key=len):
+			if numtypes is not None and event.event_numtype not in numtypes:
+				continue
+			event_date = event.event_date()
+			if start is not None and not (event_date and event_date >= start):
+				continue
+			if end is not None and not (event_date and event_date <= end):
+				continue
+			if teacher is not None and event.teacher != teacher:
+				continue
+			found.add(event)
+		return found
 
 	def update_old_events(self, month, year):
 		"""update_old_events(month, year) - Update the old_events with ones
@@ -221,10 +415,7 @@ class EventCalendar:
 		year (string) - The desired year.
 		"""
 		filename = 'events'+str(month)+'_'+str(year)+'.pickle'
-		temp_old_events = self.librus.file_handler.file_to_class(filename)
-		self.old_events = EventCalendar()
-		for event in temp_old_events.events:
-			self.old_events.add(event)
+		self.old_events = self.librus.file_handler.file_to_collection(filename)
 
 	def compare_old_events(self):
 		"""compare_old_events() - Compare the old_events with events and
@@ -281,30 +472,73 @@ class AnnouncementBoard:
 
 	Variables:
 	announcements (list) - A list of stored announcements.
+	fingerprints (dictionary) - the content fingerprint of every
+		announcement, by its identity. {identity:fingerprint}
+		Stored with the board, see Announcement.identity.
+	search_index (SearchIndex) - full-text index of titles and contents.
+	search_terms (dictionary) - state of the search_index, stored with
+		the board.
+	old_announcements (AnnouncementBoard) - The AnnouncementBoard
+		used on last launch.
 	librus (Librus) - Reference to parent Librus object.
 		Set by Librus on its init.
 
 	Functions:
 	add(announcement) - Add an announcement.
+	search(query, limit) - Returns the announcements matching the query,
+		the best first.
 	display() - Return the announcements' display values packed
 		together, allowing to display them in a nice way.
 	sort_by_date(reverse) - Sort the events by their date.
+	update_old_announcements() - Updates old_announcements with
+		announcements from last launch.
+	compare_old_announcements() - Returns the new and the edited
+		announcements.
 	"""
 	def __init__(self):
 		self.announcements = []
-		self.old_announcements = []
-		self.identificators = []
+		self.old_announcements = None
+		self.fingerprints = {}
+		self.search_index = SearchIndex()
 		self.librus = None
 
+	@property
+	def search_terms(self):
+		"""search_terms - the state of the search_index, saved with the
+		collection by RecordCodec so it needn't be rebuilt on restore.
+		"""
+		return self.search_index.state()
+
+	@search_terms.setter
+	def search_terms(self, state):
+		"""Loads a saved state into the search_index."""
+		self.search_index.load(state)
+
 	def add(self, announcement):
 		"""add(announcement) - Add an announcement."""
 		self.announcements.append(announcement)
-		self.identificators.append(
-			str(announcement.date) +
-			str(announcement.title) +
-			str(announcement.content)
+		fingerprint = announcement.fingerprint()
+		self.fingerprints[announcement.identity()] = fingerprint
+		self.search_index.add(
+			fingerprint, announcement, (announcement.title, announcement.content)
 		)
 
+	def search(self, query, limit=None):
+		"""search(query, limit=None) - Returns the announcements whose title
+			or content match every word of the query, the best first.
+			Returns an AnnouncementBoard.
+
+		Parameters:
+		query (string) - the searched words, see SearchIndex.
+
+		Keyword parameters:
+		limit (int) - the most announcements returned. (default all)
+		"""
+		found = AnnouncementBoard()
+		for score, announcement in self.search_index.search(query, limit):
+			found.add(announcement)
+		return found
+
 	def display(self):
 		"""display() - Return the announcements' display values packed
 		together, allowing to display them in a nice way.
@@ -325,21 +559,31 @@ class AnnouncementBoard:
 		self.announcements.sort(key=lambda x: str(x[7]), reverse=reverse)
 
 	def update_old_announcements(self):
+		"""update_old_announcements() - Updates old_announcements with
+		announcements from last launch.
+		"""
 		filename = 'announcements.pickle'
-		temp_old_announcements = self.librus.file_handler.file_to_class(filename)
-		self.old_announcements = AnnouncementBoard()
-		for announcement in temp_old_announcements.announcements:
-			self.old_announcements.add(announcement)
+		self.old_announcements = self.librus.file_handler.file_to_collection(
+			filename
+		)
 		self.old_announcements.sort_by_date()
 
 	def compare_old_announcements(self):
+		"""compare_old_announcements() - Compares old_announcements with
+		announcements by their fingerprints, returns the new ones and
+		the edited ones (same teacher, date and title, different content).
+		Returns two AnnouncementBoard objects.
+		"""
 		temp_announcement_board = AnnouncementBoard()
+		edited_announcement_board = AnnouncementBoard()
+		old_fingerprints = self.old_announcements.fingerprints
 		for announcement in self.announcements:
-			cond = str(announcement.date)+str(announcement.title)
-			cond += str(announcement.content)
-			if cond not in self.old_announcements.identificators:
+			old_fingerprint = old_fingerprints.get(announcement.identity())
+			if old_fingerprint is None:
 				temp_announcement_board.add(announcement)
-		return temp_announcement_board
+			elif old_fingerprint != announcement.fingerprint():
+				edited_announcement_board.add(announcement)
+		return temp_announcement_board, edited_announcement_board
 
 
 class AttendanceTable:
@@ -356,6 +600,7 @@ class AttendanceTable:
 	display() - Return the attendance' display values packed
 		together, allowing to display them in a nice way.
 	sort_by_date(reverse) - Sort the attendance by its date.
+	analytics() - Returns the AttendanceAnalytics of the attendance.
 	"""
 	def __init__(self):
 		self.attendances = []
@@ -390,15 +635,19 @@ class AttendanceTable:
 		"""
 		self.attendances.sort(key=lambda x: str(x[2]), reverse=reverse)
 
+	def analytics(self):
+		"""analytics() - Returns the AttendanceAnalytics of the attendance:
+		absence, lateness and excused rates per subject, weekday and
+		lesson slot, rolling totals and alerts.
+		"""
+		return AttendanceAnalytics(self.attendances)
+
 	def update_old_attendance(self):
 		"""update_old_attendance() - Updates old_attendance with attendance
 		from last launch.
 		"""
 		filename = 'attendance.pickle'
-		temp_old_announcements = self.librus.file_handler.file_to_class(filename)
-		self.old_attendance = AttendanceTable()
-		for attendance in temp_old_announcements.attendances:
-			self.old_attendance.add(attendance)
+		self.old_attendance = self.librus.file_handler.file_to_collection(filename)
 
 		self.old_attendance.sort_by_date()
 
@@ -417,6 +666,342 @@ class AttendanceTable:
 		return temp_attendance_table, modified_attendance_table
 
 
+class AttendanceAnalytics:
+	"""AttendanceAnalytics - absence statistics of an AttendanceTable.
+
+	Description:
+	The attendance is encoded once into compact arrays (the array module)
+	of numtypes, subject codes, lesson numbers and days, and every count
+	is gathered from them in a single pass, into flat count arrays of
+	[group*4 + numtype]. Rates are shares of the group's entries, as
+	Librus only lists the lessons which weren't plain presence.
+
+	Variables:
+	weekdays (tuple) - names of the days of the week. (class)
+	subjects (list) - names of the subjects, by their code.
+	numtypes (array) - attendance_numtype of every entry.
+	subject_codes (array) - code of the lesson of every entry.
+	lesson_numbers (array) - lesson_number of every entry.
+	days (array) - day of every entry, as a date ordinal, 0 if unknown.
+	by_subject (dictionary) - counts and rates of every subject.
+	by_weekday (dictionary) - counts and rates of every day of the week.
+	by_lesson_number (dictionary) - counts and rates of every lesson slot.
+
+	Functions:
+	__init__(attendances) - Encodes the attendance and counts it.
+	rolling(window) - Returns the absences of every day together with
+		the days before it.
+	alerts(threshold, warning) - Returns the subjects whose unexcused
+		absences are approaching the threshold.
+	"""
+	weekdays = (
+		'Poniedziałek', 'Wtorek', 'Środa', 'Czwartek',
+		'Piątek', 'Sobota', 'Niedziela'
+	)
+
+	def __init__(self, attendances):
+		"""__init__(attendances) - Encodes the attendance and counts it.
+
+		Parameters:
+		attendances (list) - a list of Attendance objects.
+		"""
+		import array
+		import datetime
+		subject_index = {}
+		self.subjects = []
+		self.numtypes = array.array('B')
+		self.subject_codes = array.array('H')
+		self.lesson_numbers = array.array('H')
+		self.days = array.array('l')
+		for attendance in attendances:
+			code = subject_index.get(attendance.lesson)
+			if code is None:
+				code = subject_index[attendance.lesson] = len(self.subjects)
+				self.subjects.append(attendance.lesson)
+			try:
+				day = datetime.date.fromisoformat(str(attendance.date).strip()).toordinal()
+			except ValueError:
+				day = 0
+			self.numtypes.append(int(attendance.attendance_numtype))
+			self.subject_codes.append(code)
+			self.lesson_numbers.append(int(attendance.lesson_number))
+			self.days.append(day)
+
+		subject_counts = array.array('l', [0]) * (len(self.subjects) * 4)
+		weekday_counts = array.array('l', [0]) * (7 * 4)
+		slot_counts = array.array('l', [0]) * ((max(self.lesson_numbers, default=0) + 1) * 4)
+		self._first_day = min((day for day in self.days if day), default=0)
+		last_day = max(self.days, default=0)
+		self._day_absences = array.array('l', [0]) * (last_day - self._first_day + 1)
+		for numtype, code, number, day in zip(
+			self.numtypes, self.subject_codes, self.lesson_numbers, self.days
+		):
+			subject_counts[code*4 + numtype] += 1
+			slot_counts[number*4 + numtype] += 1
+			if day:
+				weekday_counts[((day - 1) % 7)*4 + numtype] += 1
+				if numtype <= 1:  # usprawiedliwienie, nieobecnosc
+					self._day_absences[day - self._first_day] += 1
+
+		self.by_subject = self._rates(self.subjects, subject_counts)
+		self.by_weekday = self._rates(self.weekdays, weekday_counts)
+		self.by_lesson_number = self._rates(
+			range(len(slot_counts) // 4), slot_counts
+		)
+
+	def rolling(self, window=7):
+		"""rolling(window=7) - Returns a list of (date, absences) pairs of
+			every day between the first and the last entry, where absences
+			counts the absences of that day and the window-1 days before it.
+
+		Keyword parameters:
+		window (int) - the length of the window in days. (default 7)
+		"""
+		import datetime
+		totals = []
+		running = 0
+		for i, absences in enumerate(self._day_absences):
+			running += absences
+			if i >= window:
+				running -= self._day_absences[i - window]
+			if self._first_day:
+				day = datetime.date.fromordinal(self._first_day + i).isoformat()
+				totals.append((day, running))
+		return totals
+
+	def alerts(self, threshold, warning=0.8):
+		"""alerts(threshold, warning=0.8) - Returns a list of
+			(subject, unexcused absences, threshold) of the subjects whose
+			unexcused absences reached warning*threshold, the worst first.
+
+		Parameters:
+		threshold (int/dictionary) - the allowed unexcused absences,
+			or {subject:absences} with a 'default' key for the rest.
+
+		Keyword parameters:
+		warning (float) - the share of the threshold which raises an alert.
+			(default 0.8)
+		"""
+		alerts = []
+		for subject, counts in self.by_subject.items():
+			if isinstance(threshold, dict):
+				limit = threshold.get(subject, threshold.get('default'))
+			else:
+				limit = threshold
+			if limit is not None and counts['unexcused'] >= warning * limit:
+				alerts.append((subject, counts['unexcused'], limit))
+		alerts.sort(key=lambda x: x[1] / x[2] if x[2] else float('inf'), reverse=True)
+		return alerts
+
+	def _rates(self, groups, counts):
+		"""Turns flat [group*4 + numtype] counts into {group:counts and rates}."""
+		rates = {}
+		for i, group in enumerate(groups):
+			excused, unexcused, late, released = counts[i*4:i*4 + 4]
+			entries = excused + unexcused + late + released
+			if not entries:
+				continue
+			absences = excused + unexcused
+			rates[group] = {
+				'entries': entries, 'excused': excused, 'unexcused': unexcused,
+				'late': late, 'released': released, 'absences': absences,
+				'absence_rate': absences / entries,
+				'lateness_rate': late / entries,
+				'excused_rate': excused / absences if absences else 0.0
+			}
+		return rates
+
+
+class ArchiveAnalytics:
+	"""ArchiveAnalytics - history of the grades and attendance kept in
+		the storage directory.
+
+	Description:
+	Every refresh saves a timestamped copy of its collection in storage/.
+	The snapshots are read one at a time, oldest first, and folded into
+	small running results, so the archive never has to fit in memory.
+	The results are saved as JSON together with the names of the snapshots
+	they include, so an update only reads the snapshots added since.
+	A grade's entry lag is the time between its date and the first
+	snapshot it appeared in, so it's only as precise as the snapshots
+	are frequent. Grades of the first grades snapshot have no lag, as
+	they could have been entered at any time before it.
+
+	Variables:
+	version (int) - version of the saved results, older ones are
+		recomputed. (class)
+	kinds (tuple) - kinds of the snapshots that are analysed. (class)
+	file_handler (FileHandler) - reads the snapshots and the results.
+	filename (string) - name of the file the results are saved in.
+	processed (set) - names of the snapshots already included.
+	baseline (string) - timestamp of the first grades snapshot.
+	trajectories (dictionary) - the weighted average of every subject in
+		every grades snapshot. {subject:[[timestamp, average]]}
+	first_seen (dictionary) - where each grade first appeared.
+		{identity:[subject, teacher, date, timestamp]}, see Grade.identity.
+	attendance_trend (list) - totals of every attendance snapshot,
+		oldest first. [[timestamp, {entries, absences, unexcused, late,
+		by_subject:{subject:absences}}]]
+
+	Functions:
+	__init__(file_handler, filename) - Loads the saved results.
+	snapshots(kinds) - Returns the snapshots in the storage directory,
+		oldest first.
+	update() - Processes the new snapshots and saves the results.
+	entry_lag(by) - Returns entry lag statistics per subject or teacher.
+	"""
+	version = 2
+	kinds = ('grades', 'attendance')
+
+	def __init__(self, file_handler, filename="archive_analytics.json"):
+		"""__init__(file_handler, filename="archive_analytics.json") -
+			Loads the saved results, if there are any of this version.
+
+		Parameters:
+		file_handler (FileHandler) - reads the snapshots and the results.
+
+		Keyword parameters:
+		filename (string) - name of the results file.
+			(default "archive_analytics.json")
+		"""
+		self.file_handler = file_handler
+		self.filename = filename
+		self.processed = set()
+		self.baseline = None
+		self.trajectories = {}
+		self.first_seen = {}
+		self.attendance_trend = []
+		try:
+			with open(self.file_handler.path(filename), "r", encoding="utf8") as results_file:
+				state = json.load(results_file)
+		except (OSError, ValueError):
+			return
+		if state.get('version') != self.version:
+			return
+		self.processed = set(state['processed'])
+		self.baseline = state['baseline']
+		self.trajectories = state['trajectories']
+		self.first_seen = state['first_seen']
+		self.attendance_trend = state['attendance_trend']
+
+	def snapshots(self, kinds=None):
+		"""snapshots(kinds=None) - Returns a list of (timestamp, kind, name)
+			of the snapshots in the storage directory, oldest first.
+			Timestamps are in the storage format, YYYY_MM_DD_HH_MM_SS.
+
+		Keyword parameters:
+		kinds (tuple) - kinds of the snapshots to list. (default all)
+		"""
+		try:
+			names = os.listdir(self.file_handler.path("storage"))
+		except FileNotFoundError:
+			return []
+		snapshots = []
+		for name in names:
+			parts = name[:-len(".pickle")].split("_")
+			if not name.endswith(".pickle") or len(parts) < 7:
+				continue
+			kind = parts[0]
+			if kinds is None or kind in kinds:
+				snapshots.append(("_".join(parts[-6:]), kind, name))
+		snapshots.sort()
+		return snapshots
+
+	def update(self):
+		"""update() - Processes the snapshots which aren't included yet,
+			oldest first, and saves the results. Returns the number of
+			snapshots processed.
+		"""
+		processed = 0
+		for timestamp, kind, name in self.snapshots(self.kinds):
+			if name in self.processed:
+				continue
+			collection = self.file_handler.file_to_collection(os.path.join("storage", name))
+			if kind == 'grades':
+				self._add_grades(timestamp, collection)
+			else:
+				self._add_attendance(timestamp, collection)
+			del collection
+			self.processed.add(name)
+			processed += 1
+		if processed:
+			self._save()
+		return processed
+
+	def entry_lag(self, by='subject'):
+		"""entry_lag(by='subject') - Returns {group:{count, mean, median,
+			max}} of how many days after their date the grades appeared
+			in the archive, per subject or teacher.
+
+		Keyword parameters:
+		by (string) - 'subject' or 'teacher'. (default 'subject')
+		"""
+		import datetime
+		import statistics
+		if by not in ('subject', 'teacher'):
+			raise ValueError("Invalid grouping - " + str(by) + ". Use 'subject' or 'teacher'.")
+		column = 0 if by == 'subject' else 1
+		lags = {}
+		for entry in self.first_seen.values():
+			if entry[3] == self.baseline:
+				continue
+			try:
+				written = datetime.date.fromisoformat(str(entry[2]).strip())
+			except ValueError:
+				continue
+			seen = datetime.datetime.strptime(entry[3], "%Y_%m_%d_%H_%M_%S").date()
+			lags.setdefault(entry[column], []).append((seen - written).days)
+		return {
+			group: {
+				'count': len(days), 'mean': statistics.fmean(days),
+				'median': statistics.median(days), 'max': max(days)
+			}
+			for group, days in lags.items()
+		}
+
+	def _add_grades(self, timestamp, grade_book):
+		"""Adds the averages and newly seen grades of a grades snapshot."""
+		import bisect
+		if self.baseline is None or timestamp < self.baseline:
+			self.baseline = timestamp
+		for subject in grade_book.subjects:
+			try:
+				average = grade_book.calculate_average(subject)
+			except ZeroDivisionError:
+				continue
+			bisect.insort(self.trajectories.setdefault(subject, []), [timestamp, average])
+		for grade in grade_book.grades:
+			identity = grade.identity()
+			seen = self.first_seen.get(identity)
+			if seen is None or timestamp < seen[3]:
+				self.first_seen[identity] = [
+					grade.school_subject, grade.teacher, grade.date, timestamp
+				]
+
+	def _add_attendance(self, timestamp, attendance_table):
+		"""Adds the totals of an attendance snapshot."""
+		analytics = attendance_table.analytics()
+		totals = {'entries': 0, 'absences': 0, 'unexcused': 0, 'late': 0, 'by_subject': {}}
+		for subject, counts in analytics.by_subject.items():
+			for key in ('entries', 'absences', 'unexcused', 'late'):
+				totals[key] += counts[key]
+			totals['by_subject'][subject] = counts['absences']
+		self.attendance_trend.append([timestamp, totals])
+		if len(self.attendance_trend) > 1 and self.attendance_trend[-2][0] > timestamp:
+			self.attendance_trend.sort(key=lambda x: x[0])
+
+	def _save(self):
+		"""Writes the results into the results file."""
+		temp_filename = self.file_handler.path(self.filename) + ".tmp"
+		with open(temp_filename, "w", encoding="utf8") as temp_file:
+			json.dump({
+				'version': self.version, 'processed': sorted(self.processed),
+				'baseline': self.baseline, 'trajectories': self.trajectories,
+				'first_seen': self.first_seen, 'attendance_trend': self.attendance_trend
+			}, temp_file, ensure_ascii=False)
+		os.replace(temp_filename, self.file_handler.path(self.filename))
+
+
 class Grade:
 	"""Grade - A grade object. Stores all of values,
 	allows displaying it on a function call.
@@ -474,6 +1059,7 @@ class Grade:
 	set_absolute_values() - Turns the grade_value into absolute_value.
 	Done on initialization.
 	return_values() - Returns the internal list of values.
+	identity() - Returns a key identifying the grade between launches.
 	"""
 
 	def __init__(self, values):
@@ -576,6 +1162,15 @@ class Grade:
 		"""return_values() - Returns the internal list of values."""
 		return self.values
 
+	def identity(self):
+		"""identity() - Returns a key identifying the grade between launches.
+			Shaping grades are numbered apart from the others, so their
+			grade_id gets the ksztaltujace/ prefix Librus uses for them.
+		"""
+		if self.grade_numtype == 3:
+			return "ksztaltujace/" + str(self.grade_id)
+		return str(self.grade_id)
+
 
 class Event:
 	"""Event - An event object. Stores events and all of their data.
@@ -642,9 +1237,15 @@ class Event:
 	__init__(values) - Accepts the values from Parser.parse_events and
 	puts them into an array. Initializing method.
 	update(values) - Updates the values with new ones. Done on initialization.
+	event_date() - Returns the day of the event as YYYY-MM-DD.
 	display() - Returns a text representation of the event,
 	which can be used for display.
 	"""
+	months = (
+		'styczeń', 'luty', 'marzec', 'kwiecień', 'maj', 'czerwiec', 'lipiec',
+		'sierpień', 'wrzesień', 'październik', 'listopad', 'grudzień'
+	)
+
 	def __init__(self, values):
 		"""__init__(values) - Accepts the values from Parser.parse_events and
 		puts them into an array. Initializing method.
@@ -697,6 +1298,19 @@ class Event:
 		self.description = values[9]
 		self.event_id = int(values[10])
 
+	def event_date(self):
+		"""event_date() - Returns the day of the event as YYYY-MM-DD,
+			or "" if the month isn't known.
+		"""
+		month = str(self.month).strip().lower()
+		if month in self.months:
+			month = self.months.index(month) + 1
+		elif month.isdigit():
+			month = int(month)
+		else:
+			return ""
+		return "%04d-%02d-%02d" % (int(self.year), month, int(self.day))
+
 	def display(self):
 		"""display() - Returns a text representation of the event,
 		which can be used for display.
@@ -752,6 +1366,9 @@ class Announcement:
 	__init__(values) - Accepts the values from Parser.parse_announcements and
 		puts them into variables. Initializing method.
 	update(values) - Updates the values with new ones. Done on initialization.
+	identity() - Returns a hash of the teacher, date and title,
+		which stay the same when the announcement is edited.
+	fingerprint() - Returns a hash of the whole announcement.
 	display() - Returns a text representation of the announcement,
 		which can be used for display.
 	"""
@@ -796,6 +1413,18 @@ class Announcement:
 		self.day = values[6]
 		self.pseudo_time = values[7]
 
+	def identity(self):
+		"""identity() - Returns a hash of the teacher, date and title,
+			which stay the same when the announcement is edited.
+		"""
+		return _hash_fields(self.teacher, self.date, self.title)
+
+	def fingerprint(self):
+		"""fingerprint() - Returns a hash of the teacher, date, title
+			and content of the announcement.
+		"""
+		return _hash_fields(self.teacher, self.date, self.title, self.content)
+
 	def display(self):
 		"""display() - Returns a text representation of the
 		announcement, which can be used for display.
@@ -905,26 +1534,199 @@ class Attendance:
 		return display_string
 
 
+class Lesson:
+	"""Lesson - A lesson in a timetable slot. Stores all of its data,
+	allows displaying it on a function call.
+
+	Variables:
+	subject (string) - School subject of the lesson.
+	teacher (string) - Teacher who teaches the lesson.
+	numtype (int) - Type of the lesson:
+		0 - NORMAL
+		1 - CANCELED
+		2 - MOVED - moved into this slot.
+		3 - MOVED_AWAY - moved out of this slot (and canceled here).
+		4 - SUBSTITUTION
+		5 - DAY_OFF - a day off school.
+	previous_subject (string) - Subject before the change, for numtypes 2-4,
+		otherwise None.
+	previous_teacher (string) - Teacher before the change, for numtypes 2-4,
+		otherwise None.
+	new_subject (string) - Subject after the change, for numtypes 2-4,
+		otherwise None.
+	new_teacher (string) - Teacher after the change, for numtypes 2-4,
+		otherwise None.
+
+	Functions:
+	__init__(subject, teacher, special) - Initializing method.
+	special() - Returns the dictionary of special values, as made by Parser.
+	display() - Returns a text representation of the lesson,
+		which can be used for display.
+	"""
+	__slots__ = (
+		'subject', 'teacher', 'numtype', 'previous_subject',
+		'previous_teacher', 'new_subject', 'new_teacher'
+	)
+	NORMAL = 0
+	CANCELED = 1
+	MOVED = 2
+	MOVED_AWAY = 3
+	SUBSTITUTION = 4
+	DAY_OFF = 5
+
+	def __init__(self, subject, teacher, special):
+		"""__init__(subject, teacher, special) - Initializing method.
+
+		Parameters:
+		subject (string) - School subject of the lesson.
+		teacher (string) - Teacher who teaches the lesson.
+		special (dict) - special values provided by Parser.parse_timetable.
+		"""
+		self.subject = sys.intern(subject)  # the same few names repeat all week
+		self.teacher = sys.intern(teacher)
+		self.numtype = special['numtype']
+		self.previous_subject = special.get('previous_subject')
+		self.previous_teacher = special.get('teacher')
+		self.new_subject = special.get('new_subject')
+		self.new_teacher = special.get('new_teacher')
+
+	def __eq__(self, other):
+		if not isinstance(other, Lesson):
+			return NotImplemented
+		return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+	def __hash__(self):
+		return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+	def __repr__(self):
+		return 'Lesson(%r, %r, %r)' % (self.subject, self.teacher, self.special())
+
+	def special(self):
+		"""special() - Returns the dictionary of special values,
+			as made by Parser.parse_timetable.
+		"""
+		special = {}
+		if self.previous_teacher is not None:
+			special['teacher'] = self.previous_teacher
+			special['new_teacher'] = self.new_teacher
+			special['previous_subject'] = self.previous_subject
+			special['new_subject'] = self.new_subject
+		special['numtype'] = self.numtype
+		return special
+
+	def display(self):
+		"""display() - Returns a text representation of the lesson,
+			which can be used for display.
+		"""
+		if self.numtype == Lesson.NORMAL:
+			return self.subject+"\n"+self.teacher
+		elif self.numtype == Lesson.CANCELED:
+			return "[-] ODWOŁANE:\n"+self.subject+"\n"+self.teacher
+		elif self.numtype == Lesson.MOVED:
+			return "[+] PRZESUNIETE:\n"+self.new_subject+"\n"+self.new_teacher
+		elif self.numtype == Lesson.MOVED_AWAY:
+			lesson_text = "[-] PRZESUNIETE\n"
+			lesson_text += "    (ODWOŁANE):\n"
+			return lesson_text+self.new_subject+"\n"+self.new_teacher
+		elif self.numtype == Lesson.SUBSTITUTION:
+			lesson_text = "[*] ZASTĘPSTWO:\n"
+			lesson_text += self.previous_subject+"\n"
+			lesson_text += self.previous_teacher+"\n----\\/----\n"
+			if self.previous_subject != self.new_subject:
+				lesson_text += self.new_subject+"\n"
+			return lesson_text+self.new_teacher
+		return ""
+
+
+class TimetableChange:
+	"""TimetableChange - A changed lesson found by comparing timetables.
+
+	Variables:
+	date (string) - Date of the lesson. YYYY-MM-DD
+	day (string) - Day of the week of the lesson.
+	number (int) - Number of the lesson.
+	hours (tuple) - (start, end) of the lesson.
+	lesson (Lesson) - the changed lesson, its numtype tells what changed.
+
+	Functions:
+	display() - Returns a text representation of the change,
+		which can be used for display.
+	"""
+	__slots__ = ('date', 'day', 'number', 'hours', 'lesson')
+
+	def __init__(self, date, day, number, hours, lesson):
+		"""__init__(date, day, number, hours, lesson) - Initializing method."""
+		self.date = date
+		self.day = day
+		self.number = number
+		self.hours = hours
+		self.lesson = lesson
+
+	def display(self):
+		"""display() - Returns a text representation of the change,
+			which can be used for display.
+		"""
+		display_string = self.date+" ("+self.day+"), lekcja nr. "+str(self.number)
+		display_string += " - "+self.lesson.display().replace("\n", " ")
+
+		return display_string
+
+
 class Timetable:
 	"""Timetable - A timetable object. Stores all of its data.
 		Allows displaying it with a function call.
 
 		Variables:
-		values (list) - provided by Parser class, a list of values:
-		timetable (dict) - the main container of the timetable
+		values (list) - a list with the timetable dictionary, as provided
+			by Parser class.
+		timetable (dict) - the timetable as made by Parser.parse_timetable.
+			Built from the grid on first access and kept until update, so
+			changing the grid directly leaves it stale.
+		days (list) - names of the days, in the order of the week.
+		dates (list) - dates of the days, in the same order. YYYY-MM-DD
+		numbers (list) - numbers of the lessons, in the order of the day.
+		hours (dict) - start and end of every lesson. {number:(start, end)}
+		grid (list) - the lessons, indexed by [day index][lesson number].
+			Every slot is a tuple of Lesson objects, empty if there's none.
+		day_index (dict) - index of a day in the grid. {name:index}
+		old_timetable (Timetable) - the timetable from last launch,
+			compared by compare_old_timetable. (default None)
+		column_width (int) - width of a column of the text display. (class)
+		rendered (collections.OrderedDict) - the recently rendered displays,
+			shared by all timetables. {(format, fingerprint):string} (class)
+		rendered_size (int) - the most displays kept in rendered. (class)
 
 		Functions:
 		__init__(values) - Initializing method.
 		update(values) - Updates the values with new ones.
+		slot(day, number) - Returns the lessons in a slot.
+		update_old_timetable(filename) - Updates old_timetable with
+			the timetable from last launch.
+		compare_old_timetable() - Returns the canceled, moved and substituted
+			lessons which weren't in old_timetable.
+		fingerprint() - Returns a hash of the contents of the timetable.
 		transform_array() - Returns a 2D array representation of the timetable,
 			which can be used for custom display.
 		display() - Returns a text representation of the timetable,
 			which can be used for display.
+		display_html() - Returns a HTML table of the timetable.
 	"""
+	column_width = 30
+	rendered = collections.OrderedDict()
+	rendered_size = 16
+	_rendered_lock = threading.Lock()
+
 	def __init__(self):
 		"""__init__(values) - Initializing method."""
-		self.values = []
-		self.timetable = {}
+		self.days = []
+		self.dates = []
+		self.numbers = []
+		self.hours = {}
+		self.grid = []
+		self.day_index = {}
+		self.old_timetable = None
+		self._fingerprint = None
+		self._timetable = None
 
 	def __str__(self):
 		return self.display()
@@ -932,107 +1734,227 @@ class Timetable:
 	def __getitem__(self, index):
 		return self.values[index]
 
+	def __setstate__(self, state):
+		if 'timetable' in state:  # pickled by older versions
+			self.__init__()
+			self.update([state.pop('timetable')])
+			state.pop('values', None)
+		self.__dict__.update(state)
+		self.__dict__.setdefault('_timetable', None)
+
+	@property
+	def values(self):
+		return [self.timetable] if self.days else []
+
+	@property
+	def timetable(self):
+		if self._timetable is not None:
+			return self._timetable
+		if not self.days:
+			return {}
+		lessons_info = {}
+		for day, date in zip(self.days, self.dates):
+			lessons_info[day] = date
+		for number in self.numbers:
+			lessons_info[number] = list(self.hours[number])
+		timetable = {'lekcje_info': lessons_info}
+		for day, lessons_day in zip(self.days, self.grid):
+			timetable[day] = {}
+			for i, number in enumerate(self.numbers):
+				lessons = []
+				for lesson in lessons_day[number]:
+					lessons.extend((lesson.subject, lesson.teacher, lesson.special()))
+				timetable[day][i+1] = lessons
+		self._timetable = timetable
+		return timetable
+
 	def update(self, values):
 		"""update(values) - Updates the values with new ones.
 
 		Parameters:
 		values (list) - List of values provided by Parser class.
 		"""
-		self.values = values
-		self.timetable = values[0]
+		timetable = values[0]
+		lessons_info = timetable.get('lekcje_info', {})
+		self.days = [day for day in lessons_info if not isinstance(day, int)]
+		self.dates = [lessons_info[day] for day in self.days]
+		self.numbers = [number for number in lessons_info if isinstance(number, int)]
+		self.hours = dict((number, tuple(lessons_info[number])) for number in self.numbers)
+		self.day_index = dict((day, i) for i, day in enumerate(self.days))
+		size = max(self.numbers) + 1 if self.numbers else 0
+		self.grid = []
+		for day in self.days:
+			lessons_day = [()] * size
+			for i, lessons in timetable[day].items():  # i-th lesson of the day
+				lessons_day[self.numbers[i-1]] = tuple(
+					Lesson(lessons[j], lessons[j+1], lessons[j+2])
+					for j in range(0, len(lessons), 3)
+				)
+			self.grid.append(lessons_day)
+		self._fingerprint = None
+		self._timetable = None
+
+	def slot(self, day, number):
+		"""slot(day, number) - Returns the lessons in a slot,
+			a tuple of Lesson objects.
+
+		Parameters:
+		day (string/int) - name of the day or its index.
+		number (int) - number of the lesson.
+		"""
+		return self.grid[self.day_index.get(day, day)][number]
+
+	def update_old_timetable(self, filename='timetable.pickle'):
+		"""update_old_timetable(filename='timetable.pickle') - Updates
+			old_timetable with the timetable from last launch.
+
+		Keyword parameters:
+		filename (string) - the cache file of the timetable.
+			(default 'timetable.pickle')
+		"""
+		self.old_timetable = self.librus.file_handler.file_to_collection(filename)
+
+	def compare_old_timetable(self):
+		"""compare_old_timetable() - Compares old_timetable with the timetable
+			slot by slot, returns the canceled, moved and substituted lessons
+			(numtypes 1-4) which weren't there. Slots are matched by date,
+			so timetables of different weeks share nothing.
+			Returns a list of TimetableChange objects.
+		"""
+		old_slots = {}
+		old_timetable = self.old_timetable
+		if old_timetable is not None:
+			for date, lessons_day in zip(old_timetable.dates, old_timetable.grid):
+				for number in old_timetable.numbers:
+					old_slots[(date, number)] = lessons_day[number]
+
+		changes = []
+		for day, date, lessons_day in zip(self.days, self.dates, self.grid):
+			for number in self.numbers:
+				old_lessons = old_slots.get((date, number), ())
+				for lesson in lessons_day[number]:
+					if Lesson.CANCELED <= lesson.numtype <= Lesson.SUBSTITUTION:
+						if lesson not in old_lessons:
+							changes.append(TimetableChange(
+								date, day, number, self.hours[number], lesson
+							))
+		return changes
+
+	def fingerprint(self):
+		"""fingerprint() - Returns a hash of the contents of the timetable,
+			which changes whenever any of its lessons do.
+		"""
+		if self._fingerprint is None:
+			import hashlib
+			contents = repr((self.days, self.dates, self.hours, self.grid))
+			self._fingerprint = hashlib.blake2b(
+				contents.encode('utf8'), digest_size=16
+			).hexdigest()
+		return self._fingerprint
 
 	def display(self):
 		"""display() - Returns a text representation of the timetable,
-			which can be used for display.
-			Requires timetable module -- pip install timetable.
+			which can be used for display. Rendered once per contents.
 		"""
-		t = Texttable()  # imported from timetable module, pip install it
-		t.add_rows(self.transform_array())
-		t.set_cols_align([
-			"m", "m", "m", "m",
-			"m", "m", "m", "m"
-			]
-		)
-		t.set_cols_width([
-			30, 30, 30, 30,
-			30, 30, 30, 30
-			]
-		)
-		return t.draw()
+		return self._rendered('text', self._render_text)
+
+	def display_html(self):
+		"""display_html() - Returns a HTML table of the timetable,
+			which can be used for display. Rendered once per contents.
+		"""
+		return self._rendered('html', self._render_html)
+
+	def _rendered(self, display_format, render):
+		"""Returns the memoized display of the timetable, rendering it if needed."""
+		key = (display_format, self.fingerprint())
+		with Timetable._rendered_lock:
+			output = Timetable.rendered.get(key)
+			if output is not None:
+				Timetable.rendered.move_to_end(key)
+				return output
+		output = render(self.transform_array())
+		with Timetable._rendered_lock:
+			Timetable.rendered[key] = output
+			while len(Timetable.rendered) > Timetable.rendered_size:
+				Timetable.rendered.popitem(last=False)
+		return output
+
+	def _render_text(self, table_2d):
+		"""Draws the 2D array as a text grid: a centered header row and
+		left aligned cells wrapped to column_width.
+		"""
+		width = self.column_width
+		hline = "+" + "+".join(["-" * (width + 2)] * len(table_2d[0])) + "+"
+		header_line = hline.replace("-", "=")
+		lines = [hline]
+		for index, row in enumerate(table_2d):
+			cells = [self._wrap(cell, width) for cell in row]
+			height = max(len(cell) for cell in cells)
+			for i in range(height):
+				parts = []
+				for cell in cells:
+					text = cell[i] if i < len(cell) else ""
+					fill = width - len(text)
+					if index:
+						parts.append(text + " " * fill)
+					else:
+						parts.append(" " * (fill // 2) + text + " " * (fill - fill // 2))
+				lines.append("| " + " | ".join(parts) + " |")
+			lines.append(hline if index else header_line)
+		if len(table_2d) == 1:
+			lines.append(hline)
+		return "\n".join(lines)
+
+	def _wrap(self, cell, width):
+		"""Splits a cell into lines no wider than width."""
+		lines = []
+		for line in cell.split("\n"):
+			if not line.strip():
+				lines.append("")
+			elif len(line) <= width and "\t" not in line:
+				lines.append(line.rstrip())
+			else:
+				import textwrap
+				lines.extend(textwrap.wrap(line, width))
+		return lines
+
+	def _render_html(self, table_2d):
+		"""Draws the 2D array as a HTML table."""
+		import html
+
+		def cell_html(cell):
+			return html.escape(cell).replace("\n", "<br>")
+
+		rows = ['<table class="timetable">', '<thead><tr>']
+		rows.extend('<th>' + cell_html(cell) + '</th>' for cell in table_2d[0])
+		rows.append('</tr></thead>')
+		rows.append('<tbody>')
+		for row in table_2d[1:]:
+			rows.append('<tr><th>' + cell_html(row[0]) + '</th>')
+			rows.extend('<td>' + cell_html(cell) + '</td>' for cell in row[1:])
+			rows.append('</tr>')
+		rows.append('</tbody>')
+		rows.append('</table>')
+		return "\n".join(rows)
 
 	def transform_array(self):
 		"""transform_array() - Returns a 2D array representation of the timetable,
 			which can be used for custom display.
 		"""
-		lessons_refactor = self.timetable
-		days = [
-			'Poniedziałek',
-			'Wtorek',
-			'Środa',
-			'Czwartek',
-			'Piątek',
-			'Sobota',
-			'Niedziela'
-		]
 		table_2d = []
 		first_row = ["---"]
-		for day in days:
-			day_text = day+"\n"
-			day_text += lessons_refactor['lekcje_info'][day]
-			first_row.append(day_text)
+		for day, date in zip(self.days, self.dates):
+			first_row.append(day+"\n"+date)
 		table_2d.append(first_row)
 
-		condition = sorted(
-			list(
-				lessons_refactor['lekcje_info'].keys()
-			), key=lambda x: str(x) if len(
-				str(x)
-			)-1 else "0"+str(x)
-		)
-		for x in condition:
-			if x not in days:
-				append_table = []
-				day_text = str(x)+"\n"+str(lessons_refactor['lekcje_info'][x][0])
-				day_text += "\n"+str(lessons_refactor['lekcje_info'][x][1])
-				append_table.append(day_text)
-				for day in days:
-					lessons_day = lessons_refactor[day][int(x)]
-					lesson_text = ""
-					if lessons_day:  # is not []
-						for i in range(int(len(lessons_day)/3)):
-							numtype = lessons_day[i*3+2]['numtype']
-							special = lessons_day[i*3+2]
-							if numtype == 0:  # normal
-								lesson_text += lessons_day[i*3+0]
-								lesson_text += "\n"+lessons_day[i*3+1]
-							elif numtype == 1:  # canceled
-								lesson_text += "[-] ODWOŁANE:\n"
-								lesson_text += lessons_day[i*3+0]
-								lesson_text += "\n"+lessons_day[i*3+1]
-							elif numtype == 2:  # przesuniecie new
-								lesson_text += "[+] PRZESUNIETE:\n"
-								lesson_text += special['new_subject']+"\n"
-								lesson_text += special['new_teacher']
-							elif numtype == 3:  # przesuniecie old
-								lesson_text += "[-] PRZESUNIETE\n"
-								lesson_text += "    (ODWOŁANE):\n"
-								lesson_text += special['new_subject']+"\n"
-								lesson_text += special['new_teacher']
-							elif numtype == 4:  # zastepstwo
-								lesson_text += "[*] ZASTĘPSTWO:\n"
-								lesson_text += special['previous_subject']+"\n"
-								lesson_text += special['teacher']+"\n----\/----\n"
-								if special['previous_subject'] != special['new_subject']:
-									lesson_text += special['new_subject']+"\n"
-								lesson_text += special['new_teacher']
-							else:
-								print(lessons_day)
-							if len(lessons_day) > 3:
-								if i != (len(lessons_day)/3)-1:
-									lesson_text += "\n----------\n"
-
-					append_table.append(lesson_text)
-				table_2d.append(append_table)
+		for number in sorted(self.numbers):
+			start, end = self.hours[number]
+			append_table = [str(number)+"\n"+str(start)+"\n"+str(end)]
+			for lessons_day in self.grid:
+				append_table.append("\n----------\n".join(
+					lesson.display() for lesson in lessons_day[number]
+				))
+			table_2d.append(append_table)
 		return table_2d
 
 
@@ -1052,8 +1974,14 @@ class Parser:
 	Variables:
 	librus (Librus) - Reference to the parent Librus object.
 		Set in Librus object during init.
+	metrics (Metrics) - where timings of the HTML parsing go.
+	profiler (ParserProfiler) - profiles the parse methods while
+		profiling is enabled. Set the PYLIBRUS_PROFILE environment
+		variable to a directory to enable it for every Parser. (default None)
 
 	Functions:
+	enable_profiling(directory) - Profiles the parse methods.
+	disable_profiling() - Stops profiling the parse methods.
 	parse_grade(grade) - Parses BeautifulSoup grades provided by
 		Parser.parse_html_grade. Returns a list of values.
 	parse_events(events, html) - Parses HTML and BeautifulSoup events provided by
@@ -1065,12 +1993,45 @@ class Parser:
 	parse_timetable(html) - Parses html of the lessons schedule page.
 		Returns a custom dictionary of values.
 	parse_html_grade(html) - Parses HTML into BeautifulSoup grades.
+	parse_html_grade_rows(html) - Parses HTML into fingerprinted subject rows
+		of BeautifulSoup grades.
 	parse_html_table(html) - Parses HTML into BeautifulSoup events.
 	parse_html_announcements(html) - Parses HTML into BeautifulSoup announcements.
 
 	"""
 	def __init__(self):
 		self.librus = None
+		self.metrics = Metrics()
+		self.profiler = None
+		if os.environ.get('PYLIBRUS_PROFILE'):
+			self.enable_profiling(os.environ['PYLIBRUS_PROFILE'])
+
+	def enable_profiling(self, directory="profiles"):
+		"""enable_profiling(directory="profiles") - Profiles the parse methods
+			with cProfile. Runs are written by profiler.dump(), which is
+			called at the end of every Librus.refresh.
+			Returns the ParserProfiler.
+
+		Keyword parameters:
+		directory (string) - the directory runs are written into.
+			(default profiles)
+		"""
+		self.disable_profiling()
+		self.profiler = ParserProfiler(directory)
+		for name in self.profiler.methods:
+			setattr(self, name, self.profiler.wrap(name, getattr(self, name)))
+		return self.profiler
+
+	def disable_profiling(self):
+		"""disable_profiling() - Stops profiling the parse methods
+			and writes the unfinished run.
+		"""
+		if self.profiler is None:
+			return
+		for name in self.profiler.methods:
+			self.__dict__.pop(name, None)
+		self.profiler.dump()
+		self.profiler = None
 
 	def parse_grade(self, grade):
 		"""parse_grade(grade) - Parses a grade object provided by BeautifulSoup
@@ -1245,7 +2206,8 @@ class Parser:
 						if event_numtype == 3:
 							teacher = temp_event.split('Zastępstwo z ')[1].split(' na')[0]
 						elif event_numtype == 7:
-							teacher = temp_event.split('zajęcia<br>')[1].split(' na')[0]
+							# BeautifulSoup renders the <br> of the page as <br/>
+							teacher = temp_event.split('zajęcia<br/>')[1].split(' na')[0]
 						elif event_numtype == 8:
 							teacher = temp_event.split('Przesunięcie z ')[1].split(' na')[0]
 						date = temp_event.split('nr: ')[1].split(' (')[0]
@@ -1521,10 +2483,34 @@ class Parser:
 		Parameters:
 		html (string) - the HTML of grades website.
 		"""
-		soup = BeautifulSoup(html, "html.parser")
-		soupGrades = soup.findAll("a", {"class": "ocena"})
+		from bs4 import BeautifulSoup  # imported lazily, it's slow to import
+		with self.metrics.span('html_parse', kind='grades'):
+			soup = BeautifulSoup(html, "html.parser")
+			soupGrades = soup.findAll("a", {"class": "ocena"})
 		return soupGrades
 
+	def parse_html_grade_rows(self, html):
+		"""parse_html_grade_rows(html) - parses html and returns a list of
+			(fingerprint, [soup grades]) pairs, one per subject row, where
+			fingerprint is a hash of the row's HTML.
+
+		Parameters:
+		html (string) - the HTML of grades website.
+		"""
+		import hashlib  # imported lazily, it's only needed for parsing
+		rows = []
+		row_indexes = {}
+		for grade in self.parse_html_grade(html):
+			row = grade.findParent('tr')
+			if id(row) not in row_indexes:
+				row_indexes[id(row)] = len(rows)
+				rows.append((row, []))
+			rows[row_indexes[id(row)]][1].append(grade)
+		return [
+			(hashlib.blake2b(str(row).encode('utf8'), digest_size=16).hexdigest(), grades)
+			for row, grades in rows
+		]
+
 	def parse_html_table(self, html):
 		"""parse_html_table(html) - parses html and returns a list of soup tables
 		(used in Parser.parse_event)
@@ -1532,8 +2518,10 @@ class Parser:
 		Parameters:
 		html (string) - the HTML of events website.
 		"""
-		soup = BeautifulSoup(html, "html.parser")
-		soupGrades = soup.findAll("div", {"class": "kalendarz-dzien"})
+		from bs4 import BeautifulSoup  # imported lazily, it's slow to import
+		with self.metrics.span('html_parse', kind='events'):
+			soup = BeautifulSoup(html, "html.parser")
+			soupGrades = soup.findAll("div", {"class": "kalendarz-dzien"})
 		return soupGrades
 
 	def parse_html_announcements(self, html):
@@ -1543,150 +2531,2342 @@ class Parser:
 		Parameters:
 		html (string) - the HTML of announcements website.
 		"""
-		soup = BeautifulSoup(html, "html.parser")
-		soupGrades = soup.findAll(
-			"table", {'class': 'decorated form big center printable'}
-		)
+		from bs4 import BeautifulSoup  # imported lazily, it's slow to import
+		with self.metrics.span('html_parse', kind='announcements'):
+			soup = BeautifulSoup(html, "html.parser")
+			soupGrades = soup.findAll(
+				"table", {'class': 'decorated form big center printable'}
+			)
 		return soupGrades
 
 
-class FileHandler:
-	"""FileHandler - a file handler. Handles all of file related stuff.
+class ParserProfiler:
+	"""ParserProfiler - profiles the Parser hot paths with cProfile.
+
+	Description:
+	Every profiled Parser method collects into its own cProfile.Profile
+	until dump() is called, which ends the run: it writes a pstats file
+	per method and a summary of the hottest string splitting, regex and
+	BeautifulSoup calls into a new directory, then starts a new run.
+	The .prof files can be opened with pstats or snakeviz.
 
 	Variables:
-	librus (Librus) - Reference to the parent Librus object.
-		Set in Librus object during init.
+	methods (tuple) - the Parser methods which get profiled.
+	directory (string) - the directory runs are written into.
+	profiles (dictionary) - {method:cProfile.Profile} of the current run.
+	calls (dictionary) - {method:number of calls} of the current run.
+	durations (dictionary) - {method:seconds spent} of the current run.
+	top (int) - how many calls are listed in the summary. (default 15)
 
 	Functions:
-	read_file(name, mode="r") - opens a file and returns its content.
-	save_file(name, content, mode="w") - opens a file and writes into it.
-	class_to_file(self, specified_class, name) - saves a class into a file.
-	file_to_class(self, specified_class, name) - reads a class from a file.
+	wrap(name, function) - Returns function profiled as method name.
+	dump() - Writes the current run and starts a new one.
+		Returns the directory of the run, or None if nothing was profiled.
+	summary() - Returns the summary of the current run as text.
 	"""
-	def __init__(self):
-		self.librus = None
-
-	def read_file(self, name, mode="r"):
-		"""read_file(name) - opens a file and returns its content.
+	methods = (
+		'parse_grade', 'parse_events', 'parse_attendance', 'parse_announcements',
+		'parse_timetable', 'parse_html_grade', 'parse_html_table',
+		'parse_html_announcements'
+	)
 
-		Parameters:
-		name (string) - the filename.
+	def __init__(self, directory="profiles", top=15):
+		"""__init__(directory="profiles", top=15) - Initializing method.
 
 		Keyword parameters:
-		mode (string) - the mode in which the file should be opened. (default r)
+		directory (string) - the directory runs are written into.
+			(default profiles)
+		top (int) - how many calls are listed in the summary. (default 15)
 		"""
-		tFile = open(name, mode, encoding="utf8")
-		tContent = tFile.readlines()
-		tFile.close()
-		return "/n".join(tContent)
+		self.directory = directory
+		self.top = top
+		self.profiles = {}
+		self.calls = {}
+		self.durations = {}
+		self._lock = threading.Lock()
 
-	def save_file(self, name, content, mode="w"):
-		"""save_file(name, content, mode="w") - opens a file and writes into it.
+	def wrap(self, name, function):
+		"""wrap(name, function) - Returns function profiled as method name.
 
 		Parameters:
-		name (string) - the filename.
-		content (string) - the content which should be writed.
-
-		Keyword parameters:
-		mode (string) - the mode in which file should be opened. (default w)
-
+		name (string) - the name of the method.
+		function (function) - the bound method.
 		"""
-		tFile = open(name, mode, encoding="utf8")
-		tFile.write(content)
-		tFile.close()
-		return True
-
-	def class_to_file(self, specified_class, name):
-		"""class_to_file(self, specified_class, name) - saves a class into a file.
-		Utilises the pickle module in order to save.
+		import cProfile  # imported lazily, only needed when profiling
+
+		def profiled(*args, **kwargs):
+			with self._lock:
+				profile = self.profiles.get(name)
+				if profile is None:
+					profile = self.profiles[name] = cProfile.Profile()
+			start = time.perf_counter()
+			try:
+				profile.enable()
+			except ValueError:  # another profiler is running, e.g. another thread
+				return function(*args, **kwargs)
+			try:
+				return function(*args, **kwargs)
+			finally:
+				profile.disable()
+				with self._lock:
+					self.calls[name] = self.calls.get(name, 0) + 1
+					self.durations[name] = (
+						self.durations.get(name, 0.0) + time.perf_counter() - start
+					)
+		return profiled
 
-		Parameters:
-		specified_class (object) - the class that should be saved
-		name (string) - the filename
+	def dump(self):
+		"""dump() - Writes the current run and starts a new one.
+			Returns the directory of the run, or None if nothing was profiled.
 		"""
-		temp_file = open(name, "wb")
-		pickle.dump(specified_class, temp_file)
-		temp_file.close()
-		return True
+		if not self.calls:
+			return None
+		summary = self.summary()
+		with self._lock:
+			profiles = self.profiles
+			self.profiles = {}
+			self.calls = {}
+			self.durations = {}
+
+		run_directory = os.path.join(
+			self.directory, time.strftime("%Y_%m_%d_%H_%M_%S", time.gmtime())
+		)
+		suffix = 1
+		while os.path.exists(run_directory):
+			suffix += 1
+			run_directory = run_directory.rsplit("-", 1)[0] + "-" + str(suffix)
+		os.makedirs(run_directory)
+		for name, profile in profiles.items():
+			profile.dump_stats(os.path.join(run_directory, name + ".prof"))
+		summary_filename = os.path.join(run_directory, "summary.txt")
+		with open(summary_filename, "w", encoding="utf8") as summary_file:
+			summary_file.write(summary)
+		return run_directory
+
+	def summary(self):
+		"""summary() - Returns the summary of the current run as text."""
+		import pstats  # imported lazily, only needed when profiling
+
+		with self._lock:
+			profiles = list(self.profiles.items())
+			calls = dict(self.calls)
+			durations = dict(self.durations)
+
+		summary_text = "Parser methods:\n"
+		for name in sorted(durations, key=durations.get, reverse=True):
+			summary_text += "%-26s %8d calls %10.4fs\n" % (name, calls[name], durations[name])
+
+		steps = []
+		for name, profile in profiles:
+			for (filename, line, function), stat in pstats.Stats(profile).stats.items():
+				step = self._step(filename, function)
+				if step is not None:
+					steps.append((stat[2], stat[1], name, step, function, filename, line))
+		steps.sort(reverse=True)
+		summary_text += "\nHottest extraction steps (own time):\n"
+		for own_time, count, name, step, function, filename, line in steps[:self.top]:
+			where = function if filename == '~' else "%s (%s:%d)" % (
+				function, os.path.basename(filename), line
+			)
+			summary_text += "%-26s %-13s %8d calls %10.4fs  %s\n" % (
+				name, step, count, own_time, where
+			)
+		return summary_text
 
-	def file_to_class(self, name):
-		"""file_to_class(self, specified_class, name) - reads a class from a file.
-		Utilises the pickle module in order to read.
+	def _step(self, filename, function):
+		"""Returns the kind of an extraction step, or None for other calls."""
+		if os.sep + "bs4" + os.sep in filename:
+			return "BeautifulSoup"
+		if function.startswith("<method '") and "of 're." in function:
+			return "regex"
+		if os.sep + "re" + os.sep in filename or filename.endswith("re.py"):
+			return "regex"
+		if function.startswith("<method '") and "of 'str' objects" in function:
+			return "string"
+		return None
 
-		Parameters:
-		name (string) - the filename
-		"""
-		temp_file = open(name, "rb")
-		temp_pickle = pickle.load(temp_file)
-		temp_file.close()
-		return temp_pickle
 
+class SearchIndex:
+	"""SearchIndex - an inverted full-text index of announcements or events.
 
-class LibrusFetcher:
-	"""LibrusFetcher - a Librus web fetcher. Downloads the required webpages.
+	Description:
+	Texts are lowercased and stripped of Polish diacritics, so "wycieczka",
+	"Wycieczka" and "WYCIECZKĄ" all match "wycieczka". Every word of a query
+	matches the indexed words it's a prefix of, so "sprawdzian" finds
+	"sprawdzianu" and "sprawdzianem" too, and a document has to match every
+	word. Results are ranked by tf-idf.
+	Added documents are only tokenized by the first search after them,
+	so adding is cheap. state() and load(state) persist the index, for ex.
+	in the header of a record file.
 
 	Variables:
-	url_grades (string) - the URL to grades page on Librus.
+	documents (list) - the indexed items, by their document number.
+	keys (list) - stable keys of the items, by their document number.
+	postings (dictionary) - document numbers and counts of every word.
+		{word:{number:count}}
+
+	Functions:
+	add(key, item, texts) - Adds an item with its texts.
+	search(query, limit) - Returns [(score, item)] of the matching items,
+		the best first.
+	normalize(text) - Returns the words of a text, normalized.
+	state() - Returns the index as a JSON serializable dictionary.
+	load(state) - Loads a state of the index, for the items already added.
+	"""
+	diacritics = str.maketrans('ąćęłńóśźż', 'acelnoszz')
+
+	def __init__(self):
+		"""__init__() - Initializing method."""
+		self.documents = []
+		self.keys = []
+		self.postings = {}
+		self._numbers = {}
+		self._pending = []
+		self._words = None
+		self._weights = {}
+
+	def add(self, key, item, texts):
+		"""add(key, item, texts) - Adds an item with its texts. An item with
+			the same key as an indexed one replaces it in search results.
+
+		Parameters:
+		key (string) - a stable key of the item, for ex. its fingerprint.
+		item (object) - the item returned by search.
+		texts (list) - the texts of the item which are searched.
+		"""
+		number = self._numbers.get(key)
+		if number is not None:
+			self.documents[number] = item
+			return
+		self._numbers[key] = len(self.keys)
+		self.keys.append(key)
+		self.documents.append(item)
+		self._pending.append(texts)
+
+	def normalize(self, text):
+		"""normalize(text) - Returns the list of words of a text, lowercased
+			and without Polish diacritics. Numbers are separate words.
+
+		Parameters:
+		text (string) - the text.
+		"""
+		import re
+		return re.findall(r'[^\W\d_]+|\d+', str(text).lower().translate(self.diacritics))
+
+	def search(self, query, limit=None):
+		"""search(query, limit=None) - Returns a list of (score, item) pairs
+			of the items matching every word of the query, the best first.
+
+		Parameters:
+		query (string) - the searched words.
+
+		Keyword parameters:
+		limit (int) - the most results returned. (default all)
+		"""
+		import bisect
+		import heapq
+		import math
+		import operator
+		self._index_pending()
+		if self._words is None:
+			self._words = sorted(self.postings)
+		scores = None
+		for query_word in set(self.normalize(query)):
+			i = bisect.bisect_left(self._words, query_word)
+			j = i
+			while j < len(self._words) and self._words[j].startswith(query_word):
+				j += 1
+			word_scores = {}
+			for word in self._words[i:j]:
+				weights = self._weights.get(word)
+				if weights is None:
+					postings = self.postings[word]
+					idf = math.log(1 + len(self.documents) / len(postings))
+					weights = dict((number, count * idf) for number, count in postings.items())
+					self._weights[word] = weights
+				if j == i + 1:
+					word_scores = weights  # not modified below
+					break
+				for number, weight in weights.items():
+					word_scores[number] = word_scores.get(number, 0) + weight
+			if scores is None:
+				scores = word_scores
+			else:
+				if len(word_scores) < len(scores):
+					scores, word_scores = word_scores, scores
+				scores = dict(
+					(number, score + word_scores[number])
+					for number, score in scores.items() if number in word_scores
+				)
+			if not scores:
+				return []
+		if scores is None:
+			return []
+		if limit is None:
+			ranked = sorted(scores.items(), key=operator.itemgetter(1), reverse=True)
+		else:
+			ranked = heapq.nlargest(limit, scores.items(), key=operator.itemgetter(1))
+		return [(score, self.documents[number]) for number, score in ranked]
+
+	def state(self):
+		"""state() - Returns the index as a JSON serializable dictionary."""
+		self._index_pending()
+		postings = {}
+		for word, documents in self.postings.items():
+			flat = []
+			for number, count in documents.items():
+				flat.extend((number, count))
+			postings[word] = flat
+		return {'keys': self.keys, 'postings': postings}
+
+	def load(self, state):
+		"""load(state) - Loads a state of the index. Only the documents
+			already added are kept, so the state can be loaded after
+			restoring the items, skipping their tokenizing.
+
+		Parameters:
+		state (dictionary) - a state returned by state().
+		"""
+		renumbered = {}
+		for number, key in enumerate(state['keys']):
+			if key in self._numbers:
+				renumbered[number] = self._numbers[key]
+		if len(renumbered) != len(self.keys):
+			return  # the state doesn't cover every added item
+		postings = {}
+		for word, flat in state['postings'].items():
+			documents = {}
+			for i in range(0, len(flat), 2):
+				number = renumbered.get(flat[i])
+				if number is not None:
+					documents[number] = flat[i+1]
+			if documents:
+				postings[word] = documents
+		self.postings = postings
+		self._pending = []
+		self._words = None
+		self._weights = {}
+
+	def _index_pending(self):
+		"""Tokenizes the documents added since the last search."""
+		if not self._pending:
+			return
+		first = len(self.keys) - len(self._pending)
+		for number, texts in enumerate(self._pending, first):
+			counts = {}
+			for text in texts:
+				for word in self.normalize(text):
+					counts[word] = counts.get(word, 0) + 1
+			for word, count in counts.items():
+				self.postings.setdefault(word, {})[number] = count
+		self._pending = []
+		self._words = None
+		self._weights = {}
+
+
+class ParseCache:
+	"""ParseCache - a thread safe LRU cache of parsed values, keyed by
+		a hash of the page and the version of the parser.
+
+	Description:
+	Values are stored pickled, so every hit returns a fresh copy which can
+	be freely turned into (and modified by) Grade, Event etc. The version
+	of a parser is a hash of the code of its parse methods, so changing
+	the parser invalidates its cached values automatically.
+
+	Variables:
+	max_bytes (int) - the most bytes of pickled values kept. (default 16 MiB)
+	max_entries (int) - the most pages kept. (default 64)
+	entries (collections.OrderedDict) - pickled values from the least
+		to the most recently used. {(kind, version, page hash):bytes}
+	size (int) - bytes of pickled values kept.
+	hits (int) - number of lookups which found the page.
+	misses (int) - number of lookups which didn't.
+	metrics (Metrics) - where hits and misses go.
+
+	Functions:
+	get(parser, kind, html) - Returns the cached values of a page, or None.
+	put(parser, kind, html, values) - Caches the values of a page.
+	clear() - Empties the cache.
+	version_of(parser) - Returns the version of a parser.
+	"""
+	def __init__(self, max_bytes=16*1024*1024, max_entries=64):
+		"""__init__(max_bytes=16*1024*1024, max_entries=64) - Initializing method.
+
+		Keyword parameters:
+		max_bytes (int) - the most bytes of pickled values kept. (default 16 MiB)
+		max_entries (int) - the most pages kept. (default 64)
+		"""
+		self.max_bytes = max_bytes
+		self.max_entries = max_entries
+		self.entries = collections.OrderedDict()
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.metrics = Metrics()
+		self._versions = {}
+		self._lock = threading.Lock()
+
+	def get(self, parser, kind, html):
+		"""get(parser, kind, html) - Returns the cached values of a page,
+			or None.
+
+		Parameters:
+		parser (Parser) - the parser the values would come from.
+		kind (string) - the kind of the page, see Librus.kinds.
+		html (string) - the HTML of the page.
+		"""
+		key = self._key(parser, kind, html)
+		with self._lock:
+			data = self.entries.get(key)
+			if data is None:
+				self.misses += 1
+			else:
+				self.hits += 1
+				self.entries.move_to_end(key)
+		self.metrics.count('parse_cache', kind=kind, result='miss' if data is None else 'hit')
+		if data is None:
+			return None
+		return pickle.loads(data)
+
+	def put(self, parser, kind, html, values):
+		"""put(parser, kind, html, values) - Caches the values of a page,
+			evicting the least recently used pages above the limits.
+
+		Parameters:
+		parser (Parser) - the parser the values come from.
+		kind (string) - the kind of the page, see Librus.kinds.
+		html (string) - the HTML of the page.
+		values (object) - the parsed values.
+		"""
+		data = pickle.dumps(values, pickle.HIGHEST_PROTOCOL)
+		if len(data) > self.max_bytes:
+			return
+		key = self._key(parser, kind, html)
+		with self._lock:
+			if key in self.entries:
+				self.size -= len(self.entries.pop(key))
+			self.entries[key] = data
+			self.size += len(data)
+			while self.size > self.max_bytes or len(self.entries) > self.max_entries:
+				evicted_key, evicted = self.entries.popitem(last=False)
+				self.size -= len(evicted)
+
+	def clear(self):
+		"""clear() - Empties the cache."""
+		with self._lock:
+			self.entries.clear()
+			self.size = 0
+
+	def version_of(self, parser):
+		"""version_of(parser) - Returns the version of a parser, a hash of
+			the code of its class' parse methods.
+
+		Parameters:
+		parser (Parser) - the parser.
+		"""
+		parser_class = type(parser)
+		version = self._versions.get(parser_class)
+		if version is None:
+			import hashlib
+			import marshal
+			version_hash = hashlib.blake2b(digest_size=8)
+			for cls in parser_class.__mro__:
+				for name, function in sorted(vars(cls).items()):
+					if name.startswith('parse') and hasattr(function, '__code__'):
+						version_hash.update(name.encode('utf8'))
+						version_hash.update(marshal.dumps(function.__code__))
+			version = self._versions[parser_class] = version_hash.hexdigest()
+		return version
+
+	def _key(self, parser, kind, html):
+		"""Returns the key of a page."""
+		import hashlib
+		page_hash = hashlib.blake2b(html.encode('utf8'), digest_size=16).digest()
+		return (kind, self.version_of(parser), page_hash)
+
+
+class NullSpan:
+	"""NullSpan - the span returned by disabled Metrics. Does nothing."""
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exception_type, exception, traceback):
+		return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+	"""Span - times a block of code and emits the duration on exit.
+
+	Variables:
+	metrics (Metrics) - the Metrics the span emits into.
+	name (string) - the name of the span.
+	labels (dictionary) - the labels of the span.
+	start (float) - time.perf_counter() on enter.
+	"""
+	def __init__(self, metrics, name, labels):
+		self.metrics = metrics
+		self.name = name
+		self.labels = labels
+		self.start = 0.0
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, exception_type, exception, traceback):
+		labels = self.labels
+		if exception_type is not None:
+			labels = dict(labels, error=exception_type.__name__)
+		self.metrics.emit('span', self.name, time.perf_counter() - self.start, labels)
+		return False
+
+
+class Metrics:
+	"""Metrics - emits timing spans and counters into a pluggable sink.
+
+	Description:
+	Without a sink (the default) count does nothing and span returns
+	a shared NullSpan, so instrumented code costs a single attribute check.
+	A sink is any object with emit(record) and flush(), a record being
+	a dictionary {type, name, value, labels, time}, where type is 'counter'
+	or 'span' (value in seconds).
+
+	Variables:
+	sink (object) - where the records go, for ex. JsonLinesSink
+		or PrometheusSink. (default None)
+
+	Functions:
+	count(name, value=1, **labels) - Adds value to a counter.
+	span(name, **labels) - Returns a context manager timing its block.
+	emit(metric_type, name, value, labels) - Sends a record into the sink.
+	flush() - Flushes the sink.
+	"""
+	def __init__(self, sink=None):
+		"""__init__(sink=None) - Initializing method.
+
+		Keyword parameters:
+		sink (object) - where the records go. (default None)
+		"""
+		self.sink = sink
+
+	def count(self, name, value=1, **labels):
+		"""count(name, value=1, **labels) - Adds value to a counter.
+
+		Parameters:
+		name (string) - the name of the counter, for ex. logins.
+
+		Keyword parameters:
+		value (int) - how much is added. (default 1)
+		labels - labels of the counter, for ex. kind='grades'.
+		"""
+		if self.sink is not None:
+			self.emit('counter', name, value, labels)
+
+	def span(self, name, **labels):
+		"""span(name, **labels) - Returns a context manager timing its block.
+
+		Parameters:
+		name (string) - the name of the span, for ex. parse.
+
+		Keyword parameters:
+		labels - labels of the span, for ex. kind='grades'.
+		"""
+		if self.sink is None:
+			return NULL_SPAN
+		return Span(self, name, labels)
+
+	def emit(self, metric_type, name, value, labels):
+		"""emit(metric_type, name, value, labels) - Sends a record into the sink."""
+		if self.sink is not None:
+			self.sink.emit({
+				'type': metric_type, 'name': name, 'value': value,
+				'labels': labels, 'time': time.time()
+			})
+
+	def flush(self):
+		"""flush() - Flushes the sink."""
+		if self.sink is not None:
+			self.sink.flush()
+
+
+class JsonLinesSink:
+	"""JsonLinesSink - a metrics sink appending every record to a file
+		as a line of JSON.
+
+	Variables:
+	filename (string) - the file records are appended to.
+
+	Functions:
+	emit(record) - Appends a record.
+	flush() - Flushes the file.
+	close() - Closes the file.
+	"""
+	def __init__(self, filename):
+		"""__init__(filename) - Initializing method.
+
+		Parameters:
+		filename (string) - the file records are appended to.
+		"""
+		self.filename = filename
+		self._file = None
+		self._lock = threading.Lock()
+
+	def emit(self, record):
+		"""emit(record) - Appends a record."""
+		line = json.dumps(record, ensure_ascii=False) + "\n"
+		with self._lock:
+			if self._file is None:
+				self._file = open(self.filename, "a", encoding="utf8")
+			self._file.write(line)
+
+	def flush(self):
+		"""flush() - Flushes the file."""
+		with self._lock:
+			if self._file is not None:
+				self._file.flush()
+
+	def close(self):
+		"""close() - Closes the file."""
+		with self._lock:
+			if self._file is not None:
+				self._file.close()
+				self._file = None
+
+
+class PrometheusSink:
+	"""PrometheusSink - a metrics sink aggregating records and writing them
+		in the Prometheus text exposition format, for ex. for the textfile
+		collector of node_exporter.
+
+	Description:
+	Counters become librus_<name>_total, spans become a summary
+	librus_<name>_seconds with _sum and _count. The file is rewritten
+	atomically on every flush.
+
+	Variables:
+	filename (string) - the file the metrics are written to.
+	prefix (string) - the prefix of every metric name. (default librus_)
+	counters (dictionary) - {(name, labels):total}
+	spans (dictionary) - {(name, labels):[sum, count]}
+
+	Functions:
+	emit(record) - Aggregates a record.
+	flush() - Writes the file.
+	render() - Returns the metrics in the text exposition format.
+	"""
+	def __init__(self, filename, prefix="librus_"):
+		"""__init__(filename, prefix="librus_") - Initializing method.
+
+		Parameters:
+		filename (string) - the file the metrics are written to.
+
+		Keyword parameters:
+		prefix (string) - the prefix of every metric name. (default librus_)
+		"""
+		self.filename = filename
+		self.prefix = prefix
+		self.counters = {}
+		self.spans = {}
+		self._lock = threading.RLock()  # flush holds it while render takes it
+
+	def emit(self, record):
+		"""emit(record) - Aggregates a record."""
+		key = (record['name'], tuple(sorted(record['labels'].items())))
+		with self._lock:
+			if record['type'] == 'counter':
+				self.counters[key] = self.counters.get(key, 0) + record['value']
+			else:
+				span = self.spans.setdefault(key, [0.0, 0])
+				span[0] += record['value']
+				span[1] += 1
+
+	def flush(self):
+		"""flush() - Writes the file. Safe to call from many threads."""
+		import tempfile
+		with self._lock:
+			text = self.render()
+			descriptor, temp_filename = tempfile.mkstemp(
+				prefix=os.path.basename(self.filename) + ".",
+				suffix=".tmp", dir=os.path.dirname(self.filename) or None
+			)
+			try:
+				with os.fdopen(descriptor, "w", encoding="utf8") as temp_file:
+					temp_file.write(text)
+				os.chmod(temp_filename, 0o644)  # mkstemp makes it owner-only
+				os.replace(temp_filename, self.filename)
+			except BaseException:
+				os.unlink(temp_filename)
+				raise
+
+	def render(self):
+		"""render() - Returns the metrics in the text exposition format."""
+		def labels_text(labels):
+			if not labels:
+				return ""
+			return "{" + ",".join(
+				key + '="' + str(value).replace("\\", "\\\\").replace(
+					'"', '\\"'
+				).replace("\n", "\\n") + '"'
+				for key, value in labels
+			) + "}"
+
+		with self._lock:
+			counters = sorted(self.counters.items())
+			spans = sorted(self.spans.items())
+		lines = []
+		last_name = None
+		for (name, labels), total in counters:
+			metric = self.prefix + name + "_total"
+			if name != last_name:
+				lines.append("# TYPE " + metric + " counter")
+				last_name = name
+			lines.append(metric + labels_text(labels) + " " + repr(total))
+		last_name = None
+		for (name, labels), (total, count) in spans:
+			metric = self.prefix + name + "_seconds"
+			if name != last_name:
+				lines.append("# TYPE " + metric + " summary")
+				last_name = name
+			lines.append(metric + "_sum" + labels_text(labels) + " " + repr(total))
+			lines.append(metric + "_count" + labels_text(labels) + " " + repr(count))
+		return "\n".join(lines) + "\n"
+
+
+class RecordCodec:
+	"""RecordCodec - a versioned, schema-aware serializer for collections.
+		Stores records field by field instead of pickling whole objects,
+		so renaming or adding attributes doesn't break loading old files.
+
+	Description:
+	A file starts with a header: the magic bytes, the length of the schema
+	and the schema itself as JSON ({kind, version, fields}), followed by
+	the record count and the records. Every record is a struct-packed block
+	of its numeric fields and string lengths, followed by the UTF-8 strings.
+	Decoding uses the schema stored in the file, so a file written with an
+	older schema can be migrated with hooks registered by register_migration.
+
+	Variables:
+	magic (bytes) - the bytes every record file starts with.
+	schemas (dictionary) - current schema of every kind.
+		{kind:(version, [(field, type)])}
+		Types: i - int, f - float, ? - bool, s - string, j - JSON.
+	kinds (dictionary) - collection class of every kind.
+		{kind:collection_class}
+	meta (dictionary) - attributes of collections which are stored
+		in the header as JSON. {kind:[attribute]}
+	migrations (dictionary) - migration hooks.
+		{(kind, from_version):function(fields) -> fields}
+	librus (Librus) - Reference to the parent Librus object.
+		Set in Librus object during init.
+
+	Functions:
+	register_migration(kind, from_version, function) - registers a hook
+		turning a record of from_version into one of from_version+1.
+	kind_of(collection) - returns the kind of a collection.
+	encode(collection) - returns the bytes representation of a collection.
+	decode(data) - returns a collection decoded from bytes.
+	records(data) - returns the kind, schema and a generator of the records
+		of encoded bytes, without building a collection.
+	to_record(kind, item) - returns the record fields of an item.
+	from_record(kind, fields) - restores an item from record fields.
+	"""
+	magic = b'PLRC'
+	header = struct.Struct('<4sI')
+	count = struct.Struct('<I')
+
+	def __init__(self):
+		self.librus = None
+		self.schemas = {
+			'grades': (1, [
+				('grade_id', 'i'), ('grade_numtype', 'i'), ('grade_type', 's'),
+				('school_subject', 's'), ('grade_value', 's'),
+				('absolute_value', 'f'), ('date', 's'), ('day_of_the_week', 's'),
+				('category', 's'), ('weight', 'i'), ('teacher', 's'),
+				('calculate_towards_avg_grade', 'i'), ('added', 's'),
+				('description', 's')
+			]),
+			'events': (1, [
+				('description_additional', 's'), ('date', 's'), ('teacher', 's'),
+				('absence_period', 's'), ('day', 's'), ('month', 's'),
+				('year', 'i'), ('event_type', 's'), ('event_numtype', 'i'),
+				('description', 's'), ('event_id', 'i')
+			]),
+			'announcements': (1, [
+				('teacher', 's'), ('date', 's'), ('title', 's'), ('content', 's'),
+				('year', 's'), ('month', 's'), ('day', 's'), ('pseudo_time', 's')
+			]),
+			'attendance': (1, [
+				('attendance_type', 's'), ('attendance_numtype', 'i'),
+				('date', 's'), ('lesson', 's'), ('teacher', 's'),
+				('lesson_number', 'i'), ('school_trip', '?'),
+				('teacher_added', 's'), ('attendance_short_type', 's'),
+				('librus_id', 'i')
+			]),
+			'timetable': (1, [
+				('timetable', 'j')
+			])
+		}
+		self.kinds = {
+			'grades': GradeBook,
+			'events': EventCalendar,
+			'announcements': AnnouncementBoard,
+			'attendance': AttendanceTable,
+			'timetable': Timetable
+		}
+		self.meta = {
+			'grades': ['row_fingerprints'],
+			'events': ['search_terms'],
+			'announcements': ['fingerprints', 'search_terms']
+		}
+		self.migrations = {}
+		self._structs = {}
+
+	def register_migration(self, kind, from_version, function):
+		"""register_migration(kind, from_version, function) - registers a hook
+			turning a record of from_version into one of from_version+1.
+
+		Parameters:
+		kind (string) - the kind of the collection, for ex. grades.
+		from_version (int) - the schema version the hook migrates from.
+		function (function) - accepts and returns a dictionary of fields.
+		"""
+		self.migrations[(kind, from_version)] = function
+
+	def kind_of(self, collection):
+		"""kind_of(collection) - returns the kind of a collection.
+
+		Parameters:
+		collection (object) - GradeBook, EventCalendar, AnnouncementBoard,
+			AttendanceTable or Timetable.
+		"""
+		for kind in self.kinds:
+			if isinstance(collection, self.kinds[kind]):
+				return kind
+		raise TypeError('Unsupported collection - ' + type(collection).__name__)
+
+	def items_of(self, kind, collection):
+		"""items_of(kind, collection) - returns the records of a collection."""
+		if kind == 'grades':
+			return collection.grades
+		elif kind == 'events':
+			return collection.events
+		elif kind == 'announcements':
+			return collection.announcements
+		elif kind == 'attendance':
+			return collection.attendances
+		return [collection]
+
+	def encode(self, collection):
+		"""encode(collection) - returns the bytes representation of a collection.
+
+		Parameters:
+		collection (object) - the collection that should be encoded.
+		"""
+		kind = self.kind_of(collection)
+		version, fields = self.schemas[kind]
+		schema = {'kind': kind, 'version': version, 'fields': fields}
+		meta = dict(
+			(name, getattr(collection, name)) for name in self.meta.get(kind, ())
+			if getattr(collection, name, None)
+		)
+		if meta:
+			schema['meta'] = meta
+		schema = json.dumps(schema).encode('utf8')
+		packer = self._struct_for(fields)
+		types = [field_type for name, field_type in fields]
+		items = self.items_of(kind, collection)
+
+		chunks = [self.header.pack(self.magic, len(schema)), schema]
+		chunks.append(self.count.pack(len(items)))
+		for item in items:
+			record = self.to_record(kind, item)
+			fixed = []
+			strings = []
+			for value, field_type in zip(record, types):
+				if field_type in ('s', 'j'):
+					if field_type == 'j':
+						value = json.dumps(value)
+					value = value.encode('utf8')
+					strings.append(value)
+					fixed.append(len(value))
+				else:
+					fixed.append(value)
+			chunks.append(packer.pack(*fixed))
+			chunks.extend(strings)
+		return b''.join(chunks)
+
+	def decode(self, data):
+		"""decode(data) - returns a collection decoded from bytes.
+			Runs the registered migrations if the data uses an older schema.
+
+		Parameters:
+		data (bytes) - bytes returned by RecordCodec.encode.
+		"""
+		kind, schema, records = self.records(data)
+		collection = self.kinds[kind]()
+		for record in records:
+			self.add_restored(kind, collection, self.from_record(kind, record))
+		for name, value in schema.get('meta', {}).items():
+			setattr(collection, name, value)
+		return collection
+
+	def records(self, data):
+		"""records(data) - returns (kind, schema, records), where records is
+			a generator of the record fields in the order of the current
+			schema, decoded one at a time. Runs the registered migrations
+			if the data uses an older schema.
+
+		Parameters:
+		data (bytes) - bytes returned by RecordCodec.encode, or any buffer
+			holding them, like a mmap of a record file.
+		"""
+		magic, schema_length = self.header.unpack_from(data, 0)
+		if magic != self.magic:
+			raise ValueError('Not a record file - missing magic bytes.')
+		offset = self.header.size
+		schema = json.loads(data[offset:offset+schema_length].decode('utf8'))
+		offset += schema_length
+		kind = schema['kind']
+		version = schema['version']
+		fields = [tuple(field) for field in schema['fields']]
+		current_version, current_fields = self.schemas[kind]
+		if version > current_version:
+			raise ValueError(
+				'Record file of ' + kind + ' uses schema version ' + str(version) +
+				', newer than supported ' + str(current_version) + '.'
+			)
+		return kind, schema, self._records(
+			data, offset, kind, version, fields, current_fields
+		)
+
+	def _records(self, data, offset, kind, version, fields, current_fields):
+		"""Yields the records of data which start at offset."""
+		packer = self._struct_for(fields)
+		names = [name for name, field_type in fields]
+		types = [field_type for name, field_type in fields]
+		current_version = self.schemas[kind][0]
+		(records_count,) = self.count.unpack_from(data, offset)
+		offset += self.count.size
+
+		for _ in range(records_count):
+			fixed = packer.unpack_from(data, offset)
+			offset += packer.size
+			record = []
+			for value, field_type in zip(fixed, types):
+				if field_type in ('s', 'j'):
+					value, offset = data[offset:offset+value].decode('utf8'), offset+value
+					if field_type == 'j':
+						value = json.loads(value, object_hook=self._int_keys)
+				record.append(value)
+			if version != current_version:
+				record_fields = dict(zip(names, record))
+				for migrated_version in range(version, current_version):
+					migration = self.migrations.get((kind, migrated_version))
+					if migration is None:
+						raise ValueError(
+							'No migration of ' + kind + ' from schema version ' +
+							str(migrated_version) + '.'
+						)
+					record_fields = migration(record_fields)
+				record = [record_fields[name] for name, field_type in current_fields]
+			yield record
+
+	def add_restored(self, kind, collection, item):
+		"""add_restored(kind, collection, item) - adds a restored item."""
+		if kind == 'timetable':
+			collection.update([item])
+		else:
+			collection.add(item)
+
+	def to_record(self, kind, item):
+		"""to_record(kind, item) - returns the record fields of an item,
+			in the order of the current schema.
+
+		Parameters:
+		kind (string) - the kind of the collection.
+		item (object) - Grade, Event, Announcement, Attendance or Timetable.
+		"""
+		if kind == 'grades':
+			return [
+				item.grade_id, item.grade_numtype, item.grade_type,
+				item.school_subject, item.grade_value, float(item.absolute_value),
+				item.date, item.day_of_the_week, item.category, item.weight,
+				item.teacher, item.calculate_towards_avg_grade, item.added,
+				item.description
+			]
+		elif kind == 'events':
+			return [
+				item.description_additional, item.date, item.teacher,
+				item.absence_period, str(item.values[4]), item.month, item.year,
+				item.event_type, item.event_numtype, item.description, item.event_id
+			]
+		elif kind == 'announcements':
+			return [
+				item.teacher, item.date, item.title, item.content,
+				item.year, item.month, item.day, item.pseudo_time
+			]
+		elif kind == 'attendance':
+			return [
+				item.attendance_type, item.attendance_numtype, item.date,
+				item.lesson, item.teacher, item.lesson_number, item.school_trip,
+				item.teacher_added, item.attendance_short_type, item.librus_id
+			]
+		return [item.timetable]
+
+	def from_record(self, kind, record):
+		"""from_record(kind, record) - restores an item from record fields,
+			without running its __init__, update and derived computations.
+
+		Parameters:
+		kind (string) - the kind of the collection.
+		record (list) - fields in the order of the current schema.
+		"""
+		if kind == 'grades':
+			item = Grade.__new__(Grade)
+			(
+				item.grade_id, item.grade_numtype, item.grade_type,
+				item.school_subject, item.grade_value, absolute_value,
+				item.date, item.day_of_the_week, item.category, item.weight,
+				item.teacher, item.calculate_towards_avg_grade, item.added,
+				item.description
+			) = record
+			if absolute_value.is_integer():
+				absolute_value = int(absolute_value)
+			item.absolute_value = absolute_value
+			# values as Parser.parse_grade makes them: the weight is text and
+			# calculate_towards_avg_grade a bool, both -1 if there's no data
+			weight = item.weight if item.weight == -1 else str(item.weight)
+			towards_average = item.calculate_towards_avg_grade
+			if towards_average != -1:
+				towards_average = bool(towards_average)
+			item.values = [
+				str(item.grade_id), item.grade_numtype, item.grade_type,
+				item.school_subject, item.grade_value, item.date,
+				item.day_of_the_week, item.category, weight, item.teacher,
+				towards_average, item.added, item.description,
+				item.absolute_value
+			]
+		elif kind == 'events':
+			item = Event.__new__(Event)
+			(
+				item.description_additional, item.date, item.teacher,
+				item.absence_period, day, item.month, item.year, item.event_type,
+				item.event_numtype, item.description, item.event_id
+			) = record
+			item.day = int(day)
+			item.values = [
+				item.description_additional, item.date, item.teacher,
+				item.absence_period, day, item.month, str(item.year),
+				item.event_type, item.event_numtype, item.description,
+				str(item.event_id) if item.event_id else 0  # the parser's default
+			]
+		elif kind == 'announcements':
+			item = Announcement.__new__(Announcement)
+			(
+				item.teacher, item.date, item.title, item.content,
+				item.year, item.month, item.day, item.pseudo_time
+			) = record
+			item.values = list(record)
+		elif kind == 'attendance':
+			item = Attendance.__new__(Attendance)
+			(
+				item.attendance_type, item.attendance_numtype, item.date,
+				item.lesson, item.teacher, item.lesson_number, item.school_trip,
+				item.teacher_added, item.attendance_short_type, item.librus_id
+			) = record
+			item.values = [
+				item.attendance_type, item.attendance_numtype, item.date,
+				item.lesson, item.teacher, str(item.lesson_number),
+				{True: 'Tak', False: 'Nie'}[item.school_trip], item.teacher_added,
+				item.attendance_short_type, str(item.librus_id)
+			]
+		else:
+			item = record[0]
+		return item
+
+	def _struct_for(self, fields):
+		"""Returns (and caches) the struct packing the fixed part of a record."""
+		key = tuple(fields)
+		if key not in self._structs:
+			codes = {'i': 'q', 'f': 'd', '?': '?', 's': 'I', 'j': 'I'}
+			self._structs[key] = struct.Struct(
+				'<' + ''.join(codes[field_type] for name, field_type in fields)
+			)
+		return self._structs[key]
+
+	def _int_keys(self, dictionary):
+		"""Turns digit keys back into ints - JSON only allows string keys."""
+		return {
+			int(key) if key.isdigit() else key: value
+			for key, value in dictionary.items()
+		}
+
+
+class FileHandler:
+	"""FileHandler - a file handler. Handles all of file related stuff.
+
+	Variables:
+	librus (Librus) - Reference to the parent Librus object.
+		Set in Librus object during init.
+	record_codec (RecordCodec) - the codec used for saving collections.
+	directory (string) - the directory relative filenames are resolved in.
+		Lets several accounts keep separate files. (default "")
+	metrics (Metrics) - where timings and sizes of saved collections go.
+
+	Functions:
+	path(name) - returns the path of a file in the directory.
+	read_file(name, mode="r") - opens a file and returns its content.
+	save_file(name, content, mode="w") - opens a file and writes into it.
+	class_to_file(self, specified_class, name) - saves a class into a file.
+	file_to_class(self, specified_class, name) - reads a class from a file.
+	collection_to_file(collection, name) - saves a collection into a file.
+	file_to_collection(name) - reads a collection from a file.
+	"""
+	def __init__(self):
+		self.librus = None
+		self.record_codec = RecordCodec()
+		self.directory = ""
+		self.metrics = Metrics()
+
+	def path(self, name):
+		"""path(name) - returns the path of a file in the directory.
+
+		Parameters:
+		name (string) - the filename.
+		"""
+		return os.path.join(self.directory, name)
+
+	def read_file(self, name, mode="r"):
+		"""read_file(name) - opens a file and returns its content.
+
+		Parameters:
+		name (string) - the filename.
+
+		Keyword parameters:
+		mode (string) - the mode in which the file should be opened. (default r)
+		"""
+		tFile = open(self.path(name), mode, encoding="utf8")
+		tContent = tFile.readlines()
+		tFile.close()
+		return "/n".join(tContent)
+
+	def save_file(self, name, content, mode="w"):
+		"""save_file(name, content, mode="w") - opens a file and writes into it.
+
+		Parameters:
+		name (string) - the filename.
+		content (string) - the content which should be writed.
+
+		Keyword parameters:
+		mode (string) - the mode in which file should be opened. (default w)
+
+		"""
+		tFile = open(self.path(name), mode, encoding="utf8")
+		tFile.write(content)
+		tFile.close()
+		return True
+
+	def class_to_file(self, specified_class, name):
+		"""class_to_file(self, specified_class, name) - saves a class into a file.
+		Utilises the pickle module in order to save.
+
+		Parameters:
+		specified_class (object) - the class that should be saved
+		name (string) - the filename
+		"""
+		temp_file = open(self.path(name), "wb")
+		pickle.dump(specified_class, temp_file)
+		temp_file.close()
+		return True
+
+	def file_to_class(self, name):
+		"""file_to_class(self, specified_class, name) - reads a class from a file.
+		Utilises the pickle module in order to read.
+
+		Parameters:
+		name (string) - the filename
+		"""
+		temp_file = open(self.path(name), "rb")
+		temp_pickle = pickle.load(temp_file)
+		temp_file.close()
+		return temp_pickle
+
+	def collection_to_file(self, collection, name):
+		"""collection_to_file(collection, name) - saves a collection into a file.
+		Utilises the RecordCodec in order to save.
+
+		Parameters:
+		collection (object) - the collection that should be saved
+		name (string) - the filename
+		"""
+		kind = self.record_codec.kind_of(collection)
+		with self.metrics.span('persist', kind=kind):
+			data = self.record_codec.encode(collection)
+			temp_file = open(self.path(name), "wb")
+			temp_file.write(data)
+			temp_file.close()
+		self.metrics.count('persist_bytes', len(data), kind=kind)
+		return True
+
+	def file_to_collection(self, name):
+		"""file_to_collection(name) - reads a collection from a file.
+		Utilises the RecordCodec in order to read. Files pickled by older
+		versions are still read and their records re-added.
+
+		Parameters:
+		name (string) - the filename
+		"""
+		with self.metrics.span('restore'):
+			temp_file = open(self.path(name), "rb")
+			data = temp_file.read()
+			temp_file.close()
+			if data.startswith(RecordCodec.magic):
+				collection = self.record_codec.decode(data)
+			else:
+				collection = self._unpickle_collection(data)
+		self.metrics.count(
+			'restore_bytes', len(data), kind=self.record_codec.kind_of(collection)
+		)
+		return collection
+
+	def _unpickle_collection(self, data):
+		"""Reads a collection pickled by older versions, re-adding its records."""
+		temp_pickle = pickle.loads(data)
+		kind = self.record_codec.kind_of(temp_pickle)
+		collection = self.record_codec.kinds[kind]()
+		if kind == 'timetable':
+			collection.update([temp_pickle.timetable])
+		else:
+			for item in self.record_codec.items_of(kind, temp_pickle):
+				collection.add(item)
+		return collection
+
+
+class Exporter:
+	"""Exporter - writes collections as CSV, JSON Lines or Parquet.
+
+	Description:
+	Rows are written one at a time, Parquet ones in record batches of
+	batch_size, so exporting takes no more memory than a batch, whatever
+	the size of the source. A source is a collection or the name of a file
+	saved by FileHandler, like a snapshot in the storage directory. Record
+	files are read through a mmap and their records become rows directly,
+	without building Grade, Event... objects. Columns are typed after
+	RecordCodec.schemas, a timetable has a row per lesson.
+	Parquet requires the pyarrow package.
+
+	Variables:
+	formats (tuple) - the supported formats. (class)
+	timetable_columns (list) - the columns of timetable rows. (class)
+		[(column, type)]
+	file_handler (FileHandler) - resolves the file names and reads files.
+	batch_size (int) - rows per Parquet record batch. (default 65536)
+
+	Functions:
+	__init__(file_handler) - Initializing method.
+	columns(kind) - Returns the columns of a kind.
+	rows(source) - Returns the kind of a source and a generator of its rows.
+	export(source, name, file_format) - Writes a source into a file.
+	to_csv(source, name) - Writes a source into a CSV file.
+	to_jsonl(source, name) - Writes a source into a JSON Lines file.
+	to_parquet(source, name) - Writes a source into a Parquet file.
+	"""
+	formats = ('csv', 'jsonl', 'parquet')
+	timetable_columns = [
+		('date', 's'), ('day', 's'), ('lesson_number', 'i'), ('start', 's'),
+		('end', 's'), ('subject', 's'), ('teacher', 's'), ('numtype', 'i'),
+		('previous_subject', 's'), ('previous_teacher', 's'),
+		('new_subject', 's'), ('new_teacher', 's')
+	]
+
+	def __init__(self, file_handler=None):
+		"""__init__(file_handler=None) - Initializing method.
+
+		Keyword parameters:
+		file_handler (FileHandler) - resolves the file names and reads
+			files. (default a new FileHandler)
+		"""
+		self.file_handler = file_handler or FileHandler()
+		self.batch_size = 65536
+
+	def columns(self, kind):
+		"""columns(kind) - Returns the columns of a kind. [(column, type)]
+			Types: i - int, f - float, ? - bool, s - string.
+
+		Parameters:
+		kind (string) - the kind of the collection, see RecordCodec.kinds.
+		"""
+		if kind == 'timetable':
+			return self.timetable_columns
+		return self.file_handler.record_codec.schemas[kind][1]
+
+	def rows(self, source):
+		"""rows(source) - Returns (kind, rows), where rows is a generator
+			of the rows of the source, as lists in the order of columns(kind).
+
+		Parameters:
+		source (object/string) - a collection, or the name of a file saved
+			by FileHandler.
+		"""
+		import mmap
+		codec = self.file_handler.record_codec
+		if not isinstance(source, str):
+			kind = codec.kind_of(source)
+			if kind == 'timetable':
+				return kind, self._timetable_rows(source)
+			return kind, (codec.to_record(kind, item) for item in codec.items_of(kind, source))
+
+		with open(self.file_handler.path(source), "rb") as source_file:
+			if os.fstat(source_file.fileno()).st_size == 0:  # can't be mapped
+				raise ValueError('Empty file - ' + source + ', nothing to export.')
+			mapped = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+		if mapped[:len(RecordCodec.magic)] != RecordCodec.magic:
+			mapped.close()
+			return self.rows(self.file_handler.file_to_collection(source))
+		kind, schema, records = codec.records(mapped)
+		if kind == 'timetable':
+			timetable = codec.decode(mapped)
+			mapped.close()
+			return kind, self._timetable_rows(timetable)
+		return kind, self._mapped_rows(mapped, records)
+
+	def export(self, source, name, file_format=None):
+		"""export(source, name, file_format=None) - Writes the rows of a source
+			into a file. Returns the number of rows written.
+
+		Parameters:
+		source (object/string) - a collection, or the name of a file saved
+			by FileHandler.
+		name (string) - the name of the written file.
+
+		Keyword parameters:
+		file_format (string) - 'csv', 'jsonl' or 'parquet'.
+			(default the extension of name)
+		"""
+		if file_format is None:
+			file_format = os.path.splitext(name)[1][1:].lower()
+		if file_format not in self.formats:
+			raise ValueError(
+				"Invalid format - " + str(file_format) + ". Use 'csv', 'jsonl' or 'parquet'."
+			)
+		kind, rows = self.rows(source)
+		metrics = self.file_handler.metrics
+		with metrics.span('export', kind=kind, format=file_format):
+			written = getattr(self, '_write_' + file_format)(
+				self.columns(kind), rows, self.file_handler.path(name)
+			)
+		metrics.count('export_rows', written, kind=kind, format=file_format)
+		return written
+
+	def to_csv(self, source, name):
+		"""to_csv(source, name) - Writes a source into a CSV file, with
+			a header row. Returns the number of rows written.
+
+		Parameters:
+		source (object/string) - a collection, or the name of a file saved
+			by FileHandler.
+		name (string) - the name of the written file.
+		"""
+		return self.export(source, name, 'csv')
+
+	def to_jsonl(self, source, name):
+		"""to_jsonl(source, name) - Writes a source into a JSON Lines file,
+			an object per row. Returns the number of rows written.
+
+		Parameters:
+		source (object/string) - a collection, or the name of a file saved
+			by FileHandler.
+		name (string) - the name of the written file.
+		"""
+		return self.export(source, name, 'jsonl')
+
+	def to_parquet(self, source, name):
+		"""to_parquet(source, name) - Writes a source into a Parquet file.
+			Requires pyarrow. Returns the number of rows written.
+
+		Parameters:
+		source (object/string) - a collection, or the name of a file saved
+			by FileHandler.
+		name (string) - the name of the written file.
+		"""
+		return self.export(source, name, 'parquet')
+
+	def _mapped_rows(self, mapped, records):
+		"""Yields the records of a mmap of a record file, then closes it."""
+		try:
+			yield from records
+		finally:
+			mapped.close()
+
+	def _timetable_rows(self, timetable):
+		"""Yields a row of every lesson of a timetable."""
+		for day, date, lessons_day in zip(timetable.days, timetable.dates, timetable.grid):
+			for number in timetable.numbers:
+				start, end = timetable.hours[number]
+				for lesson in lessons_day[number]:
+					yield [
+						date, day, number, start, end, lesson.subject,
+						lesson.teacher, lesson.numtype, lesson.previous_subject,
+						lesson.previous_teacher, lesson.new_subject, lesson.new_teacher
+					]
+
+	def _write_csv(self, columns, rows, path):
+		"""Writes rows into a CSV file, returns their number."""
+		import csv
+		written = 0
+		with open(path, "w", encoding="utf8", newline="") as output_file:
+			writer = csv.writer(output_file)
+			writer.writerow([name for name, column_type in columns])
+			for row in rows:
+				writer.writerow(row)
+				written += 1
+		return written
+
+	def _write_jsonl(self, columns, rows, path):
+		"""Writes rows into a JSON Lines file, returns their number."""
+		names = [name for name, column_type in columns]
+		written = 0
+		with open(path, "w", encoding="utf8") as output_file:
+			for row in rows:
+				output_file.write(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n")
+				written += 1
+		return written
+
+	def _write_parquet(self, columns, rows, path):
+		"""Writes rows into a Parquet file in batches, returns their number."""
+		try:
+			import pyarrow  # optional dependency, only needed for Parquet
+			import pyarrow.parquet
+		except ImportError:
+			raise ImportError(
+				'Exporting to Parquet requires the pyarrow package - '
+				'pip install pyarrow'
+			)
+		types = {
+			'i': pyarrow.int64(), 'f': pyarrow.float64(),
+			'?': pyarrow.bool_(), 's': pyarrow.string()
+		}
+		schema = pyarrow.schema([
+			(name, types[column_type]) for name, column_type in columns
+		])
+		written = 0
+		with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+			batch = []
+			for row in rows:
+				batch.append(row)
+				if len(batch) == self.batch_size:
+					self._write_batch(writer, schema, batch)
+					written += len(batch)
+					batch = []
+			if batch:
+				self._write_batch(writer, schema, batch)
+				written += len(batch)
+		return written
+
+	def _write_batch(self, writer, schema, batch):
+		"""Writes a list of rows as a Parquet record batch."""
+		import pyarrow
+		arrays = [
+			pyarrow.array([row[i] for row in batch], type=field.type)
+			for i, field in enumerate(schema)
+		]
+		writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+
+
+class RateLimiter:
+	"""RateLimiter - a thread safe limiter of requests per second,
+		both globally and per host.
+
+	Variables:
+	global_rate (float) - requests per second allowed in total.
+		None means no limit.
+	host_rate (float) - requests per second allowed per host.
+		None means no limit.
+	requests (dictionary) - number of acquired requests per host.
+		{host:count}
+
+	Functions:
+	acquire(host) - Waits until a request to the host is allowed.
+	"""
+	def __init__(self, global_rate=None, host_rate=None):
+		"""__init__(global_rate=None, host_rate=None) - Initializing method.
+
+		Keyword parameters:
+		global_rate (float) - requests per second in total. (default None)
+		host_rate (float) - requests per second per host. (default None)
+		"""
+		self.global_rate = global_rate
+		self.host_rate = host_rate
+		self.requests = {}
+		self._next_global = 0.0
+		self._next_host = {}
+		self._lock = threading.Lock()
+
+	def acquire(self, host):
+		"""acquire(host) - Reserves the next free slot for a request to
+			the host and waits until it comes.
+
+		Parameters:
+		host (string) - the requested host.
+		"""
+		with self._lock:
+			now = time.monotonic()
+			slot = max(now, self._next_global, self._next_host.get(host, 0.0))
+			if self.global_rate:
+				self._next_global = slot + 1.0 / self.global_rate
+			if self.host_rate:
+				self._next_host[host] = slot + 1.0 / self.host_rate
+			self.requests[host] = self.requests.get(host, 0) + 1
+		if slot > now:
+			time.sleep(slot - now)
+
+
+class CircuitOpenError(Exception):
+	"""CircuitOpenError - raised instead of sending a request while
+		the circuit of its host and account is open.
+	"""
+
+
+class CircuitBreaker:
+	"""CircuitBreaker - a thread safe circuit breaker per host and account.
+
+	Description:
+	After failure_threshold failures in a row the circuit of a key opens
+	and every request fails fast with CircuitOpenError. After reset_timeout
+	seconds a single trial request is let through (half-open), which
+	closes the circuit on success and opens it again on failure.
+
+	Variables:
+	failure_threshold (int) - failures in a row which open the circuit.
+	reset_timeout (float) - seconds the circuit stays open.
+	failures (dictionary) - failures in a row per key. {key:count}
+	opened (dictionary) - when the circuits were opened. {key:time}
+	clock (function) - returns the current time. (default time.monotonic)
+
+	Functions:
+	before(key) - Checks whether a request may be sent. Returns the state.
+	success(key) - Records a success. Returns the previous state.
+	failure(key) - Records a failure. Returns the new state.
+	state(key) - Returns the state of a circuit: closed, open or half-open.
+	"""
+	def __init__(self, failure_threshold=5, reset_timeout=60.0):
+		"""__init__(failure_threshold=5, reset_timeout=60.0) - Initializing method.
+
+		Keyword parameters:
+		failure_threshold (int) - failures in a row which open the circuit.
+			(default 5)
+		reset_timeout (float) - seconds the circuit stays open. (default 60.0)
+		"""
+		self.failure_threshold = failure_threshold
+		self.reset_timeout = reset_timeout
+		self.failures = {}
+		self.opened = {}
+		self.clock = time.monotonic
+		self._trials = set()
+		self._lock = threading.Lock()
+
+	def before(self, key):
+		"""before(key) - Checks whether a request may be sent.
+			Returns the state, raises CircuitOpenError if it's open.
+
+		Parameters:
+		key (tuple) - the (host, account) of the request.
+		"""
+		with self._lock:
+			opened = self.opened.get(key)
+			if opened is None:
+				return 'closed'
+			if self.clock() - opened < self.reset_timeout or key in self._trials:
+				raise CircuitOpenError(
+					'Circuit open for ' + str(key[0]) + ', failing fast.'
+				)
+			self._trials.add(key)
+			return 'half-open'
+
+	def success(self, key):
+		"""success(key) - Records a success, closing the circuit.
+			Returns the previous state.
+
+		Parameters:
+		key (tuple) - the (host, account) of the request.
+		"""
+		with self._lock:
+			state = self._state(key)
+			self.failures.pop(key, None)
+			self.opened.pop(key, None)
+			self._trials.discard(key)
+		return state
+
+	def failure(self, key):
+		"""failure(key) - Records a failure. Returns the new state.
+
+		Parameters:
+		key (tuple) - the (host, account) of the request.
+		"""
+		with self._lock:
+			self.failures[key] = self.failures.get(key, 0) + 1
+			if key in self._trials or self.failures[key] >= self.failure_threshold:
+				self._trials.discard(key)
+				self.opened[key] = self.clock()
+			return self._state(key)
+
+	def state(self, key):
+		"""state(key) - Returns the state of a circuit: closed, open
+			or half-open.
+
+		Parameters:
+		key (tuple) - the (host, account) of the request.
+		"""
+		with self._lock:
+			return self._state(key)
+
+	def _state(self, key):
+		"""Returns the state of a circuit, the lock has to be held."""
+		if key in self._trials:
+			return 'half-open'
+		if key in self.opened:
+			return 'open'
+		return 'closed'
+
+
+class SessionStore:
+	"""SessionStore - keeps the cookies of logged in sessions between runs,
+		encrypted with Fernet, one file per account.
+
+	Description:
+	Requires the cryptography package. Every account gets its own key,
+	derived from the secret and the login, and its own file, named after
+	a keyed hash of the login. The secret is taken from the key argument,
+	the PYLIBRUS_SESSION_KEY environment variable or the "key" file in
+	the directory, which is created (readable by the owner only) if needed.
+
+	Variables:
+	directory (string) - the directory the sessions are saved in.
+	max_age (int) - seconds after which a saved session is ignored,
+		None means the probe decides. (default None)
+
+	Functions:
+	save(login, cookies) - Saves the cookies of an account.
+	load(login) - Returns the saved cookies of an account, or None.
+	delete(login) - Deletes the saved cookies of an account.
+	path(login) - Returns the path of an account's file.
+	"""
+	def __init__(self, directory="sessions", key=None, max_age=None):
+		"""__init__(directory="sessions", key=None, max_age=None) -
+			Initializing method.
+
+		Keyword parameters:
+		directory (string) - the directory the sessions are saved in.
+			(default sessions)
+		key (string) - the secret the keys are derived from.
+			(default PYLIBRUS_SESSION_KEY or the key file)
+		max_age (int) - seconds after which a saved session is ignored.
+			(default None)
+		"""
+		try:
+			import cryptography.fernet  # noqa: F401 - optional dependency
+		except ImportError:
+			raise ImportError(
+				'SessionStore requires the cryptography package - '
+				'pip install cryptography'
+			)
+		import hashlib  # imported lazily, only needed for sessions
+		self.directory = directory
+		self.max_age = max_age
+		os.makedirs(directory, exist_ok=True)
+		if key is None:
+			key = os.environ.get('PYLIBRUS_SESSION_KEY') or self._key_file()
+		if isinstance(key, str):
+			key = key.encode('utf8')
+		self._secret = hashlib.blake2b(key).digest()
+
+	def save(self, login, cookies):
+		"""save(login, cookies) - Saves the cookies of an account.
+
+		Parameters:
+		login (string) - login to Librus.
+		cookies (http.cookiejar.CookieJar) - the cookies of a logged in session.
+		"""
+		data = json.dumps([
+			{
+				'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+				'path': cookie.path, 'expires': cookie.expires, 'secure': cookie.secure
+			}
+			for cookie in cookies
+		]).encode('utf8')
+		temp_filename = self.path(login) + ".tmp"
+		descriptor = os.open(temp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+		with os.fdopen(descriptor, "wb") as temp_file:
+			temp_file.write(self._fernet(login).encrypt(data))
+		os.replace(temp_filename, self.path(login))
+
+	def load(self, login):
+		"""load(login) - Returns the saved cookies of an account as a list
+			of dictionaries, or None if there are none, they're older
+			than max_age or can't be decrypted.
+
+		Parameters:
+		login (string) - login to Librus.
+		"""
+		import cryptography.fernet
+		try:
+			temp_file = open(self.path(login), "rb")
+		except FileNotFoundError:
+			return None
+		token = temp_file.read()
+		temp_file.close()
+		try:
+			data = self._fernet(login).decrypt(token, ttl=self.max_age)
+		except cryptography.fernet.InvalidToken:
+			return None
+		cookies = json.loads(data.decode('utf8'))
+		now = time.time()
+		return [
+			cookie for cookie in cookies
+			if cookie['expires'] is None or cookie['expires'] > now
+		] or None
+
+	def delete(self, login):
+		"""delete(login) - Deletes the saved cookies of an account.
+
+		Parameters:
+		login (string) - login to Librus.
+		"""
+		try:
+			os.remove(self.path(login))
+		except FileNotFoundError:
+			pass
+
+	def path(self, login):
+		"""path(login) - Returns the path of an account's file.
+
+		Parameters:
+		login (string) - login to Librus.
+		"""
+		import hashlib
+		name = hashlib.blake2b(
+			login.encode('utf8'), key=self._secret, digest_size=16, person=b'file'
+		).hexdigest()
+		return os.path.join(self.directory, name + ".session")
+
+	def _fernet(self, login):
+		"""Returns the Fernet of an account."""
+		import base64
+		import hashlib
+		import cryptography.fernet
+		key = hashlib.blake2b(
+			login.encode('utf8'), key=self._secret, digest_size=32, person=b'key'
+		).digest()
+		return cryptography.fernet.Fernet(base64.urlsafe_b64encode(key))
+
+	def _key_file(self):
+		"""Returns the secret from the key file, creating it if needed."""
+		import cryptography.fernet
+		filename = os.path.join(self.directory, "key")
+		try:
+			descriptor = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+		except FileExistsError:
+			temp_file = open(filename, "rb")
+			key = temp_file.read().strip()
+			temp_file.close()
+			return key
+		key = cryptography.fernet.Fernet.generate_key()
+		with os.fdopen(descriptor, "wb") as temp_file:
+			temp_file.write(key)
+		return key
+
+
+class LibrusFetcher:
+	"""LibrusFetcher - a Librus web fetcher. Downloads the required webpages.
+
+	Variables:
+	url_grades (string) - the URL to grades page on Librus.
 	url_events (string) - the URL to events page on Librus.
 	url_login (string) - the URL to login page on Librus.
 	url_announcements (string) - the URL to announcements page on Librus.
 	url_attendance (string) - the URL to attendance page on Librus.
 	url_timetable (string) - the URL to timetable page on Librus.
+	url_probe (string) - the URL requested to check a restored session.
 	headers (dictionary) - headers used in page request.
 	payload (dictionary) - POST data used in initial login.
 	cookies (dictionary) - cookies used in initial login.
+	login_delay (float) - seconds waited after logging in. (default 2)
+	adapter (requests.adapters.HTTPAdapter) - an adapter shared by
+		every session, so they share its connection pool. (default None)
+	rate_limiter (RateLimiter) - limits the rate of requests. (default None)
+	metrics (Metrics) - where logins, latencies and sizes of requests go.
+	session_store (SessionStore) - keeps logged in sessions between runs,
+		so a still valid session skips logging in. (default None)
+	timeout (tuple) - (connect, read) timeouts of requests in seconds.
+		(default (5, 30))
+	retries (int) - how many times a failed GET (or the events POST)
+		is retried. Logins are never retried. (default 3)
+	backoff (float) - seconds before the first retry, doubled with every
+		next one. (default 0.5)
+	max_backoff (float) - the longest wait between retries. (default 8)
+	retry_statuses (tuple) - HTTP statuses which are retried.
+		(default (500, 502, 503, 504))
+	circuit_breaker (CircuitBreaker) - fails fast while Librus is down,
+		per host and account. None disables it. (default CircuitBreaker())
 	librus (Librus) - Reference to the parent Librus object.
 		Set in Librus object during init.
 
 	Functions:
-	fetch_grades(login, password) - fetches grades
-		and returns the HTML.
+	new_session() - returns a new session with its own cookie jar.
+	close_session(session) - closes a session.
+	request(session, method, url, account, retry, **kwargs) - sends
+		a rate limited request, retrying it if it fails.
+	retry_delay(attempt) - returns the seconds to wait before a retry.
+	login_session(session, login, password) - logs the session in.
+	restore_session(session, login) - restores a saved logged in session.
+	fetch_grades(login, password) - fetches grades
+		and returns the HTML.
+	fetch_page(login, password, url) - fetches a page from librus
+		and returns the HTML.
+	fetch_announcements(login, password) - fetches announcements
+		and returns the HTML.
+	fetch_events(login, password, month, year) - fetches events
+		and returns the HTML.
+	fetch_attendance(login, password) - fetches attendance
+		and returns the HTML.
+	fetch_timetable(login, password, week) - fetches timetable
+		and returns the HTML.
+	fetch_timetables(login, password, weeks, workers) - fetches timetables
+		of many weeks at once. Returns {week:HTML}.
+	week_range(week) - returns the first and the last day of a week.
+	"""
+	def __init__(self):
+		"""__init__() - Initialize the class by declaring variables."""
+		self.librus = None
+		self.url_grades = 'https://synergia.librus.pl/przegladaj_oceny/uczen'
+		self.url_events = 'https://synergia.librus.pl/terminarz'
+		self.url_login = 'https://synergia.librus.pl/loguj'
+		self.url_announcements = 'https://synergia.librus.pl/ogloszenia'
+		self.url_attendance = 'https://synergia.librus.pl/przegladaj_nb/uczen'
+		self.url_timetable = 'https://synergia.librus.pl/przegladaj_plan_lekcji'
+		self.url_probe = 'https://synergia.librus.pl/uczen/index'
+
+		useragent = 'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36'
+		useragent += '(KHTML, like Gecko) Chrome/47.0.2526.106 Safari/537.36'
+		self.headers = {
+			'User-Agent': useragent,
+			'Content-Type': 'application/x-www-form-urlencoded',
+			'Referer': 'https://synergia.librus.pl/loguj',
+			'Accept-Encoding': 'gzip, deflate',
+			'Connection': 'keep-alive'
+		}
+		self.payload = {
+			'login': '',
+			'passwd': '',
+			'ed_pass_keydown': '',
+			'ed_pass_keyup': '',
+			'captcha': '',
+			'jest_captcha': '1',
+			'czy_js': '2'
+		}
+
+		self.cookies = {
+			'_ga': 'GA1.2.2085668300.1439744410',
+			'TestCookie': '1'
+		}
+		self.login_delay = 2
+		self.adapter = None
+		self.rate_limiter = None
+		self.metrics = Metrics()
+		self.session_store = None
+		self.timeout = (5, 30)
+		self.retries = 3
+		self.backoff = 0.5
+		self.max_backoff = 8
+		self.retry_statuses = (500, 502, 503, 504)
+		self.circuit_breaker = CircuitBreaker()
+
+	def new_session(self):
+		"""new_session() - returns a new requests.Session with its own
+			cookie jar, using the shared adapter if one is set.
+		"""
+		import requests  # imported lazily, cache-only use doesn't need it
+		session = requests.Session()
+		if self.adapter is not None:
+			session.mount('https://', self.adapter)
+			session.mount('http://', self.adapter)
+		return session
+
+	def close_session(self, session):
+		"""close_session(session) - closes a session. A shared adapter is left
+			open, as other sessions keep using its connection pool.
+
+		Parameters:
+		session (requests.Session) - the session returned by new_session.
+		"""
+		if self.adapter is None:
+			session.close()
+
+	def request(self, session, method, url, account=None, retry=None, **kwargs):
+		"""request(session, method, url, account=None, retry=None, **kwargs) -
+			sends a request through the session, waiting for the rate limiter
+			first. Connection errors, timeouts and retry_statuses are retried
+			with exponential backoff if retry is set. Returns the response,
+			raises CircuitOpenError while the circuit is open.
+
+		Parameters:
+		session (requests.Session) - the session used for the request.
+		method (string) - the HTTP method, for ex. GET.
+		url (string) - the requested URL.
+
+		Keyword parameters:
+		account (string) - the login the request is sent for, the circuit
+			breaker keeps a circuit per host and account. (default None)
+		retry (bool) - whether the request is retried. (default only GETs)
+		"""
+		import requests
+		if retry is None:
+			retry = method.upper() == 'GET'
+		kwargs.setdefault('timeout', self.timeout)
+		split_url = urllib.parse.urlsplit(url)
+		key = (split_url.hostname, account)
+		attempts = self.retries + 1 if retry else 1
+		for attempt in range(attempts):
+			self._before_request(key)
+			try:
+				if self.rate_limiter is not None:
+					self.rate_limiter.acquire(key[0])
+				response = self._send(session, method, url, split_url.path, **kwargs)
+			except (requests.ConnectionError, requests.Timeout) as exception:
+				self._after_request(key, True)
+				if attempt == attempts - 1:
+					raise
+				reason = type(exception).__name__
+			except BaseException:
+				# any other error, so a half-open circuit's trial isn't left taken
+				self._after_request(key, True)
+				raise
+			else:
+				failed = response.status_code in self.retry_statuses
+				self._after_request(key, failed)
+				if not failed or attempt == attempts - 1:
+					return response
+				reason = str(response.status_code)
+			self.metrics.count('http_retries', path=split_url.path, reason=reason)
+			time.sleep(self.retry_delay(attempt))
+
+	def retry_delay(self, attempt):
+		"""retry_delay(attempt) - returns the seconds to wait before a retry.
+
+		Parameters:
+		attempt (int) - the number of the failed attempt, starting at 0.
+		"""
+		return min(self.max_backoff, self.backoff * 2 ** attempt)
+
+	def _send(self, session, method, url, path, **kwargs):
+		"""Sends a single request through the session, recording its metrics."""
+		if self.metrics.sink is None:
+			return session.request(method, url, **kwargs)
+
+		with self.metrics.span('http_request', method=method, path=path):
+			response = session.request(method, url, **kwargs)
+		self.metrics.count(
+			'http_requests', method=method, path=path, status=response.status_code
+		)
+		self.metrics.count('http_response_bytes', len(response.content), path=path)
+		return response
+
+	def _before_request(self, key):
+		"""Asks the circuit breaker whether a request may be sent."""
+		if self.circuit_breaker is not None:
+			try:
+				if self.circuit_breaker.before(key) == 'half-open':
+					self.metrics.count('circuit_breaker', host=key[0], state='half-open')
+			except CircuitOpenError:
+				self.metrics.count('circuit_breaker_rejections', host=key[0])
+				raise
+
+	def _after_request(self, key, failed):
+		"""Tells the circuit breaker how a request went."""
+		if self.circuit_breaker is None:
+			return
+		if failed:
+			if self.circuit_breaker.failure(key) == 'open':
+				self.metrics.count('circuit_breaker', host=key[0], state='open')
+		elif self.circuit_breaker.success(key) != 'closed':
+			self.metrics.count('circuit_breaker', host=key[0], state='closed')
+
+	def login_session(self, session, login, password):
+		"""login_session(session, login, password) - logs the session in.
+			Restores a saved session instead if there's a session_store
+			and the session is still valid.
+
+		Parameters:
+		session (requests.Session) - the session which should be logged in.
+		login (string) - login for librus
+		password (string) - password for librus
+		"""
+		if self.session_store is not None and self.restore_session(session, login):
+			return
+
+		payload = dict(self.payload)
+		payload['login'] = login
+		payload['passwd'] = password
+		self.request(
+			session, 'POST', self.url_login, account=login,
+			data=payload, headers=self.headers,
+			cookies=self.cookies
+		)
+		self.metrics.count('logins')
+		time.sleep(self.login_delay)
+		if self.session_store is not None:
+			self.session_store.save(login, session.cookies)
+
+	def restore_session(self, session, login):
+		"""restore_session(session, login) - restores the saved cookies of
+			an account into the session and checks them with a request
+			to url_probe. Returns True if the session is logged in.
+
+		Parameters:
+		session (requests.Session) - the session which should be logged in.
+		login (string) - login for librus
+		"""
+		cookies = self.session_store.load(login)
+		if not cookies:
+			return False
+		for cookie in cookies:
+			session.cookies.set(
+				cookie['name'], cookie['value'], domain=cookie['domain'],
+				path=cookie['path'], expires=cookie['expires'], secure=cookie['secure']
+			)
+		response = self.request(
+			session, 'GET', self.url_probe, account=login,
+			headers=self.headers, allow_redirects=False
+		)
+		if response.status_code == 200:
+			self.metrics.count('session_restores', result='valid')
+			return True
+		self.metrics.count('session_restores', result='expired')
+		session.cookies.clear()
+		self.session_store.delete(login)
+		return False
+
+	def fetch_page(self, login, password, url):
+		"""fetch_page(login, password, url) - fetches a page from librus
+			and returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		url (string) - url for the page
+		"""
+		session = self.new_session()
+		try:
+			self.login_session(session, login, password)
+			response = self.request(
+				session, 'GET', url, account=login, headers=self.headers
+			)
+		finally:
+			self.close_session(session)
+		return response.text
+
+	def fetch_announcements(self, login, password):
+		"""fetch_announcements(login, password) - fetches announcements and
+			returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		"""
+		return self.fetch_page(login, password, self.url_announcements)
+
+	def fetch_grades(self, login, password):
+		"""fetch_grades(login, password) - fetches grades and returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		"""
+		return self.fetch_page(login, password, self.url_grades)
+
+	def fetch_attendance(self, login, password):
+		"""fetch_attendance(login, password) - fetches grades and
+			returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		"""
+		return self.fetch_page(login, password, self.url_attendance)
+
+	def fetch_timetable(self, login, password, week=None):
+		"""fetch_timetable(login, password, week=None) - fetches timetable
+			and returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+
+		Keyword parameters:
+		week (string) - any day of the week, YYYY-MM-DD.
+			(default the week Librus shows)
+		"""
+		if week is None:
+			return self.fetch_page(login, password, self.url_timetable)
+		session = self.new_session()
+		try:
+			self.login_session(session, login, password)
+			response = self._fetch_week(session, login, week)
+		finally:
+			self.close_session(session)
+		return response.text
+
+	def fetch_timetables(self, login, password, weeks, workers=4):
+		"""fetch_timetables(login, password, weeks, workers=4) - fetches
+			timetables of many weeks at once, logging in only once.
+			Returns a dictionary {week:HTML}.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		weeks (list) - any day of every week, YYYY-MM-DD.
+
+		Keyword parameters:
+		workers (int) - how many weeks are fetched at once. (default 4)
+		"""
+		import concurrent.futures
+		session = self.new_session()
+		worker_sessions = []
+		local = threading.local()
+		lock = threading.Lock()
+
+		def fetch_week(week):
+			# sessions aren't thread safe, every worker gets its own one
+			# with a copy of the logged in cookies
+			if not hasattr(local, 'session'):
+				local.session = self.new_session()
+				with lock:
+					local.session.cookies.update(session.cookies)
+					worker_sessions.append(local.session)
+			return self._fetch_week(local.session, login, week)
+
+		try:
+			self.login_session(session, login, password)
+			with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+				responses = list(executor.map(fetch_week, weeks))
+		finally:
+			for worker_session in worker_sessions:
+				self.close_session(worker_session)
+			self.close_session(session)
+		return dict((week, response.text) for week, response in zip(weeks, responses))
+
+	def week_range(self, week):
+		"""week_range(week) - returns the first (monday) and the last (sunday)
+			day of a week, as YYYY-MM-DD strings.
+
+		Parameters:
+		week (string) - any day of the week, YYYY-MM-DD.
+		"""
+		import datetime
+		day = datetime.date(*[int(part) for part in week.split('-')])
+		monday = day - datetime.timedelta(days=day.weekday())
+		return monday.isoformat(), (monday + datetime.timedelta(days=6)).isoformat()
+
+	def _week_payload(self, week):
+		"""Returns the headers and the form choosing a week of the timetable."""
+		mini_headers = dict(self.headers)
+		mini_headers['Referer'] = self.url_timetable
+		mini_headers['Origin'] = 'https://synergia.librus.pl'
+		return mini_headers, {'tydzien': '_'.join(self.week_range(week))}
+
+	def _fetch_week(self, session, login, week):
+		"""Fetches the timetable of a week with a logged in session."""
+		mini_headers, mini_payload = self._week_payload(week)
+		return self.request(
+			session, 'POST', self.url_timetable, account=login, retry=True,
+			headers=mini_headers,
+			data=mini_payload
+		)
+
+	def fetch_events(self, login, password, month, year):
+		"""fetch_events(login, password, month, year)
+			fetches events and returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		month (string) - specified month, 1-12 without prequeling zero
+			for ex. 1 instead of 01
+		year (string) - specified year in a YYYY format
+		"""
+		session = self.new_session()
+		try:
+			self.login_session(session, login, password)
+
+			mini_headers = dict(self.headers)
+			mini_headers['Referer'] = 'https://synergia.librus.pl/terminarz'
+			mini_headers['Origin'] = 'https://synergia.librus.pl'
+			mini_payload = {'miesiac': month, 'rok': year}
+
+			response = self.request(
+				session, 'POST', self.url_events, account=login, retry=True,
+				headers=mini_headers,
+				data=mini_payload,
+				params=mini_payload
+			)
+		finally:
+			self.close_session(session)
+		return response.text
+
+
+class AsyncLibrusFetcher(LibrusFetcher):
+	"""AsyncLibrusFetcher - an asyncio Librus web fetcher, using aiohttp.
+		Shares the URLs, headers and login payload of LibrusFetcher,
+		its fetch_* methods are coroutines.
+
+	Description:
+	Requires the aiohttp package. The rate_limiter and metrics of
+	LibrusFetcher are used too, session_store and adapter aren't.
+
+	Functions:
+	new_session() - returns a new aiohttp.ClientSession.
+	close_session(session) - closes a session.
+	request(session, method, url, account, retry, **kwargs) - sends
+		a rate limited request, retrying it if it fails.
+		Returns a (status, text) pair.
+	login_session(session, login, password) - logs the session in.
 	fetch_page(login, password, url) - fetches a page from librus
 		and returns the HTML.
+	fetch_grades(login, password) - fetches grades and returns the HTML.
 	fetch_announcements(login, password) - fetches announcements
 		and returns the HTML.
 	fetch_events(login, password, month, year) - fetches events
 		and returns the HTML.
 	fetch_attendance(login, password) - fetches attendance
 		and returns the HTML.
-	fetch_timetable(login, password) - fetches timetable
+	fetch_timetable(login, password, week) - fetches timetable
 		and returns the HTML.
+	fetch_timetables(login, password, weeks) - fetches timetables
+		of many weeks at once. Returns {week:HTML}.
 	"""
-	def __init__(self):
-		"""__init__() - Initialize the class by declaring variables."""
-		self.librus = None
-		self.url_grades = 'https://synergia.librus.pl/przegladaj_oceny/uczen'
-		self.url_events = 'https://synergia.librus.pl/terminarz'
-		self.url_login = 'https://synergia.librus.pl/loguj'
-		self.url_announcements = 'https://synergia.librus.pl/ogloszenia'
-		self.url_attendance = 'https://synergia.librus.pl/przegladaj_nb/uczen'
-		self.url_timetable = 'https://synergia.librus.pl/przegladaj_plan_lekcji'
+	def __init__(self, fetcher=None):
+		"""__init__(fetcher=None) - Initialize the class by declaring variables.
 
-		useragent = 'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36'
-		useragent += '(KHTML, like Gecko) Chrome/47.0.2526.106 Safari/537.36'
-		self.headers = {
-			'User-Agent': useragent,
-			'Content-Type': 'application/x-www-form-urlencoded',
-			'Referer': 'https://synergia.librus.pl/loguj',
-			'Accept-Encoding': 'gzip, deflate',
-			'Connection': 'keep-alive'
-		}
-		self.payload = {
-			'login': '',
-			'passwd': '',
-			'ed_pass_keydown': '',
-			'ed_pass_keyup': '',
-			'captcha': '',
-			'jest_captcha': '1',
-			'czy_js': '2'
-		}
+		Keyword parameters:
+		fetcher (LibrusFetcher) - a fetcher whose URLs, headers, payload,
+			cookies, login_delay, rate_limiter, metrics, retry policy and
+			circuit_breaker are shared. (default None)
+		"""
+		LibrusFetcher.__init__(self)
+		if fetcher is not None:
+			for name, value in vars(fetcher).items():
+				if name.startswith('url_') or name in (
+					'headers', 'payload', 'cookies', 'login_delay', 'rate_limiter',
+					'metrics', 'librus', 'timeout', 'retries', 'backoff',
+					'max_backoff', 'retry_statuses', 'circuit_breaker'
+				):
+					setattr(self, name, value)
+
+	async def new_session(self):
+		"""new_session() - returns a new aiohttp.ClientSession with its own
+			cookie jar.
+		"""
+		import aiohttp  # optional dependency, only needed by this fetcher
+		return aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True))
 
-		self.cookies = {
-			'_ga': 'GA1.2.2085668300.1439744410',
-			'TestCookie': '1'
-		}
+	async def close_session(self, session):
+		"""close_session(session) - closes a session.
 
-	def fetch_page(self, login, password, url):
+		Parameters:
+		session (aiohttp.ClientSession) - the session returned by new_session.
+		"""
+		await session.close()
+
+	async def request(self, session, method, url, account=None, retry=None, **kwargs):
+		"""request(session, method, url, account=None, retry=None, **kwargs) -
+			sends a request through the session, waiting for the rate limiter
+			first. Retries, timeouts and the circuit breaker work like in
+			LibrusFetcher.request. Returns a (status, text) pair.
+
+		Parameters:
+		session (aiohttp.ClientSession) - the session used for the request.
+		method (string) - the HTTP method, for ex. GET.
+		url (string) - the requested URL.
+
+		Keyword parameters:
+		account (string) - the login the request is sent for. (default None)
+		retry (bool) - whether the request is retried. (default only GETs)
+		"""
+		import asyncio
+		import aiohttp
+		if retry is None:
+			retry = method.upper() == 'GET'
+		kwargs.setdefault('timeout', aiohttp.ClientTimeout(
+			sock_connect=self.timeout[0], sock_read=self.timeout[1]
+		))
+		split_url = urllib.parse.urlsplit(url)
+		key = (split_url.hostname, account)
+		attempts = self.retries + 1 if retry else 1
+		for attempt in range(attempts):
+			self._before_request(key)
+			try:
+				if self.rate_limiter is not None:
+					await asyncio.get_running_loop().run_in_executor(
+						None, self.rate_limiter.acquire, key[0]
+					)
+				status, text = await self._send(
+					session, method, url, split_url.path, **kwargs
+				)
+			except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exception:
+				self._after_request(key, True)
+				if attempt == attempts - 1:
+					raise
+				reason = type(exception).__name__
+			except BaseException:
+				# any other error, cancellation too, releases the half-open trial
+				self._after_request(key, True)
+				raise
+			else:
+				failed = status in self.retry_statuses
+				self._after_request(key, failed)
+				if not failed or attempt == attempts - 1:
+					return status, text
+				reason = str(status)
+			self.metrics.count('http_retries', path=split_url.path, reason=reason)
+			await asyncio.sleep(self.retry_delay(attempt))
+
+	async def _send(self, session, method, url, path, **kwargs):
+		"""Sends a single request through the session, recording its metrics."""
+		with self.metrics.span('http_request', method=method, path=path):
+			async with session.request(method, url, **kwargs) as response:
+				body = await response.read()
+				text = await response.text()
+		self.metrics.count(
+			'http_requests', method=method, path=path, status=response.status
+		)
+		self.metrics.count('http_response_bytes', len(body), path=path)
+		return response.status, text
+
+	async def login_session(self, session, login, password):
+		"""login_session(session, login, password) - logs the session in.
+
+		Parameters:
+		session (aiohttp.ClientSession) - the session which should be logged in.
+		login (string) - login for librus
+		password (string) - password for librus
+		"""
+		import asyncio
+		payload = dict(self.payload)
+		payload['login'] = login
+		payload['passwd'] = password
+		await self.request(
+			session, 'POST', self.url_login, account=login,
+			data=payload, headers=self.headers,
+			cookies=self.cookies
+		)
+		self.metrics.count('logins')
+		await asyncio.sleep(self.login_delay)
+
+	async def fetch_page(self, login, password, url):
 		"""fetch_page(login, password, url) - fetches a page from librus
 			and returns the HTML.
 
@@ -1695,19 +4875,17 @@ class LibrusFetcher:
 		password (string) - password for librus
 		url (string) - url for the page
 		"""
-		self.payload['login'] = login
-		self.payload['passwd'] = password
-		with requests.Session() as session:
-			response = session.post(
-				self.url_login,
-				data=self.payload, headers=self.headers,
-				cookies=self.cookies
+		session = await self.new_session()
+		try:
+			await self.login_session(session, login, password)
+			status, text = await self.request(
+				session, 'GET', url, account=login, headers=self.headers
 			)
-			time.sleep(2)
-			response = session.get(url, headers=self.headers)
-		return response.text
+		finally:
+			await self.close_session(session)
+		return text
 
-	def fetch_announcements(self, login, password):
+	async def fetch_announcements(self, login, password):
 		"""fetch_announcements(login, password) - fetches announcements and
 			returns the HTML.
 
@@ -1715,122 +4893,792 @@ class LibrusFetcher:
 		login (string) - login for librus
 		password (string) - password for librus
 		"""
-		return self.fetch_page(login, password, self.url_announcements)
-
-	def fetch_grades(self, login, password):
-		"""fetch_grades(login, password) - fetches grades and returns the HTML.
+		return await self.fetch_page(login, password, self.url_announcements)
+
+	async def fetch_grades(self, login, password):
+		"""fetch_grades(login, password) - fetches grades and returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		"""
+		return await self.fetch_page(login, password, self.url_grades)
+
+	async def fetch_attendance(self, login, password):
+		"""fetch_attendance(login, password) - fetches attendance and
+			returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		"""
+		return await self.fetch_page(login, password, self.url_attendance)
+
+	async def fetch_timetable(self, login, password, week=None):
+		"""fetch_timetable(login, password, week=None) - fetches timetable
+			and returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+
+		Keyword parameters:
+		week (string) - any day of the week, YYYY-MM-DD.
+			(default the week Librus shows)
+		"""
+		if week is None:
+			return await self.fetch_page(login, password, self.url_timetable)
+		session = await self.new_session()
+		try:
+			await self.login_session(session, login, password)
+			text = await self._fetch_week(session, login, week)
+		finally:
+			await self.close_session(session)
+		return text
+
+	async def fetch_timetables(self, login, password, weeks):
+		"""fetch_timetables(login, password, weeks) - fetches timetables
+			of many weeks at once, logging in only once.
+			Returns a dictionary {week:HTML}.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		weeks (list) - any day of every week, YYYY-MM-DD.
+		"""
+		import asyncio
+		session = await self.new_session()
+		try:
+			await self.login_session(session, login, password)
+			texts = await asyncio.gather(*[
+				self._fetch_week(session, login, week) for week in weeks
+			])
+		finally:
+			await self.close_session(session)
+		return dict(zip(weeks, texts))
+
+	async def _fetch_week(self, session, login, week):
+		"""Fetches the timetable of a week with a logged in session."""
+		mini_headers, mini_payload = self._week_payload(week)
+		status, text = await self.request(
+			session, 'POST', self.url_timetable, account=login, retry=True,
+			headers=mini_headers,
+			data=mini_payload
+		)
+		return text
+
+	async def fetch_events(self, login, password, month, year):
+		"""fetch_events(login, password, month, year)
+			fetches events and returns the HTML.
+
+		Parameters:
+		login (string) - login for librus
+		password (string) - password for librus
+		month (string) - specified month, 1-12 without prequeling zero
+			for ex. 1 instead of 01
+		year (string) - specified year in a YYYY format
+		"""
+		session = await self.new_session()
+		try:
+			await self.login_session(session, login, password)
+
+			mini_headers = dict(self.headers)
+			mini_headers['Referer'] = 'https://synergia.librus.pl/terminarz'
+			mini_headers['Origin'] = 'https://synergia.librus.pl'
+			mini_payload = {'miesiac': str(month), 'rok': str(year)}
+
+			status, text = await self.request(
+				session, 'POST', self.url_events, account=login, retry=True,
+				headers=mini_headers,
+				data=mini_payload,
+				params=mini_payload
+			)
+		finally:
+			await self.close_session(session)
+		return text
+
+
+class Librus:
+	"""Librus - allows for control of everything.
+
+	Variables:
+	file_handler (FileHandler) - the internal FileHandler
+	parser (Parser) - the internal Parser
+	grade_book (GradeBook) - the internal GradeBook
+	event_calendar (EventCalendar) - the internal EventCalendar
+	librus_fetcher (LibrusFetcher) - the internal LibrusFetcher
+	announcement_board (AnnouncementBoard) - the internal AnnouncementBoard
+	attendance_table (AttendanceTable) - the internal AttendanceTable
+	timetable (Timetable) - the internal Timetable
+	timetables (dict) - timetables of the weeks refreshed by
+		refresh_timetables. {monday:Timetable}
+	login (string) - login to Librus
+	password (string) - password to Librus
+	kinds (tuple) - the kinds of data which can be refreshed.
+	metrics (Metrics) - timings and counters of every stage, shared with
+		the internal objects. Set metrics.sink to collect them.
+	async_fetcher (AsyncLibrusFetcher) - the fetcher used by refresh_async,
+		created from librus_fetcher on first use. (default None)
+	parse_cache (ParseCache) - parsed values of recently seen pages, so an
+		unchanged page isn't parsed again. None disables it.
+	exporter (Exporter) - writes the collections and the snapshots in
+		the storage directory as CSV, JSON Lines or Parquet.
+
+	Functions:
+	refresh(kinds, source, months, max_age) - Refreshes the chosen kinds of
+		data without any user input. Returns the collections and their diffs.
+	refresh_async(kinds, source, months, max_age) - A coroutine doing what
+		refresh does, fetching every page at once.
+	refresh_grades(source, max_age) - Refreshes the internal grade_book
+	refresh_events(month, year, source, max_age) - Refreshes the internal
+		event_calendar
+	refresh_announcements(source, max_age) - Refreshes the internal
+		announcement_board
+	refresh_attendance(source, max_age) - Refreshes the internal
+		attendance_table
+	refresh_timetable(source, max_age, html, week) - Refreshes the internal
+		timetable, or the timetable of a week
+	refresh_timetables(weeks, source, max_age) - Refreshes the timetables
+		of many weeks, fetching them at once
+	grade_book_from_html(html, previous) - Parses grades HTML into a GradeBook,
+		reusing the grades of rows unchanged since previous
+	event_calendar_from_html(html) - Parses events HTML into an EventCalendar
+	announcement_board_from_html(html) - Parses announcements HTML into
+		an AnnouncementBoard
+	attendance_table_from_html(html) - Parses attendance HTML into
+		an AttendanceTable
+	timetable_from_html(html) - Parses timetable HTML into a Timetable
+	search(query, limit) - Searches the announcements and events
+	archive_analytics(filename) - Returns the history of the grades and
+		attendance kept in the storage directory
+	update_event_calendar() - Updates the internal event_calendar
+	update_grade_book() - Updates the internal grade_book
+	update_announcements_board() - Updates the internal announcement_board
+	update_attendance_table() - Updates the internal attendance_table
+	update_timetable() - Updates the internal timetable
+	"""
+	kinds = ('grades', 'events', 'announcements', 'attendance', 'timetable')
+
+	def __init__(self, login="", password=""):
+		"""__init__(login="", password="") - Initializes the Librus object.
+
+		Keyword parameters:
+		login (string) - login to Librus. (default "")
+		password (string) - password to Librus. (default "")
+		"""
+		self.file_handler = FileHandler()
+		self.parser = Parser()
+		self.grade_book = GradeBook()
+		self.event_calendar = EventCalendar()
+		self.librus_fetcher = LibrusFetcher()
+		self.announcement_board = AnnouncementBoard()
+		self.attendance_table = AttendanceTable()
+		self.timetable = Timetable()
+		self.timetables = {}
+		self.login = login
+		self.password = password
+		self.metrics = Metrics()
+		self.async_fetcher = None
+		self.parse_cache = ParseCache()
+		self.parse_cache.metrics = self.metrics
+		self.exporter = Exporter(self.file_handler)
+
+		self.file_handler.metrics = self.metrics
+		self.parser.metrics = self.metrics
+		self.librus_fetcher.metrics = self.metrics
+
+		self.file_handler.librus = self
+		self.file_handler.record_codec.librus = self
+		self.parser.librus = self
+		self.grade_book.librus = self
+		self.event_calendar.librus = self
+		self.librus_fetcher.librus = self
+		self.announcement_board.librus = self
+		self.attendance_table.librus = self
+		self.timetable.librus = self
+
+	def refresh(self, kinds=None, source='auto', months=None, max_age=3600):
+		"""refresh(kinds=None, source='auto', months=None, max_age=3600) -
+			Refreshes the chosen kinds of data without any user input.
+			Returns a dictionary {kind:(collection, diff)}, where diff is
+			what compare_old_* returned for that kind.
+
+		Keyword parameters:
+		kinds (list) - kinds to refresh, see Librus.kinds. (default all)
+		source (string) - 'live' fetches from Librus, 'cache' reads the cached
+			files, 'auto' reads the cache if it's younger than max_age
+			seconds and fetches otherwise. (default 'auto')
+		months (list) - (month, year) pairs of events to refresh.
+			(default the current month)
+		max_age (int) - cache age in seconds accepted by 'auto'. (default 3600)
+		"""
+		kinds, months = self._check_refresh(kinds, months)
+		results = {}
+		try:
+			for kind in kinds:
+				with self.metrics.span('refresh', kind=kind):
+					results[kind] = self._refresh_kind(kind, source, months, max_age)
+		finally:
+			self.metrics.flush()
+			if self.parser.profiler is not None:
+				self.parser.profiler.dump()
+		return results
+
+	async def refresh_async(self, kinds=None, source='auto', months=None, max_age=3600):
+		"""refresh_async(kinds=None, source='auto', months=None, max_age=3600) -
+			A coroutine doing what refresh does. Every page is fetched at
+			once with the async_fetcher, and every kind is parsed in a thread
+			executor as soon as its pages arrive, so the event loop isn't
+			blocked. Returns a dictionary {kind:(collection, diff)}.
+
+		Keyword parameters:
+		kinds, source, months, max_age - see refresh.
+		"""
+		import asyncio
+		kinds, months = self._check_refresh(kinds, months)
+		if self.async_fetcher is None:
+			self.async_fetcher = AsyncLibrusFetcher(self.librus_fetcher)
+		loop = asyncio.get_running_loop()
+
+		async def fetch(kind, month=None, year=None):
+			filename = self._cache_filename(kind, month, year)
+			if self._pick_source(source, filename, max_age) == 'cache':
+				return None
+			self._require_credentials()
+			if kind == 'events':
+				return await self.async_fetcher.fetch_events(
+					self.login, self.password, month, year
+				)
+			fetch_kind = getattr(self.async_fetcher, 'fetch_' + kind)
+			return await fetch_kind(self.login, self.password)
+
+		async def refresh_kind(kind):
+			with self.metrics.span('refresh', kind=kind):
+				if kind == 'events':
+					keys = [(str(month), str(year)) for month, year in months]
+					pages = await asyncio.gather(*[fetch(kind, *key) for key in keys])
+					pages = dict(zip(keys, pages))
+				else:
+					pages = {kind: await fetch(kind)}
+				# fetch already picked the source: a page given is parsed as live,
+				# a missing one was picked from the cache and must not be fetched
+				return await loop.run_in_executor(
+					None, self._refresh_kind, kind, 'cache', months, max_age, pages
+				)
+
+		try:
+			collections = await asyncio.gather(*[refresh_kind(kind) for kind in kinds])
+		finally:
+			self.metrics.flush()
+			if self.parser.profiler is not None:
+				self.parser.profiler.dump()
+		return dict(zip(kinds, collections))
+
+	def _check_refresh(self, kinds, months):
+		"""Checks the kinds and fills in the defaults of refresh.
+		Returns (kinds, months).
+		"""
+		if kinds is None:
+			kinds = self.kinds
+		for kind in kinds:
+			if kind not in self.kinds:
+				raise NameError(
+					'Kind not found - ' + kind +
+					'. Use ones specified in Librus.kinds next time.'
+				)
+		if months is None:
+			months = [(time.localtime().tm_mon, time.localtime().tm_year)]
+		return kinds, months
+
+	def _refresh_kind(self, kind, source, months, max_age, pages=None):
+		"""Refreshes a single kind of data, see refresh. pages holds already
+		fetched pages, {kind:html} or {(month, year):html} for events.
+		"""
+		if pages is None:
+			pages = {}
+		if kind == 'grades':
+			return self.refresh_grades(source, max_age, pages.get(kind))
+		elif kind == 'events':
+			event_calendar = EventCalendar()
+			new_events = EventCalendar()
+			for month, year in months:
+				month_calendar, month_new_events = self.refresh_events(
+					month, year, source, max_age,
+					pages.get((str(month), str(year)))
+				)
+				for event in month_calendar.events:
+					event_calendar.add(event)
+				for event in month_new_events.events:
+					new_events.add(event)
+			event_calendar.librus = self
+			self.event_calendar = event_calendar
+			return event_calendar, new_events
+		elif kind == 'announcements':
+			return self.refresh_announcements(source, max_age, pages.get(kind))
+		elif kind == 'attendance':
+			return self.refresh_attendance(source, max_age, pages.get(kind))
+		elif kind == 'timetable':
+			return self.refresh_timetable(source, max_age, pages.get(kind))
+
+	def refresh_grades(self, source='auto', max_age=3600, html=None):
+		"""refresh_grades(source='auto', max_age=3600, html=None) - Refreshes
+			the internal grade_book. Returns the GradeBook and a triple of
+			the new, the removed and the modified grades, see
+			GradeBook.diff_old_grades.
+
+		Keyword parameters:
+		source (string) - 'live', 'cache' or 'auto', see refresh. (default 'auto')
+		max_age (int) - cache age in seconds accepted by 'auto'. (default 3600)
+		html (string) - an already fetched page, parsed instead of fetching
+			one, which implies source 'live'. (default None)
+		"""
+		filename = self._cache_filename('grades')
+		if html is None:
+			source = self._pick_source(source, filename, max_age)
+		else:
+			source = 'live'
+		cached = None
+		if source == 'cache':
+			self.grade_book = self.file_handler.file_to_collection(filename)
+		else:
+			if html is None:
+				self._require_credentials()
+				html = self.librus_fetcher.fetch_grades(self.login, self.password)
+			previous, cached = self._previous_grade_book()
+			self.grade_book = self.grade_book_from_html(html, previous)
+		self.grade_book.librus = self
+		if cached is not None:  # already decoded, don't read the file again
+			self.grade_book.old_grades = cached
+			cached.sort_by_date()
+		else:
+			try:
+				self.grade_book.update_old_grades()
+			except FileNotFoundError:
+				self.grade_book.old_grades = GradeBook()
+		if source == 'live':
+			self._store(self.grade_book, filename, "grades")
+		new_grades, removed_grades, modified_grades = self.grade_book.diff_old_grades()
+		self.metrics.count('diff_records', len(new_grades.grades), kind='grades', change='new')
+		self.metrics.count(
+			'diff_records', len(removed_grades.grades), kind='grades', change='removed'
+		)
+		self.metrics.count(
+			'diff_records', len(modified_grades), kind='grades', change='modified'
+		)
+		return self.grade_book, (new_grades, removed_grades, modified_grades)
+
+	def refresh_events(self, month, year, source='auto', max_age=3600, html=None):
+		"""refresh_events(month, year, source='auto', max_age=3600, html=None) -
+			Refreshes the internal event_calendar. Returns the EventCalendar
+			and the new events.
+
+		Parameters:
+		month (string) - specified month, 1-12 without prequeling zero
+		year (string) - specified year in a YYYY format
+
+		Keyword parameters:
+		source (string) - 'live', 'cache' or 'auto', see refresh. (default 'auto')
+		max_age (int) - cache age in seconds accepted by 'auto'. (default 3600)
+		html (string) - an already fetched page, parsed instead of fetching
+			one, which implies source 'live'. (default None)
+		"""
+		month = str(month)
+		year = str(year)
+		filename = self._cache_filename('events', month, year)
+		if html is None:
+			source = self._pick_source(source, filename, max_age)
+		else:
+			source = 'live'
+		if source == 'cache':
+			self.event_calendar = self.file_handler.file_to_collection(filename)
+		else:
+			if html is None:
+				self._require_credentials()
+				html = self.librus_fetcher.fetch_events(
+					self.login, self.password, month, year
+				)
+			self.event_calendar = self.event_calendar_from_html(html)
+		self.event_calendar.librus = self
+		try:
+			self.event_calendar.update_old_events(month, year)
+		except FileNotFoundError:
+			self.event_calendar.old_events = EventCalendar()
+		if source == 'live':
+			self._store(self.event_calendar, filename, "events_"+month+"_"+year)
+		new_events = self.event_calendar.compare_old_events()
+		self.metrics.count('diff_records', len(new_events.events), kind='events')
+		return self.event_calendar, new_events
+
+	def refresh_announcements(self, source='auto', max_age=3600, html=None):
+		"""refresh_announcements(source='auto', max_age=3600, html=None) -
+			Refreshes the internal announcement_board. Returns the AnnouncementBoard
+			and a pair of the new and the edited announcements.
+
+		Keyword parameters:
+		source (string) - 'live', 'cache' or 'auto', see refresh. (default 'auto')
+		max_age (int) - cache age in seconds accepted by 'auto'. (default 3600)
+		html (string) - an already fetched page, parsed instead of fetching
+			one, which implies source 'live'. (default None)
+		"""
+		filename = self._cache_filename('announcements')
+		if html is None:
+			source = self._pick_source(source, filename, max_age)
+		else:
+			source = 'live'
+		if source == 'cache':
+			self.announcement_board = self.file_handler.file_to_collection(filename)
+		else:
+			if html is None:
+				self._require_credentials()
+				html = self.librus_fetcher.fetch_announcements(self.login, self.password)
+			self.announcement_board = self.announcement_board_from_html(html)
+		self.announcement_board.librus = self
+		try:
+			self.announcement_board.update_old_announcements()
+		except FileNotFoundError:
+			self.announcement_board.old_announcements = AnnouncementBoard()
+		if source == 'live':
+			self._store(self.announcement_board, filename, "announcements")
+		new_announcements, edited_announcements = (
+			self.announcement_board.compare_old_announcements()
+		)
+		self.metrics.count(
+			'diff_records', len(new_announcements.announcements),
+			kind='announcements', change='new'
+		)
+		self.metrics.count(
+			'diff_records', len(edited_announcements.announcements),
+			kind='announcements', change='edited'
+		)
+		return self.announcement_board, (new_announcements, edited_announcements)
+
+	def refresh_attendance(self, source='auto', max_age=3600, html=None):
+		"""refresh_attendance(source='auto', max_age=3600, html=None) - Refreshes
+			the internal attendance_table. Returns the AttendanceTable and
+			a (new, modified) pair of AttendanceTables.
+
+		Keyword parameters:
+		source (string) - 'live', 'cache' or 'auto', see refresh. (default 'auto')
+		max_age (int) - cache age in seconds accepted by 'auto'. (default 3600)
+		html (string) - an already fetched page, parsed instead of fetching
+			one, which implies source 'live'. (default None)
+		"""
+		filename = self._cache_filename('attendance')
+		if html is None:
+			source = self._pick_source(source, filename, max_age)
+		else:
+			source = 'live'
+		if source == 'cache':
+			self.attendance_table = self.file_handler.file_to_collection(filename)
+		else:
+			if html is None:
+				self._require_credentials()
+				html = self.librus_fetcher.fetch_attendance(self.login, self.password)
+			self.attendance_table = self.attendance_table_from_html(html)
+		self.attendance_table.librus = self
+		try:
+			self.attendance_table.update_old_attendance()
+		except FileNotFoundError:
+			self.attendance_table.old_attendance = AttendanceTable()
+		if source == 'live':
+			self._store(self.attendance_table, filename, "attendance")
+		new_attendance, modified_attendance = self.attendance_table.compare_old_attendance()
+		self.metrics.count(
+			'diff_records', len(new_attendance.attendances),
+			kind='attendance', change='new'
+		)
+		self.metrics.count(
+			'diff_records', len(modified_attendance.attendances),
+			kind='attendance', change='modified'
+		)
+		return self.attendance_table, (new_attendance, modified_attendance)
+
+	def refresh_timetable(self, source='auto', max_age=3600, html=None, week=None):
+		"""refresh_timetable(source='auto', max_age=3600, html=None, week=None) -
+			Refreshes the internal timetable, or the timetable of a week in
+			timetables. Returns the Timetable and its changes, a list of
+			TimetableChange objects.
+
+		Keyword parameters:
+		source (string) - 'live', 'cache' or 'auto', see refresh. (default 'auto')
+		max_age (int) - cache age in seconds accepted by 'auto'. (default 3600)
+		html (string) - an already fetched page, parsed instead of fetching
+			one, which implies source 'live'. (default None)
+		week (string) - any day of the week, YYYY-MM-DD. (default the week
+			Librus shows, refreshing the internal timetable)
+		"""
+		if week is not None:
+			week = self.librus_fetcher.week_range(week)[0]
+		filename = self._cache_filename('timetable', week=week)
+		if html is None:
+			source = self._pick_source(source, filename, max_age)
+		else:
+			source = 'live'
+		if source == 'cache':
+			timetable = self.file_handler.file_to_collection(filename)
+		else:
+			if html is None:
+				self._require_credentials()
+				html = self.librus_fetcher.fetch_timetable(self.login, self.password, week)
+			timetable = self.timetable_from_html(html)
+		timetable.librus = self
+		if week is None:
+			self.timetable = timetable
+		else:
+			self.timetables[week] = timetable
+		try:
+			timetable.update_old_timetable(filename)
+		except FileNotFoundError:
+			timetable.old_timetable = Timetable()
+		if source == 'live':
+			self._store(timetable, filename, "timetable")
+		changes = timetable.compare_old_timetable()
+		self.metrics.count('diff_records', len(changes), kind='timetable')
+		return timetable, changes
+
+	def refresh_timetables(self, weeks=None, source='auto', max_age=3600):
+		"""refresh_timetables(weeks=None, source='auto', max_age=3600) -
+			Refreshes the timetables of many weeks. Every week which isn't
+			read from the cache is fetched at once, logging in only once.
+			Returns a dictionary {monday:(Timetable, changes)}.
+
+		Keyword parameters:
+		weeks (list) - any day of every week, YYYY-MM-DD.
+			(default the current and the next week)
+		source (string) - 'live', 'cache' or 'auto', see refresh. (default 'auto')
+		max_age (int) - cache age in seconds accepted by 'auto'. (default 3600)
+		"""
+		if weeks is None:
+			today = time.time()
+			weeks = [
+				time.strftime("%Y-%m-%d", time.localtime(today)),
+				time.strftime("%Y-%m-%d", time.localtime(today + 7*24*3600))
+			]
+		mondays = []
+		for week in weeks:
+			monday = self.librus_fetcher.week_range(week)[0]
+			if monday not in mondays:
+				mondays.append(monday)
+		sources = {}
+		for monday in mondays:
+			filename = self._cache_filename('timetable', week=monday)
+			sources[monday] = self._pick_source(source, filename, max_age)
+		live = [monday for monday in mondays if sources[monday] == 'live']
+		pages = {}
+		if live:
+			self._require_credentials()
+			pages = self.librus_fetcher.fetch_timetables(self.login, self.password, live)
+		results = {}
+		for monday in mondays:
+			results[monday] = self.refresh_timetable(
+				sources[monday], max_age, pages.get(monday), monday
+			)
+		return results
+
+	def grade_book_from_html(self, html, previous=None):
+		"""grade_book_from_html(html, previous=None) - Parses grades HTML into
+			a GradeBook. Grades of subject rows which haven't changed since
+			previous are reused instead of parsed again.
+
+		Parameters:
+		html (string) - the HTML of grades website.
+
+		Keyword parameters:
+		previous (GradeBook) - the last parsed GradeBook. (default None)
+		"""
+		grade_book = GradeBook()
+		parsed = 0
+		with self.metrics.span('parse', kind='grades'):
+			rows = None
+			if self.parse_cache is not None:
+				rows = self.parse_cache.get(self.parser, 'grades', html)
+			if rows is None:
+				rows, parsed = self._parse_grade_rows(html, previous)
+			else:
+				rows = [
+					(fingerprint, [Grade(values) for values in row_values])
+					for fingerprint, row_values in rows
+				]
+			for fingerprint, row_grades in rows:
+				for grade in row_grades:
+					grade_book.add(grade)
+				grade_book.row_fingerprints[fingerprint] = [
+					grade.identity() for grade in row_grades
+				]
+		self.metrics.count('records_parsed', parsed, kind='grades')
+		self.metrics.count('records_reused', len(grade_book.grades) - parsed, kind='grades')
+		return grade_book
+
+	def _parse_grade_rows(self, html, previous):
+		"""Parses the grades page into (fingerprint, [Grade]) rows, reusing
+		rows unchanged since previous, and caches their values.
+		Returns the rows and the number of parsed grades.
+		"""
+		previous_grades = {}
+		previous_rows = {}
+		if previous is not None and previous.row_fingerprints:
+			previous_grades = dict((grade.identity(), grade) for grade in previous.grades)
+			previous_rows = previous.row_fingerprints
+		parsed = 0
+		rows = []
+		soup_rows = self.parser.parse_html_grade_rows(html)
+		if soup_rows:  # first grade is a test grade that doesnt parse
+			soup_rows[0] = (soup_rows[0][0], soup_rows[0][1][1:])
+		for fingerprint, oceny in soup_rows:
+			grade_ids = previous_rows.get(fingerprint)
+			if grade_ids is not None and all(i in previous_grades for i in grade_ids):
+				row_grades = [previous_grades[i] for i in grade_ids]
+			else:
+				row_grades = [Grade(self.parser.parse_grade(ocena)) for ocena in oceny]
+				parsed += len(row_grades)
+			rows.append((fingerprint, row_grades))
+		if self.parse_cache is not None:
+			# values[13] is added by Grade, so only the parsed values are cached
+			self.parse_cache.put(self.parser, 'grades', html, [
+				(fingerprint, [grade.values[:13] for grade in row_grades])
+				for fingerprint, row_grades in rows
+			])
+		return rows, parsed
+
+	def event_calendar_from_html(self, html):
+		"""event_calendar_from_html(html) - Parses events HTML into
+			an EventCalendar.
 
 		Parameters:
-		login (string) - login for librus
-		password (string) - password for librus
+		html (string) - the HTML of events website.
 		"""
-		return self.fetch_page(login, password, self.url_grades)
-
-	def fetch_attendance(self, login, password):
-		"""fetch_attendance(login, password) - fetches grades and
-			returns the HTML.
+		event_calendar = EventCalendar()
+		with self.metrics.span('parse', kind='events'):
+			for ev in self._parse_cached('events', html, lambda: self.parser.parse_events(
+				self.parser.parse_html_table(html), html
+			)):
+				event_calendar.add(Event(ev))
+		self.metrics.count('records_parsed', len(event_calendar.events), kind='events')
+		return event_calendar
+
+	def announcement_board_from_html(self, html):
+		"""announcement_board_from_html(html) - Parses announcements HTML into
+			an AnnouncementBoard.
 
 		Parameters:
-		login (string) - login for librus
-		password (string) - password for librus
+		html (string) - the HTML of announcements website.
 		"""
-		return self.fetch_page(login, password, self.url_attendance)
+		announcement_board = AnnouncementBoard()
+		with self.metrics.span('parse', kind='announcements'):
+			for values in self._parse_cached('announcements', html, lambda: [
+				self.parser.parse_announcements(str(ogloszenie))
+				for ogloszenie in self.parser.parse_html_announcements(html)
+			]):
+				announcement_board.add(Announcement(values))
+		self.metrics.count(
+			'records_parsed', len(announcement_board.announcements),
+			kind='announcements'
+		)
+		return announcement_board
 
-	def fetch_timetable(self, login, password):
-		"""fetch_timetable(login, password) - fetches timetable and
-			returns the HTML.
+	def attendance_table_from_html(self, html):
+		"""attendance_table_from_html(html) - Parses attendance HTML into
+			an AttendanceTable.
 
 		Parameters:
-		login (string) - login for librus
-		password (string) - password for librus
+		html (string) - the HTML of attendance website.
 		"""
-		return self.fetch_page(login, password, self.url_timetable)
+		attendance_table = AttendanceTable()
+		with self.metrics.span('parse', kind='attendance'):
+			for attendance in self._parse_cached(
+				'attendance', html, lambda: self.parser.parse_attendance(html)
+			):
+				attendance_table.add(Attendance(attendance))
+		self.metrics.count(
+			'records_parsed', len(attendance_table.attendances), kind='attendance'
+		)
+		return attendance_table
 
-	def fetch_events(self, login, password, month, year):
-		"""fetch_events(login, password, month, year)
-			fetches events and returns the HTML.
+	def timetable_from_html(self, html):
+		"""timetable_from_html(html) - Parses timetable HTML into a Timetable.
 
 		Parameters:
-		login (string) - login for librus
-		password (string) - password for librus
-		month (string) - specified month, 1-12 without prequeling zero
-			for ex. 1 instead of 01
-		year (string) - specified year in a YYYY format
+		html (string) - the HTML of timetable website.
 		"""
-		self.payload['login'] = login
-		self.payload['passwd'] = password
-		with requests.Session() as session:
-			response = session.post(
-				self.url_login,
-				data=self.payload,
-				headers=self.headers,
-				cookies=self.cookies
-			)
-
-			time.sleep(2)
-
-			mini_headers = self.headers
-			mini_headers['Referer'] = 'https://synergia.librus.pl/terminarz'
-			mini_headers['Origin'] = 'https://synergia.librus.pl'
-			mini_payload = {'miesiac': month, 'rok': year}
-
-			response = session.post(
-				self.url_events,
-				headers=mini_headers,
-				data=mini_payload,
-				params=mini_payload
+		timetable = Timetable()
+		with self.metrics.span('parse', kind='timetable'):
+			timetable.update([self._parse_cached(
+				'timetable', html, lambda: self.parser.parse_timetable(html)
+			)])
+		self.metrics.count('records_parsed', kind='timetable')
+		return timetable
+
+	def _parse_cached(self, kind, html, parse):
+		"""Returns the cached values of the page, or parse() which gets cached."""
+		if self.parse_cache is None:
+			return parse()
+		values = self.parse_cache.get(self.parser, kind, html)
+		if values is None:
+			values = parse()
+			self.parse_cache.put(self.parser, kind, html, values)
+		return values
+
+	def _previous_grade_book(self):
+		"""Returns (previous, cached), where previous is the last parsed
+		GradeBook - the internal one if it was parsed in this run, else the
+		cached one, or None - and cached is the GradeBook read from the cache
+		file, if it had to be read, else None.
+		"""
+		if self.grade_book.row_fingerprints:
+			return self.grade_book, None
+		try:
+			cached = self.file_handler.file_to_collection(self._cache_filename('grades'))
+		except FileNotFoundError:
+			return None, None
+		return cached, cached
+
+	def _cache_filename(self, kind, month=None, year=None, week=None):
+		"""Returns the name of the cache file of a kind."""
+		if kind == 'events':
+			return "events"+str(month)+"_"+str(year)+".pickle"
+		if kind == 'timetable' and week is not None:
+			return "timetable_"+week+".pickle"
+		return kind+".pickle"
+
+	def _pick_source(self, source, filename, max_age):
+		"""Resolves 'auto' into 'live' or 'cache'."""
+		if source not in ('live', 'cache', 'auto'):
+			raise ValueError(
+				"Invalid source - " + str(source) + ". Use 'live', 'cache' or 'auto'."
 			)
-			return(response.text)
-
-
-class Librus:
-	"""Librus - allows for control of everything.
-
-	Variables:
-	file_handler (FileHandler) - the internal FileHandler
-	parser (Parser) - the internal Parser
-	grade_book (GradeBook) - the internal GradeBook
-	event_calendar (EventCalendar) - the internal EventCalendar
-	librus_fetcher (LibrusFetcher) - the internal LibrusFetcher
-	announcement_board (AnnouncementBoard) - the internal AnnouncementBoard
-	attendance_table (AttendanceTable) - the internal AttendanceTable
-	timetable (Timetable) - the internal Timetable
-	login (string) - login to Librus
-	password (string) - password to Librus
+		if source == 'auto':
+			try:
+				age = time.time() - os.path.getmtime(self.file_handler.path(filename))
+			except OSError:
+				age = None
+			if age is not None and age < max_age:
+				source = 'cache'
+			else:
+				source = 'live'
+		return source
 
-	Functions:
-	update_event_calendar() - Updates the internal event_calendar
-	update_grade_book() - Updates the internal grade_book
-	update_announcements_board() - Updates the internal announcement_board
-	update_attendance_table() - Updates the internal attendance_table
-	update_timetable() - Updates the internal timetable
-	"""
-	def __init__(self):
-		self.file_handler = FileHandler()
-		self.parser = Parser()
-		self.grade_book = GradeBook()
-		self.event_calendar = EventCalendar()
-		self.librus_fetcher = LibrusFetcher()
-		self.announcement_board = AnnouncementBoard()
-		self.attendance_table = AttendanceTable()
-		self.timetable = Timetable()
-		self.login = ""
-		self.password = ""
+	def _require_credentials(self):
+		"""Raises a ValueError if there's no login or password to use."""
+		if not (self.login and self.password):
+			raise ValueError('Fetching from Librus requires login and password.')
 
-		self.file_handler.librus = self
-		self.parser.librus = self
-		self.grade_book.librus = self
-		self.event_calendar.librus = self
-		self.librus_fetcher.librus = self
-		self.announcement_board.librus = self
-		self.attendance_table.librus = self
-		self.timetable.librus = self
+	def _store(self, collection, filename, storage_name):
+		"""Saves a collection into its cache file and a timestamped copy
+		in the storage directory.
+		"""
+		current_time = time.strftime("%Y_%m_%d_%H_%M_%S", time.gmtime())
+		self.file_handler.collection_to_file(collection, filename)
+		os.makedirs(self.file_handler.path("storage"), exist_ok=True)
+		storage_filename = os.path.join(
+			"storage", storage_name + "_" + current_time + ".pickle"
+		)
+		self.file_handler.collection_to_file(collection, storage_filename)
 
-	def update_event_calendar(self):
-		"""update_event_calendar() - Updates the internal event_calendar.
-		Requires user input.
+	def _ask_source(self, what):
+		"""Asks the user whether to read cached data or fetch from Librus,
+		and for credentials if needed. Returns 'cache' or 'live'.
 		"""
-		print("Choose the method that will be used for getting events data:")
+		print("Choose the method that will be used for getting "+what+" data:")
 		print("a - Reading from cached data")
 		print("b - Getting data straight from Librus")
 		while True:
@@ -1840,255 +5688,452 @@ class Librus:
 			else:
 				print("Invalid answer - "+choice)
 		print("---")
-		current_time = time.strftime("%Y_%m_%d_%H_%M_%S", time.gmtime())
-
 		if choice == 'a':
 			print("Picked reading from cached data.")
-			month = input("Input desired month (1-12, without the prequeling zero):")
-			year = input("Input desired year (YYYY):")
-			filename = "events"+month+"_"+year+".pickle"
-			temp_event_calendar = self.file_handler.file_to_class(filename)
-			self.event_calendar = EventCalendar()
-			for event in temp_event_calendar.events:
-				self.event_calendar.add(event)  # future proof my code
-			self.event_calendar.librus = self
-			try:
-				self.event_calendar.update_old_events(month, year)
-			except FileNotFoundError:
-				self.old_events = self.event_calendar
-			print("Done.")
+			return 'cache'
 
-		elif choice == 'b':
-			print("Picked getting data straight from Librus. Updating...")
-			if self.login and self.password:
-				pass
-			else:
-				self.login = input("Input your username:")
-				self.password = input("Input your password:")
+		print("Picked getting data straight from Librus. Updating...")
+		if not (self.login and self.password):
+			self.login = input("Input your username:")
+			self.password = input("Input your password:")
+		return 'live'
 
-			month = input("Input desired month (1-12, without the prequeling zero):")
-			year = input("Input desired year (YYYY):")
-			html = self.librus_fetcher.fetch_events(
-				self.login, self.password, month, year
-			)
-			temp_parse = self.parser.parse_html_table(html)
-			temp_parse = self.parser.parse_events(temp_parse, html)
-			for ev in temp_parse:
-				self.event_calendar.add(Event(ev))
-			filename = "events"+month+"_"+year+".pickle"
-			self.event_calendar.librus = self
-			try:
-				self.event_calendar.update_old_events(month, year)
-			except FileNotFoundError:
-				self.old_events = self.event_calendar
-			self.file_handler.class_to_file(self.event_calendar, filename)
+	def search(self, query, limit=None):
+		"""search(query, limit=None) - Searches the internal announcement_board
+			and event_calendar. Returns a list of Announcement and Event
+			objects matching every word of the query, the best first.
+
+		Parameters:
+		query (string) - the searched words, see SearchIndex.
+
+		Keyword parameters:
+		limit (int) - the most items returned. (default all)
+		"""
+		results = self.announcement_board.search_index.search(query, limit)
+		results += self.event_calendar.search_index.search(query, limit)
+		results.sort(key=lambda x: -x[0])
+		return [item for score, item in results[:limit]]
+
+	def archive_analytics(self, filename="archive_analytics.json"):
+		"""archive_analytics(filename="archive_analytics.json") - Returns
+			an ArchiveAnalytics of the storage directory, updated with the
+			snapshots saved since the last call.
+
+		Keyword parameters:
+		filename (string) - name of the results file.
+			(default "archive_analytics.json")
+		"""
+		analytics = ArchiveAnalytics(self.file_handler, filename)
+		with self.metrics.span('archive_analytics'):
+			processed = analytics.update()
+		self.metrics.count('archive_snapshots', processed)
+		return analytics
 
-			storage_filename = "storage\events_"+month+"_"+year
-			storage_filename += "_"+current_time+".pickle"
-			self.file_handler.class_to_file(self.event_calendar, storage_filename)
-			print("Done.")
+	def update_event_calendar(self):
+		"""update_event_calendar() - Updates the internal event_calendar.
+		Requires user input.
+		"""
+		source = self._ask_source("events")
+		month = input("Input desired month (1-12, without the prequeling zero):")
+		year = input("Input desired year (YYYY):")
+		self.refresh_events(month, year, source)
+		print("Done.")
 
 	def update_grade_book(self):
 		"""update_grade_book() - Updates the internal grade_book.
 		Requires user input.
 		"""
-		print("Choose the method that will be used for getting grades data:")
-		print("a - Reading from cached data")
-		print("b - Getting data straight from Librus")
-		while True:
-			choice = input("Pick: ").lower()
-			if choice in ('a', 'b'):
-				break
-			else:
-				print("Invalid answer - "+choice)
-		print("---")
-		current_time = time.strftime("%Y_%m_%d_%H_%M_%S", time.gmtime())
-
-		if choice == 'a':
-			print("Picked reading from cached data.")
-			temp_grade_book = self.file_handler.file_to_class("grades.pickle")
-			self.grade_book = GradeBook()
-			for grade in temp_grade_book.grades:
-				self.grade_book.add(grade)  # future proof my code
-			self.grade_book.librus = self
-			self.grade_book.update_old_grades()
-			print("Done.")
-
-		elif choice == 'b':
-			print("Picked getting data straight from Librus. Updating...")
-			if self.login and self.password:
-				pass
-			else:
-				self.login = input("Input your username:")
-				self.password = input("Input your password:")
-			html = self.librus_fetcher.fetch_grades(self.login, self.password)
-			oceny = self.parser.parse_html_grade(html)
-
-			for i in range(len(oceny)):
-				if i - 1:   # first grade is a test grade that doesnt parse, so -1
-					self.grade_book.add(Grade(self.parser.parse_grade(oceny[i-1])))
-			self.grade_book.librus = self
-			self.grade_book.update_old_grades()
-			self.file_handler.class_to_file(self.grade_book, "grades.pickle")
-
-			storage_filename = "storage\grades"
-			storage_filename += "_"+current_time+".pickle"
-			self.file_handler.class_to_file(self.grade_book, storage_filename)
-			print("Done.")
+		self.refresh_grades(self._ask_source("grades"))
+		print("Done.")
 
 	def update_announcements_board(self):
 		"""update_announcements_board() - Updates the internal announcement_board.
 		Requires user input.
 		"""
-		print("Choose the method that will be used for getting announcements data:")
-		print("a - Reading from cached data")
-		print("b - Getting data straight from Librus")
-		while True:
-			choice = input("Pick: ").lower()
-			if choice in ('a', 'b'):
-				break
-			else:
-				print("Invalid answer - "+choice)
-		print("---")
-		current_time = time.strftime("%Y_%m_%d_%H_%M_%S", time.gmtime())
+		self.refresh_announcements(self._ask_source("announcements"))
+		print("Done.")
 
-		if choice == 'a':
-			print("Picked reading from cached data.")
-			temp_announcement_board = self.file_handler.file_to_class(
-				"announcements.pickle"
+	def update_attendance_table(self):
+		"""update_attendance_table() - Updates the internal attendance_table.
+		Requires user input.
+		"""
+		self.refresh_attendance(self._ask_source("attendance"))
+		print("Done.")
+
+	def update_timetable(self):
+		"""update_timetable() - Updates the internal timetable.
+		Requires user input.
+		"""
+		self.refresh_timetable(self._ask_source("timetable"))
+		print("Done.")
+
+
+class LibrusWatcher:
+	"""LibrusWatcher - a long-running watcher. Polls Librus and emits only
+		the new items, each resource on its own adaptive interval.
+
+	Description:
+	Every resource starts at its base interval. The interval is multiplied
+	by the time factor (1 during school hours, 2 in the evening, 4 on weekends,
+	8 at night) and by the idle factor, which grows by idle_growth with every
+	poll that found nothing and drops to change_factor after a change.
+	The result is clamped between min_interval and max_interval.
+
+	Variables:
+	librus (Librus) - the Librus object which is used for polling.
+	base_intervals (dictionary) - base interval of every resource in seconds.
+		{kind:seconds}
+	min_interval (int) - the shortest interval in seconds.
+	max_interval (int) - the longest interval in seconds.
+	idle_growth (float) - how much the interval grows after a poll
+		which found nothing.
+	max_idle_factor (float) - the limit of idle growth.
+	change_factor (float) - the idle factor set after a poll which found
+		something, shortening the following intervals.
+	school_hours (tuple) - (first hour, last hour) of school lessons.
+	night_hours (tuple) - (first hour, last hour) of the night.
+	idle_factors (dictionary) - current idle factor of every resource.
+	next_poll (dictionary) - time of the next poll of every resource.
+	last_change (dictionary) - time of the last change of every resource.
+	on_new (function) - called with (kind, items) when something new appears.
+	on_error (function) - called with (kind, exception) when a poll fails.
+	clock (function) - returns the current time. (default time.time)
+	sleep (function) - sleeps for given seconds. (default time.sleep)
+
+	Functions:
+	poll(kind) - Polls a resource once. Returns the new items.
+	interval(kind, now) - Returns the next interval of a resource.
+	run(iterations=None) - Polls the resources whenever they're due.
+	"""
+	def __init__(self, librus, on_new=None, on_error=None):
+		"""__init__(librus, on_new=None, on_error=None) - Initializing method.
+
+		Parameters:
+		librus (Librus) - the Librus object which is used for polling.
+
+		Keyword parameters:
+		on_new (function) - called with (kind, items). (default prints them)
+		on_error (function) - called with (kind, exception). (default prints it)
+		"""
+		self.librus = librus
+		self.base_intervals = {
+			'grades': 900,
+			'attendance': 900,
+			'announcements': 1800,
+			'events': 1800,
+			'timetable': 900
+		}
+		self.min_interval = 300
+		self.max_interval = 6 * 3600
+		self.idle_growth = 1.5
+		self.max_idle_factor = 8.0
+		self.change_factor = 0.5
+		self.school_hours = (7, 16)
+		self.night_hours = (22, 6)
+		self.idle_factors = {}
+		self.next_poll = {}
+		self.last_change = {}
+		self.on_new = on_new or self._print_new
+		self.on_error = on_error or self._print_error
+		self.clock = time.time
+		self.sleep = time.sleep
+		for kind in self.base_intervals:
+			self.idle_factors[kind] = 1.0
+			self.next_poll[kind] = 0
+			self.last_change[kind] = None
+
+	def poll(self, kind):
+		"""poll(kind) - Polls a resource once and calls on_new if something
+			new appeared. Returns a list of the new items.
+
+		Parameters:
+		kind (string) - grades, attendance, announcements, events or timetable.
+		"""
+		if kind == 'grades':
+			grade_book, (new_grades, removed_grades, modified_grades) = (
+				self.librus.refresh_grades('live')
 			)
-			self.announcement_board = AnnouncementBoard()
-			for announcement in temp_announcement_board.announcements:
-				self.announcement_board.add(announcement)  # future proof my code
-			self.announcement_board.librus = self
-			self.announcement_board.update_old_announcements()
-			print("Done.")
+			items = new_grades.grades + modified_grades
+		elif kind == 'attendance':
+			attendance_table, (new_attendance, modified_attendance) = (
+				self.librus.refresh_attendance('live')
+			)
+			items = new_attendance.attendances + modified_attendance.attendances
+		elif kind == 'announcements':
+			announcement_board, (new_announcements, edited_announcements) = (
+				self.librus.refresh_announcements('live')
+			)
+			items = new_announcements.announcements + edited_announcements.announcements
+		elif kind == 'events':
+			now = time.localtime(self.clock())
+			event_calendar, new_events = self.librus.refresh_events(
+				now.tm_mon, now.tm_year, 'live'
+			)
+			items = new_events.events
+		elif kind == 'timetable':  # this and the next week
+			items = []
+			for timetable, changes in self.librus.refresh_timetables(source='live').values():
+				items.extend(changes)
+		else:
+			raise NameError(
+				'Kind not found - ' + kind +
+				'. Use ones specified in LibrusWatcher.base_intervals next time.'
+			)
+
+		self.librus.metrics.flush()
+		if items:
+			self.on_new(kind, items)
+		return items
+
+	def interval(self, kind, now):
+		"""interval(kind, now) - Returns the next interval of a resource
+			in seconds, taking the time of day, weekday and recent
+			changes into account.
+
+		Parameters:
+		kind (string) - the polled resource.
+		now (float) - the current time, in seconds since the epoch.
+		"""
+		local = time.localtime(now)
+		night_start, night_end = self.night_hours
+		if local.tm_hour >= night_start or local.tm_hour < night_end:
+			time_factor = 8.0
+		elif local.tm_wday >= 5:  # saturday, sunday
+			time_factor = 4.0
+		elif self.school_hours[0] <= local.tm_hour < self.school_hours[1]:
+			time_factor = 1.0
+		else:
+			time_factor = 2.0
+
+		seconds = self.base_intervals[kind] * time_factor * self.idle_factors[kind]
+		return max(self.min_interval, min(self.max_interval, seconds))
+
+	def run(self, iterations=None):
+		"""run(iterations=None) - Polls the resources whenever they're due.
+			Runs forever unless the number of polls is limited.
+
+		Keyword parameters:
+		iterations (int) - how many polls to run before returning. (default None)
+		"""
+		done = 0
+		while iterations is None or done < iterations:
+			kind = min(self.next_poll, key=lambda x: self.next_poll[x])
+			delay = self.next_poll[kind] - self.clock()
+			if delay > 0:
+				self.sleep(delay)
 
-		elif choice == 'b':
-			print("Picked getting data straight from Librus. Updating...")
-			if self.login and self.password:
-				pass
+			try:
+				items = self.poll(kind)
+			except Exception as exception:
+				self.on_error(kind, exception)
+				items = []
+
+			now = self.clock()
+			if items:
+				self.last_change[kind] = now
+				self.idle_factors[kind] = self.change_factor
 			else:
-				self.login = input("Input your username:")
-				self.password = input("Input your password:")
-			html = self.librus_fetcher.fetch_announcements(self.login, self.password)
-			ogloszenia = self.parser.parse_html_announcements(html)
-
-			for i in range(len(ogloszenia)):
-				self.announcement_board.add(
-					Announcement(
-						self.parser.parse_announcements(str(ogloszenia[i-1]))
-					)
+				self.idle_factors[kind] = min(
+					self.max_idle_factor, self.idle_factors[kind] * self.idle_growth
 				)
-			self.announcement_board.librus = self
-			self.announcement_board.update_old_announcements()
-			self.file_handler.class_to_file(
-				self.announcement_board, "announcements.pickle"
-			)
+			self.next_poll[kind] = now + self.interval(kind, now)
+			done += 1
 
-			storage_filename = "storage\\announcements"
-			storage_filename += "_"+current_time+".pickle"
-			self.file_handler.class_to_file(self.announcement_board, storage_filename)
-			print("Done.")
+	def _print_new(self, kind, items):
+		"""Default on_new - prints the new items."""
+		for item in items:
+			print("[" + kind + "] " + item.display().rstrip("\n"))
 
-	def update_attendance_table(self):
-		"""update_attendance_table() - Updates the internal attendance_table.
-		Requires user input.
+	def _print_error(self, kind, exception):
+		"""Default on_error - prints the exception."""
+		print("[" + kind + "] Polling failed - " + repr(exception))
+
+
+class LibrusBatchRunner:
+	"""LibrusBatchRunner - refreshes many accounts concurrently.
+
+	Description:
+	Every account gets its own Librus object, cookie jars and files
+	(in directory/<login>), so nothing is shared between threads except
+	the connection pool of a single HTTP adapter, the rate limiter and
+	the circuit breaker.
+
+	Variables:
+	accounts (list) - (login, password) pairs.
+	directory (string) - the directory holding a subdirectory per account.
+	workers (int) - how many accounts are refreshed at once.
+	adapter (requests.adapters.HTTPAdapter) - the shared pooled adapter.
+	rate_limiter (RateLimiter) - the shared rate limiter.
+	circuit_breaker (CircuitBreaker) - the shared circuit breaker,
+		keeping a circuit per host and account.
+	results (dictionary) - what Librus.refresh returned, per login.
+		Holds the exception instead if the refresh failed.
+	latencies (dictionary) - seconds taken by every account's refresh.
+	wall_time (float) - seconds taken by the whole last run.
+	requests (int) - requests sent during the last run.
+	metrics_sink (object) - a metrics sink shared by every account,
+		see Metrics. (default None)
+
+	Functions:
+	run(kinds, source, months) - Refreshes every account. Returns results.
+	refresh_account(login, password, kinds, source, months) - Refreshes
+		a single account.
+	account_directory(login) - Returns the directory of an account's files.
+	summary() - Returns a dictionary with throughput and latency statistics.
+	report() - Returns the summary as text, which can be used for display.
+	"""
+	def __init__(
+		self, accounts, directory="accounts", workers=4,
+		global_rate=10.0, host_rate=5.0
+	):
+		"""__init__(accounts, directory="accounts", workers=4, global_rate=10.0,
+			host_rate=5.0) - Initializing method.
+
+		Parameters:
+		accounts (list) - (login, password) pairs.
+
+		Keyword parameters:
+		directory (string) - directory of the accounts' files. (default accounts)
+		workers (int) - how many accounts are refreshed at once. (default 4)
+		global_rate (float) - requests per second in total. (default 10.0)
+		host_rate (float) - requests per second per host. (default 5.0)
 		"""
-		print("Choose the method that will be used for getting attendance data:")
-		print("a - Reading from cached data")
-		print("b - Getting data straight from Librus")
-		while True:
-			choice = input("Pick: ").lower()
-			if choice in ('a', 'b'):
-				break
-			else:
-				print("Invalid answer - "+choice)
-		print("---")
-		current_time = time.strftime("%Y_%m_%d_%H_%M_%S", time.gmtime())
+		self.accounts = list(accounts)
+		self.directory = directory
+		self.workers = workers
+		import requests.adapters
+		self.adapter = requests.adapters.HTTPAdapter(
+			pool_connections=4, pool_maxsize=workers
+		)
+		self.rate_limiter = RateLimiter(global_rate, host_rate)
+		self.circuit_breaker = CircuitBreaker()
+		self.results = {}
+		self.latencies = {}
+		self.wall_time = 0.0
+		self.requests = 0
+		self.metrics_sink = None
+
+	def refresh_account(self, login, password, kinds=None, source='live', months=None):
+		"""refresh_account(login, password, kinds=None, source='live',
+			months=None) - Refreshes a single account. Returns what
+			Librus.refresh returned.
 
-		if choice == 'a':
-			print("Picked reading from cached data.")
-			temp_attendance_table = self.file_handler.file_to_class(
-				"attendance.pickle"
-			)
-			self.attendance_table = AttendanceTable()
-			for attendance in temp_attendance_table.attendances:
-				self.attendance_table.add(attendance)  # future proof my code
-			self.attendance_table.librus = self
-			self.attendance_table.update_old_attendance()
-			print("Done.")
+		Parameters:
+		login (string) - login to Librus
+		password (string) - password to Librus
 
-		elif choice == 'b':
-			print("Picked getting data straight from Librus. Updating...")
-			if self.login and self.password:
-				pass
-			else:
-				self.login = input("Input your username:")
-				self.password = input("Input your password:")
-			html = self.librus_fetcher.fetch_attendance(self.login, self.password)
-			attendance = self.parser.parse_attendance(html)
-
-			for i in attendance:
-				self.attendance_table.add(Attendance(i))
-			self.attendance_table.librus = self
-			self.attendance_table.update_old_attendance()
-			self.file_handler.class_to_file(
-				self.attendance_table, "attendance.pickle"
-			)
+		Keyword parameters:
+		kinds, source, months - passed to Librus.refresh.
+		"""
+		librus = Librus(login, password)
+		librus.file_handler.directory = self.account_directory(login)
+		os.makedirs(librus.file_handler.directory, exist_ok=True)
+		librus.librus_fetcher.adapter = self.adapter
+		librus.librus_fetcher.rate_limiter = self.rate_limiter
+		librus.librus_fetcher.circuit_breaker = self.circuit_breaker
+		librus.metrics.sink = self.metrics_sink
+		return librus.refresh(kinds, source, months)
+
+	def account_directory(self, login):
+		"""account_directory(login) - Returns the directory of an account's
+			files. The login is percent-encoded, so it can't point outside
+			directory and different logins never share a directory.
 
-			storage_filename = "storage\\attendance"
-			storage_filename += "_"+current_time+".pickle"
-			self.file_handler.class_to_file(self.attendance_table, storage_filename)
-			print("Done.")
+		Parameters:
+		login (string) - login to Librus
+		"""
+		name = urllib.parse.quote(login, safe="@")
+		if not name.strip("."):  # "", "." and ".."
+			name = name.replace(".", "%2E") or "%00"
+		return os.path.join(self.directory, name)
 
-	def update_timetable(self):
-		"""update_timetable() - Updates the internal timetable.
-		Requires user input.
+	def run(self, kinds=None, source='live', months=None):
+		"""run(kinds=None, source='live', months=None) - Refreshes every
+			account, workers at a time. Returns the results.
+			Raises a ValueError if a login is given more than once.
+
+		Keyword parameters:
+		kinds, source, months - passed to Librus.refresh.
 		"""
-		print("Choose the method that will be used for getting timetable data:")
-		print("a - Reading from cached data")
-		print("b - Getting data straight from Librus")
-		while True:
-			choice = input("Pick: ").lower()
-			if choice in ('a', 'b'):
-				break
-			else:
-				print("Invalid answer - "+choice)
-		print("---")
-		current_time = time.strftime("%Y_%m_%d_%H_%M_%S", time.gmtime())
+		logins = collections.Counter(login for login, password in self.accounts)
+		duplicates = [login for login in logins if logins[login] > 1]
+		if duplicates:
+			raise ValueError('Accounts given more than once - ' + ', '.join(duplicates))
+		self.results = {}
+		self.latencies = {}
+		requests_before = sum(self.rate_limiter.requests.values())
+
+		def task(account):
+			login, password = account
+			start = time.perf_counter()
+			try:
+				result = self.refresh_account(login, password, kinds, source, months)
+			except Exception as exception:
+				result = exception
+			return login, result, time.perf_counter() - start
+
+		import concurrent.futures
+		start = time.perf_counter()
+		with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+			for login, result, latency in executor.map(task, self.accounts):
+				self.results[login] = result
+				self.latencies[login] = latency
+		self.wall_time = time.perf_counter() - start
+		self.requests = sum(self.rate_limiter.requests.values()) - requests_before
+		return self.results
+
+	def summary(self):
+		"""summary() - Returns a dictionary with throughput and latency
+			statistics of the last run.
+		"""
+		latencies = sorted(self.latencies.values())
+		failed = [
+			login for login in self.results
+			if isinstance(self.results[login], Exception)
+		]
+		requests_count = self.requests
+
+		def percentile(fraction):
+			if not latencies:
+				return 0.0
+			return latencies[int(round(fraction * (len(latencies) - 1)))]
+
+		return {
+			'accounts': len(self.results),
+			'succeeded': len(self.results) - len(failed),
+			'failed': failed,
+			'wall_time': self.wall_time,
+			'accounts_per_second': len(self.results) / self.wall_time if self.wall_time else 0.0,
+			'requests': requests_count,
+			'requests_per_second': requests_count / self.wall_time if self.wall_time else 0.0,
+			'latency_p50': percentile(0.5),
+			'latency_p95': percentile(0.95),
+			'latency_max': latencies[-1] if latencies else 0.0
+		}
 
-		if choice == 'a':
-			print("Picked reading from cached data.")
-			temp_timetable = self.file_handler.file_to_class(
-				"timetable.pickle"
-			)
-			self.timetable = Timetable()
-			self.timetable.update([temp_timetable.timetable])
-			self.timetable.librus = self
-			print("Done.")
-
-		elif choice == 'b':
-			print("Picked getting data straight from Librus. Updating...")
-			if self.login and self.password:
-				pass
-			else:
-				self.login = input("Input your username:")
-				self.password = input("Input your password:")
-			html = self.librus_fetcher.fetch_timetable(self.login, self.password)
-			timetable = self.parser.parse_timetable(html)
-			print(timetable)
-			self.timetable.update([timetable])  # object.variable
-			self.timetable.librus = self
-			self.file_handler.class_to_file(
-				self.timetable, "timetable.pickle"
-			)
-			storage_filename = "storage\\timetable"
-			storage_filename += "_"+current_time+".pickle"
-			self.file_handler.class_to_file(self.timetable, storage_filename)
-			print("Done.")
+	def report(self):
+		"""report() - Returns the summary of the last run as text,
+			which can be used for display.
+		"""
+		summary = self.summary()
+		report_text = "Accounts: " + str(summary['accounts'])
+		report_text += " (" + str(summary['succeeded']) + " succeeded, "
+		report_text += str(len(summary['failed'])) + " failed)\n"
+		report_text += "Wall time: %.2fs, %.2f accounts/s\n" % (
+			summary['wall_time'], summary['accounts_per_second']
+		)
+		report_text += "Requests: %d, %.2f requests/s\n" % (
+			summary['requests'], summary['requests_per_second']
+		)
+		report_text += "Latency: p50 %.2fs, p95 %.2fs, max %.2fs\n" % (
+			summary['latency_p50'], summary['latency_p95'], summary['latency_max']
+		)
+		for login in summary['failed']:
+			report_text += "Failed: " + login + " - " + repr(self.results[login]) + "\n"
+		return report_text
 
 
-lib = Librus()
-lib.update_timetable()
-print(lib.timetable.display())
+if __name__ == '__main__':
+	lib = Librus()
+	lib.update_timetable()
+	print(lib.timetable.display())
@@ -0,0 +1,409 @@
+"""librus_replay - Records Librus pages into fixtures and replays them
+from a local stand-in server, so LibrusFetcher can be exercised offline.
+
+A fixture directory holds the page bodies as .html files and an index.json:
+	[{"method": "POST", "path": "/terminarz", "params": {"miesiac": "3",
+	"rok": "2016"}, "status": 200, "content_type": "text/html; charset=UTF-8",
+	"file": "0002_terminarz.html"}, ...]
+
+Usage:
+python librus_replay.py record DIRECTORY [--login L] [--months 9,10] [--year Y]
+python librus_replay.py serve DIRECTORY [--port P] [--latency S] [--jitter S]
+	[--error-rate R]
+"""
+import argparse
+import getpass
+import http.server
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+
+import librus
+
+LIBRUS_BASE = 'https://synergia.librus.pl'
+SCRUBBED_LOGIN = 'LOGIN'
+SCRUBBED_PASSWORD = 'PASSWORD'
+# the recorded params of these paths are scrubbed credentials, which can't match
+CREDENTIAL_PATHS = ('/loguj',)
+
+
+def fixture_key(method, path, params):
+	"""fixture_key(method, path, params) - returns the key a response
+		is recorded and looked up under.
+
+	Parameters:
+	method (string) - the HTTP method.
+	path (string) - the URL path, for ex. /terminarz.
+	params (dictionary) - query and form parameters of the request.
+	"""
+	return (method.upper(), path.rstrip('/'), tuple(sorted(
+		(str(key), str(value)) for key, value in params.items()
+	)))
+
+
+class FixtureStore:
+	"""FixtureStore - a directory of recorded responses.
+
+	Variables:
+	directory (string) - the fixture directory.
+	entries (list) - the entries of index.json.
+
+	Functions:
+	add(method, path, params, status, content_type, body) - Adds or replaces
+		a response and saves the index.
+	find(method, path, params) - Returns (entry, body) of a response, or None.
+	save() - Saves index.json.
+	"""
+	def __init__(self, directory):
+		"""__init__(directory) - Loads the index, if there's one.
+
+		Parameters:
+		directory (string) - the fixture directory.
+		"""
+		self.directory = directory
+		self.entries = []
+		self._bodies = {}
+		index = os.path.join(directory, 'index.json')
+		if os.path.exists(index):
+			with open(index, encoding='utf8') as index_file:
+				self.entries = json.load(index_file)
+
+	def add(self, method, path, params, status, content_type, body):
+		"""add(method, path, params, status, content_type, body) - Adds
+			or replaces a response and saves the index.
+
+		Parameters:
+		method (string) - the HTTP method.
+		path (string) - the URL path.
+		params (dictionary) - query and form parameters of the request.
+		status (int) - the HTTP status.
+		content_type (string) - the Content-Type of the response.
+		body (string) - the body of the response.
+		"""
+		os.makedirs(self.directory, exist_ok=True)
+		key = fixture_key(method, path, params)
+		self.entries = [
+			entry for entry in self.entries
+			if fixture_key(entry['method'], entry['path'], entry['params']) != key
+		]
+		name = path.strip('/').replace('/', '_') or 'index'
+		for value in params.values():
+			name += '_' + str(value)
+		filename = '%04d_%s.html' % (len(self.entries), name)
+		with open(os.path.join(self.directory, filename), 'w', encoding='utf8') as body_file:
+			body_file.write(body)
+		self.entries.append({
+			'method': method.upper(), 'path': path, 'params': params,
+			'status': status, 'content_type': content_type, 'file': filename
+		})
+		self._bodies.pop(key, None)
+		self.save()
+
+	def find(self, method, path, params):
+		"""find(method, path, params) - Returns (entry, body) of a recorded
+			response, or None. Requests of CREDENTIAL_PATHS fall back to the
+			first response recorded for the same method and path, any other
+			request has to match the recorded params.
+
+		Parameters:
+		method (string) - the HTTP method.
+		path (string) - the URL path.
+		params (dictionary) - query and form parameters of the request.
+		"""
+		key = fixture_key(method, path, params)
+		credentials = key[1] in CREDENTIAL_PATHS
+		fallback = None
+		for entry in self.entries:
+			entry_key = fixture_key(entry['method'], entry['path'], entry['params'])
+			if entry_key == key:
+				return entry, self._body(entry)
+			if credentials and fallback is None and entry_key[:2] == key[:2]:
+				fallback = entry
+		if fallback is not None:
+			return fallback, self._body(fallback)
+		return None
+
+	def save(self):
+		"""save() - Saves index.json."""
+		with open(os.path.join(self.directory, 'index.json'), 'w', encoding='utf8') as index_file:
+			json.dump(self.entries, index_file, indent='\t', ensure_ascii=False)
+
+	def _body(self, entry):
+		"""Returns (and caches) the body of an entry."""
+		key = fixture_key(entry['method'], entry['path'], entry['params'])
+		if key not in self._bodies:
+			with open(os.path.join(self.directory, entry['file']), encoding='utf8') as body_file:
+				self._bodies[key] = body_file.read()
+		return self._bodies[key]
+
+
+class RecordingFetcher(librus.LibrusFetcher):
+	"""RecordingFetcher - a LibrusFetcher saving every response it gets
+		into a FixtureStore, with the credentials scrubbed.
+
+	Description:
+	The login and password are replaced with LOGIN and PASSWORD in every
+	recorded body, and neither the login form nor cookies are recorded.
+
+	Variables:
+	store (FixtureStore) - where the responses are recorded.
+	(other variables are inherited from LibrusFetcher)
+
+	Functions:
+	request(session, method, url, **kwargs) - Sends the request
+		and records its response.
+	"""
+	def __init__(self, directory):
+		"""__init__(directory) - Initializing method.
+
+		Parameters:
+		directory (string) - the fixture directory.
+		"""
+		librus.LibrusFetcher.__init__(self)
+		self.store = FixtureStore(directory)
+		self._secrets = []
+
+	def request(self, session, method, url, **kwargs):
+		"""request(session, method, url, **kwargs) - Sends the request
+			and records its response. Returns the response.
+		"""
+		response = librus.LibrusFetcher.request(self, session, method, url, **kwargs)
+		split_url = urllib.parse.urlsplit(url)
+		params = {}
+		if url == self.url_login:
+			data = kwargs.get('data') or {}
+			self._secrets = [
+				(str(data.get('passwd', '')), SCRUBBED_PASSWORD),
+				(str(data.get('login', '')), SCRUBBED_LOGIN)
+			]
+		else:
+			params.update(urllib.parse.parse_qsl(split_url.query))
+			params.update(kwargs.get('params') or {})
+			params.update(kwargs.get('data') or {})
+		body = response.text
+		for secret, replacement in self._secrets:
+			if secret:
+				body = body.replace(secret, replacement)
+		self.store.add(
+			method, split_url.path, {key: str(value) for key, value in params.items()},
+			response.status_code, response.headers.get('Content-Type', 'text/html'),
+			body
+		)
+		return response
+
+
+class ReplayServer:
+	"""ReplayServer - a local stand-in for synergia.librus.pl, serving
+		recorded fixtures with configurable latency, jitter and errors.
+		Any login succeeds and sets a session cookie, the session probe
+		(/uczen/index) succeeds only with that cookie.
+
+	Variables:
+	store (FixtureStore) - the served fixtures.
+	latency (float) - seconds every response is delayed by.
+	jitter (float) - the delay varies by up to this many seconds.
+	error_rate (float) - the fraction of requests answered with 503.
+	random (random.Random) - the generator of jitter and errors.
+	requests (int) - number of requests served so far.
+	url (string) - the base URL of the server, set on start.
+
+	Functions:
+	start() - Starts serving in a background thread. Returns the base URL.
+	stop() - Stops the server.
+	point(fetcher) - Points a LibrusFetcher at the server.
+	"""
+	def __init__(
+		self, directory, host='127.0.0.1', port=0, latency=0.0,
+		jitter=0.0, error_rate=0.0, seed=None
+	):
+		"""__init__(directory, host='127.0.0.1', port=0, latency=0.0,
+			jitter=0.0, error_rate=0.0, seed=None) - Initializing method.
+
+		Parameters:
+		directory (string) - the fixture directory.
+
+		Keyword parameters:
+		host (string) - the address to listen on. (default 127.0.0.1)
+		port (int) - the port to listen on, 0 picks a free one. (default 0)
+		latency (float) - seconds every response is delayed by. (default 0.0)
+		jitter (float) - maximal variation of the delay. (default 0.0)
+		error_rate (float) - fraction of requests failing with 503. (default 0.0)
+		seed (int) - seed of the jitter and errors, for reproducibility.
+		"""
+		self.store = FixtureStore(directory)
+		self.latency = latency
+		self.jitter = jitter
+		self.error_rate = error_rate
+		self.random = random.Random(seed)
+		self.requests = 0
+		self.url = None
+		self._address = (host, port)
+		self._server = None
+		self._thread = None
+		self._lock = threading.Lock()
+
+	def start(self):
+		"""start() - Starts serving in a background thread.
+			Returns the base URL of the server.
+		"""
+		self._server = http.server.ThreadingHTTPServer(self._address, self._handler())
+		self._server.daemon_threads = True
+		self.url = 'http://%s:%d' % self._server.server_address[:2]
+		self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+		self._thread.start()
+		return self.url
+
+	def stop(self):
+		"""stop() - Stops the server."""
+		if self._server is not None:
+			self._server.shutdown()
+			self._server.server_close()
+			self._server = None
+
+	def point(self, fetcher, login_delay=0):
+		"""point(fetcher, login_delay=0) - Points a LibrusFetcher at the server,
+			replacing the Librus address in all of its URLs.
+
+		Parameters:
+		fetcher (LibrusFetcher) - the fetcher.
+
+		Keyword parameters:
+		login_delay (float) - the fetcher's wait after logging in. (default 0)
+		"""
+		for name in list(vars(fetcher)):
+			if name.startswith('url_'):
+				setattr(fetcher, name, getattr(fetcher, name).replace(LIBRUS_BASE, self.url))
+		fetcher.login_delay = login_delay
+		return fetcher
+
+	def _respond(self, handler, method):
+		"""Answers a request of the handler."""
+		with self._lock:
+			self.requests += 1
+			delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+			failed = self.random.random() < self.error_rate
+		if delay > 0:
+			time.sleep(delay)
+
+		split_url = urllib.parse.urlsplit(handler.path)
+		params = dict(urllib.parse.parse_qsl(split_url.query))
+		length = int(handler.headers.get('Content-Length') or 0)
+		form = handler.rfile.read(length).decode('utf8') if length else ''
+		is_login = split_url.path.rstrip('/') == '/loguj'
+		is_probe = split_url.path.rstrip('/') == '/uczen/index'
+		if not is_login:
+			params.update(urllib.parse.parse_qsl(form))
+
+		found = self.store.find(method, split_url.path, params)
+		if failed:
+			status, content_type, body = 503, 'text/plain', 'Service Unavailable'
+		elif found is None:
+			if is_login:
+				status, content_type, body = 200, 'text/html; charset=UTF-8', ''
+			elif is_probe and 'DZIENNIKSID=' in (handler.headers.get('Cookie') or ''):
+				status, content_type, body = 200, 'text/html; charset=UTF-8', ''
+			elif is_probe:
+				status, content_type, body = 302, 'text/plain', ''
+			else:
+				status, content_type, body = 404, 'text/plain', 'Not recorded'
+		else:
+			entry, body = found
+			status, content_type = entry['status'], entry['content_type']
+
+		data = body.encode('utf8')
+		handler.send_response(status)
+		handler.send_header('Content-Type', content_type)
+		handler.send_header('Content-Length', str(len(data)))
+		if is_login and not failed:
+			handler.send_header('Set-Cookie', 'DZIENNIKSID=replay; Path=/')
+		if status == 302:
+			handler.send_header('Location', '/loguj')
+		try:
+			handler.end_headers()
+			handler.wfile.write(data)
+		except (BrokenPipeError, ConnectionResetError):
+			pass  # the client gave up waiting, for ex. it timed out
+
+	def _handler(self):
+		"""Returns the request handler class bound to this server."""
+		server = self
+
+		class Handler(http.server.BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1'
+			disable_nagle_algorithm = True  # headers and body are written apart
+
+			def do_GET(self):
+				server._respond(self, 'GET')
+
+			def do_POST(self):
+				server._respond(self, 'POST')
+
+			def log_message(self, format, *args):
+				pass
+
+		return Handler
+
+
+def record(directory, login, password, months, year):
+	"""record(directory, login, password, months, year) - Records every
+		Librus page used by LibrusFetcher into a fixture directory.
+
+	Parameters:
+	directory (string) - the fixture directory.
+	login (string) - login to Librus
+	password (string) - password to Librus
+	months (list) - months of events to record.
+	year (string) - the year of the events.
+	"""
+	fetcher = RecordingFetcher(directory)
+	fetcher.fetch_grades(login, password)
+	fetcher.fetch_announcements(login, password)
+	fetcher.fetch_attendance(login, password)
+	fetcher.fetch_timetable(login, password)
+	for month in months:
+		fetcher.fetch_events(login, password, str(month), str(year))
+	return fetcher.store
+
+
+def main():
+	argument_parser = argparse.ArgumentParser(description=__doc__)
+	subparsers = argument_parser.add_subparsers(dest='command', required=True)
+	record_parser = subparsers.add_parser('record')
+	record_parser.add_argument('directory')
+	record_parser.add_argument('--login')
+	record_parser.add_argument('--months', default=str(time.localtime().tm_mon))
+	record_parser.add_argument('--year', default=str(time.localtime().tm_year))
+	serve_parser = subparsers.add_parser('serve')
+	serve_parser.add_argument('directory')
+	serve_parser.add_argument('--port', type=int, default=8080)
+	serve_parser.add_argument('--latency', type=float, default=0.0)
+	serve_parser.add_argument('--jitter', type=float, default=0.0)
+	serve_parser.add_argument('--error-rate', type=float, default=0.0)
+	arguments = argument_parser.parse_args()
+
+	if arguments.command == 'record':
+		login = arguments.login or input("Input your username:")
+		password = getpass.getpass("Input your password:")
+		store = record(
+			arguments.directory, login, password,
+			arguments.months.split(','), arguments.year
+		)
+		print("Recorded " + str(len(store.entries)) + " responses.")
+	else:
+		server = ReplayServer(
+			arguments.directory, port=arguments.port, latency=arguments.latency,
+			jitter=arguments.jitter, error_rate=arguments.error_rate
+		)
+		print("Serving on " + server.start())
+		try:
+			while True:
+				time.sleep(3600)
+		except KeyboardInterrupt:
+			server.stop()
+
+
+if __name__ == '__main__':
+	main()
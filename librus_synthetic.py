@@ -0,0 +1,411 @@
+"""librus_synthetic - Generates synthetic Librus pages of any size, with the
+markup the Parser split chains expect, for stress testing and profiling.
+
+Usage:
+python librus_synthetic.py DIRECTORY [--count N] [--seed S] [--month M]
+	[--year Y] [--canceled R] [--moved R] [--substitutions R]
+
+Writes a fixture directory, which can be served by librus_replay.ReplayServer.
+"""
+import argparse
+import random
+
+import librus_replay
+
+SUBJECTS = [
+	'Matematyka', 'Fizyka', 'Język polski', 'Historia', 'Chemia',
+	'Biologia', 'Geografia', 'Język angielski', 'Informatyka', 'Wychowanie fizyczne'
+]
+TEACHERS = [
+	'Jan Kowalski', 'Anna Nowak', 'Piotr Wiśniewski', 'Katarzyna Wójcik',
+	'Tomasz Kamiński', 'Agnieszka Lewandowska', 'Michał Zieliński'
+]
+DAYS = ['Poniedziałek', 'Wtorek', 'Środa', 'Czwartek', 'Piątek', 'Sobota', 'Niedziela']
+DAYS_SHORT = ['pon.', 'wt.', 'śr.', 'czw.', 'pt.', 'sob.', 'niedz.']
+MONTHS = [
+	'Styczeń', 'Luty', 'Marzec', 'Kwiecień', 'Maj', 'Czerwiec', 'Lipiec',
+	'Sierpień', 'Wrzesień', 'Październik', 'Listopad', 'Grudzień'
+]
+EVENT_STYLES = {
+	0: 'background-color: #FF7878; cursor: pointer;',
+	1: 'background-color: #FF7878; ',
+	2: 'background-color: #abcdef; ',
+	3: 'background-color: #6A9604; ',
+	4: 'background-color: #DC143C; cursor: pointer;',
+	5: 'background-color: #FF8C00; cursor: pointer;',
+	6: 'background-color: #BA55D3; cursor: pointer;',
+	7: 'background-color: #6A9604; ',
+	8: 'background-color: #6A9604; '
+}
+TIMETABLE_CELL = (
+	'<td class="line1" NOWRAP style="padding: 0px; min-height: 40px;'
+	' vertical-align: top;" nowrap>'
+)
+
+
+class PageGenerator:
+	"""PageGenerator - generates synthetic Librus pages.
+
+	Description:
+	Everything is drawn from a seeded random.Random, so the same seed and
+	arguments always give the same pages. Records are made unique where the
+	parser deduplicates them (events are deduplicated per day by
+	description_additional), so count is the number of records parsed back.
+
+	Variables:
+	random (random.Random) - the generator used for all choices.
+	subjects (list) - school subjects to draw from.
+	teachers (list) - teachers to draw from.
+
+	Functions:
+	grades_page(count, grade_numtypes) - Returns a grades page.
+	events_page(count, month, year, event_numtypes) - Returns a terminarz page.
+	announcements_page(count) - Returns an ogloszenia page.
+	attendance_page(count, attendance_types) - Returns a przegladaj_nb page.
+	timetable_page(count, canceled, moved, substitutions) - Returns
+		a plan lekcji page.
+	write_fixtures(directory, count, month, year) - Writes every page into
+		a fixture directory.
+	"""
+	def __init__(self, seed=None, subjects=None, teachers=None):
+		"""__init__(seed=None, subjects=None, teachers=None) - Initializing method.
+
+		Keyword parameters:
+		seed (int) - the seed of the generator. (default None)
+		subjects (list) - school subjects to draw from. (default SUBJECTS)
+		teachers (list) - teachers to draw from. (default TEACHERS)
+		"""
+		self.random = random.Random(seed)
+		self.subjects = list(subjects or SUBJECTS)
+		self.teachers = list(teachers or TEACHERS)
+
+	def grades_page(self, count, grade_numtypes=(0, 1, 2, 3)):
+		"""grades_page(count, grade_numtypes=(0, 1, 2, 3)) - Returns a grades
+			page with count grades (and the leading test grade, which
+			the parser skips), a row per subject.
+
+		Parameters:
+		count (int) - the number of grades.
+
+		Keyword parameters:
+		grade_numtypes (sequence) - grade numtypes to draw from,
+			see Grade.grade_numtype. Repeat one to make it more likely.
+		"""
+		rows = dict((subject, []) for subject in self.subjects)
+		rows[self.subjects[0]].append(self._grade(0, self.subjects[0], 2))  # test grade
+		for i in range(count):
+			subject = self.random.choice(self.subjects)
+			rows[subject].append(
+				self._grade(i + 1, subject, self.random.choice(grade_numtypes))
+			)
+		return '<html><body><table class="decorated stretch">%s</table></body></html>' % ''.join(
+			'<tr class="line0"><td><img src="/images/tree_colapsed.png"/></td>'
+			'<td>%s</td><td><span class="grade-box">%s</span></td></tr>'
+			% (subject, ''.join(rows[subject]))
+			for subject in self.subjects if rows[subject]
+		)
+
+	def events_page(self, count, month=3, year=2016, event_numtypes=tuple(range(9))):
+		"""events_page(count, month=3, year=2016, event_numtypes=range(9)) -
+			Returns a terminarz page with count events spread over the month.
+
+		Parameters:
+		count (int) - the number of events.
+
+		Keyword parameters:
+		month (int) - the month, 1-12. (default 3)
+		year (int) - the year. (default 2016)
+		event_numtypes (sequence) - event numtypes to draw from,
+			see Event.event_numtype. (default all 9)
+		"""
+		days = {}
+		observed_days = set()
+		for i in range(count):
+			day = self.random.randint(1, 28)
+			numtype = self.random.choice(event_numtypes)
+			if numtype == 6:  # the parser keeps a single observation per day
+				if day in observed_days:
+					numtype = self.random.choice([x for x in event_numtypes if x != 6] or [4])
+				observed_days.add(day)
+			days.setdefault(day, []).append(self._event(i, numtype, year, month))
+		cells = ''.join(
+			'<td><div class="kalendarz-dzien"><div class="kalendarz-numer-dnia">%d</div>'
+			'<table><tbody>%s</tbody></table></div></td>' % (day, ''.join(days[day]))
+			for day in sorted(days)
+		)
+		return (
+			'<html><body><form><select name="miesiac"><option value="%d" '
+			'selected="selected" >%s</option></select><select name="rok"><option '
+			'value="%d" selected="selected" > %d</option></select></form>'
+			'<table class="kalendarz"><tr>%s</tr></table></body></html>'
+			% (month, MONTHS[month - 1], year, year, cells)
+		)
+
+	def announcements_page(self, count):
+		"""announcements_page(count) - Returns an ogloszenia page with count
+			announcements.
+
+		Parameters:
+		count (int) - the number of announcements.
+		"""
+		tables = []
+		for i in range(count):
+			content = '<br/>'.join(
+				self.random.choice(['wycieczka', 'sprawdzian', 'zebranie', 'konkurs'])
+				+ ' ' + str(i) for _ in range(self.random.randint(1, 3))
+			)
+			tables.append(
+				'<table class="decorated form big center printable"><thead><tr>'
+				'<td colspan="2">Ogłoszenie nr %d</td></tr></thead><tbody><tr>'
+				'<th>Dodał</th><td> %s</td></tr><tr><th>Data publikacji</th>'
+				'<td> %04d-%02d-%02d</td></tr><tr><th>Treść</th><td>%s</td></tr>'
+				'</tbody></table>' % (
+					i, self.random.choice(self.teachers),
+					self.random.randint(2014, 2016), self.random.randint(1, 12),
+					self.random.randint(1, 28), content
+				)
+			)
+		return '<html><body>%s</body></html>' % ''.join(tables)
+
+	def attendance_page(self, count, attendance_types=('u', 'nb', 'sp', 'zw')):
+		"""attendance_page(count, attendance_types=('u', 'nb', 'sp', 'zw')) -
+			Returns a przegladaj_nb page with count attendance entries.
+
+		Parameters:
+		count (int) - the number of entries.
+
+		Keyword parameters:
+		attendance_types (sequence) - short types to draw from,
+			see Attendance.attendance_short_type.
+		"""
+		names = {
+			'u': 'usprawiedliwienie', 'nb': 'nieobecność',
+			'sp': 'spóźnienie', 'zw': 'zwolnienie'
+		}
+		links = []
+		for i in range(count):
+			short_type = self.random.choice(attendance_types)
+			teacher = self.random.choice(self.teachers)
+			links.append(
+				'<a href="javascript:void(0);" title="Rodzaj: %s<br>Data: 2016-%02d-%02d <br>'
+				'Lekcja: %s<br>Nauczyciel: %s<br><b>Godzina lekcyjna: %d</b><br>'
+				'Czy wycieczka: %s<br>Dodał: %s" onclick="otworz_w_nowym_oknie('
+				'\'/przegladaj_nb/szczegoly/%d\',\'o\',650,300);"  >%s</a>' % (
+					names[short_type], self.random.randint(1, 12), self.random.randint(1, 28),
+					self.random.choice(self.subjects), teacher, self.random.randint(1, 8),
+					self.random.choice(['Nie', 'Nie', 'Tak']), teacher, 100000 + i, short_type
+				)
+			)
+		rows = ''.join('<tr><td>%s</td></tr>' % link for link in links)
+		return (
+			'<html><body><table class="center big decorated">%s</table></body></html>' % rows
+		)
+
+	def timetable_page(self, count, canceled=0.0, moved=0.0, substitutions=0.0):
+		"""timetable_page(count, canceled=0.0, moved=0.0, substitutions=0.0) -
+			Returns a plan lekcji page with count lessons, monday to friday.
+
+		Parameters:
+		count (int) - the number of lessons.
+
+		Keyword parameters:
+		canceled (float) - fraction of canceled lessons (numtype 1).
+		moved (float) - fraction of moved lessons (numtypes 2 and 3).
+		substitutions (float) - fraction of substitutions (numtype 4).
+		"""
+		head = '<tr><td>Nr</td>' + ''.join(
+			'<td>%s<BR />2016-03-%02d</td>' % (day, 7 + i) for i, day in enumerate(DAYS)
+		) + '</tr>'
+		rows = []
+		lessons_per_day = max(1, -(-count // 5))
+		for number in range(1, lessons_per_day + 1):
+			cells = ''
+			for day_index in range(7):
+				if day_index < 5 and (number - 1) * 5 + day_index < count:
+					draw = self.random.random()
+					if draw < canceled:
+						cells += TIMETABLE_CELL + self._lesson(1, number) + '</td>'
+					elif draw < canceled + moved:
+						lesson = self._lesson(self.random.choice([2, 3]), number)
+						cells += TIMETABLE_CELL + lesson + '</td>'
+					elif draw < canceled + moved + substitutions:
+						cells += TIMETABLE_CELL + self._lesson(4, number) + '</td>'
+					else:
+						cells += TIMETABLE_CELL + self._lesson(0, number) + '</td>'
+				else:
+					cells += TIMETABLE_CELL + '&nbsp;</td>'
+			hour = 7 + number
+			rows.append(
+				'<tr class="line1"><td class="center" style="height: 50px;" >%d</td>'
+				'<th class="center" NOWRAP>%02d:00&nbsp;-&nbsp;%02d:45</th>%s</tr>'
+				% (number, hour % 24, hour % 24, cells)
+			)
+		return (
+			'<html><body><table class="decorated plan-lekcji"><thead>%s</thead>'
+			'<tbody>%s</tbody><tfoot><tr><td></td></tr></tfoot></table></body></html>'
+			% (head, ''.join(rows))
+		)
+
+	def write_fixtures(self, directory, count, month=3, year=2016, **timetable):
+		"""write_fixtures(directory, count, month=3, year=2016, **timetable) -
+			Writes every page with count records into a fixture directory.
+			Returns the FixtureStore.
+
+		Parameters:
+		directory (string) - the fixture directory.
+		count (int) - the number of records on every page.
+
+		Keyword parameters:
+		month (int) - the month of the events. (default 3)
+		year (int) - the year of the events. (default 2016)
+		timetable - canceled, moved and substitutions of timetable_page.
+		"""
+		store = librus_replay.FixtureStore(directory)
+		html = 'text/html; charset=UTF-8'
+		store.add('POST', '/loguj', {}, 200, html, '<html><body></body></html>')
+		store.add('GET', '/przegladaj_oceny/uczen', {}, 200, html, self.grades_page(count))
+		store.add(
+			'POST', '/terminarz', {'miesiac': str(month), 'rok': str(year)}, 200, html,
+			self.events_page(count, month, year)
+		)
+		store.add('GET', '/ogloszenia', {}, 200, html, self.announcements_page(count))
+		store.add('GET', '/przegladaj_nb/uczen', {}, 200, html, self.attendance_page(count))
+		store.add(
+			'GET', '/przegladaj_plan_lekcji', {}, 200, html,
+			self.timetable_page(count, **timetable)
+		)
+		return store
+
+	def _grade(self, index, subject, numtype):
+		"""Returns the link of a single grade."""
+		teacher = self.random.choice(self.teachers)
+		day = self.random.randint(1, 28)
+		category = {
+			0: 'Aktywność', 1: 'Ocena śródroczna', 2: 'Sprawdzian', 3: 'Praca domowa'
+		}[numtype]
+		title = (
+			'Kategoria: %s&lt;br&gt;Data: 2016-03-%02d (%s)&lt;br&gt;'
+			'Nauczyciel: %s&lt;br&gt;'
+		) % (category, day, DAYS_SHORT[day % 5], teacher)
+		value = self.random.choice(['1', '2', '3', '4', '5', '6', '2+', '3-', '4+', '5-'])
+		href = '/przegladaj_oceny/szczegoly/%d' % (200000 + index)
+		if numtype == 0:
+			value = self.random.choice([value, '+', '-', 'np'])
+		elif numtype == 1:
+			title += 'Licz do średniej: nie&lt;br&gt;'
+		elif numtype == 2:
+			title += 'Licz do średniej: %s&lt;br&gt;Waga: %d&lt;br&gt;' % (
+				self.random.choice(['tak', 'tak', 'nie']), self.random.randint(1, 5)
+			)
+		elif numtype == 3:
+			href = '/przegladaj_oceny/szczegoly/ksztaltujace/%d' % (200000 + index)
+		title += 'Dodał: %s&lt;br/&gt;' % teacher
+		if numtype in (0, 3):
+			title += 'Ocena: opis oceny %d&lt;br/&gt;' % index
+		return '<a class="ocena" href="%s" title="%s">%s</a>' % (href, title, value)
+
+	def _event(self, index, numtype, year, month):
+		"""Returns the table row of a single event."""
+		teacher = self.random.choice(self.teachers)
+		subject = self.random.choice(self.subjects)
+		lesson = self.random.randint(1, 8)
+		style = EVENT_STYLES[numtype]
+		details = ''
+		if numtype == 0:
+			details = '/terminarz/szczegoly_wolne/%d/' % (300000 + index)
+			content = 'Dzień wolny<br/>Przerwa świąteczna %d' % index
+			cell = '<td style="%s">%s</td>' % (style, content)
+		elif numtype == 1:
+			content = 'Nieobecność nr %d<br/>Nauczyciel: %s' % (index, teacher)
+			if self.random.random() < 0.5:
+				content += '<br/>Nr lekcji: %d do %d ' % (lesson, min(8, lesson + 2))
+			cell = '<td style="%s">%s</td>' % (style, content)
+		elif numtype in (2, 4, 5, 6):
+			details = '/terminarz/szczegoly/%d/' % (300000 + index)
+			title = (
+				'Nauczyciel: %s&lt;br /&gt;Opis: %s %d&lt;br /&gt;'
+				'Data dodania: %04d-%02d-01 12:00:00'
+			) % (
+				teacher, {2: 'Zebranie', 4: 'Dział', 5: 'Temat', 6: 'Obserwacja'}[numtype],
+				index, year, month
+			)
+			content = {
+				2: 'Wywiadówka<br/>Sala %d (%d)' % (lesson, index),
+				4: 'Nr lekcji: %d (%s, %d)<br/>Sprawdzian' % (lesson, subject, index),
+				5: 'Nr lekcji: %d (%s, %d)<br/>Kartkówka' % (lesson, subject, index),
+				6: 'Obserwacja lekcji<br/>%s' % subject
+			}[numtype]
+			cell = '<td title="%s" style="%s">%s</td>' % (title, style, content)
+		else:
+			content = {
+				3: 'Zastępstwo z %s na lekcji nr: %d (%s %d)',
+				7: 'Odwołane zajęcia<br/>%s na lekcji nr: %d (%s %d)',
+				8: 'Przesunięcie z %s na lekcji nr: %d (%s %d)'
+			}[numtype] % (teacher, lesson, subject, index)
+			cell = '<td style="%s">%s</td>' % (style, content)
+		if details:
+			cell += (
+				'<td><img onclick="location.href=\'%s\'" src="/images/info.png"/></td>' % details
+			)
+		return '<tr>%s</tr>' % cell
+
+	def _lesson(self, numtype, number):
+		"""Returns the contents of a timetable cell of a given numtype."""
+		subject = self.random.choice(self.subjects)
+		teacher = self.random.choice(self.teachers)
+		text = '<b>%s</b><br/>-&nbsp;%s (s. %d)' % (subject, teacher, number)
+		if numtype == 0:
+			return '<div class="text">%s</div>' % text
+		elif numtype == 1:
+			return (
+				'<div class="plan-lekcji-info">odwołane</div><div class="plan-lekcji-info">'
+				'przesunięcie</div><div class="text"><s>%s</s></div>' % text
+			)
+
+		new_teacher = self.random.choice(self.teachers)
+		new_subject = self.random.choice([subject, self.random.choice(self.subjects)])
+		title = '<b>Nauczyciel:</b> %s -> %s<br><b>Przedmiot:</b> %s' % (
+			teacher, new_teacher, subject
+		)
+		if new_subject != subject:
+			title += ' -> ' + new_subject
+		new_text = '<b>%s</b><br/>-&nbsp;%s (s. %d)' % (new_subject, new_teacher, number)
+		anchor = '<a href="javascript:void(0);" title="%s">info</a>' % title
+		if numtype == 2:
+			return (
+				'<div class="plan-lekcji-info">przesunięcie</div>'
+				'<div class="text">%s</div>%s' % (new_text, anchor)
+			)
+		elif numtype == 3:
+			return (
+				'<div class="plan-lekcji-info">przesunięcie</div>'
+				'<div class="text"><s>%s</s></div>%s' % (text, anchor)
+			)
+		return (
+			'<div class="plan-lekcji-info">zastępstwo</div>'
+			'<div class="text">%s</div>%s' % (new_text, anchor)
+		)
+
+
+def main():
+	argument_parser = argparse.ArgumentParser(description=__doc__)
+	argument_parser.add_argument('directory')
+	argument_parser.add_argument('--count', type=int, default=100)
+	argument_parser.add_argument('--seed', type=int)
+	argument_parser.add_argument('--month', type=int, default=3)
+	argument_parser.add_argument('--year', type=int, default=2016)
+	argument_parser.add_argument('--canceled', type=float, default=0.05)
+	argument_parser.add_argument('--moved', type=float, default=0.05)
+	argument_parser.add_argument('--substitutions', type=float, default=0.05)
+	arguments = argument_parser.parse_args()
+
+	store = PageGenerator(arguments.seed).write_fixtures(
+		arguments.directory, arguments.count, arguments.month, arguments.year,
+		canceled=arguments.canceled, moved=arguments.moved,
+		substitutions=arguments.substitutions
+	)
+	print("Wrote " + str(len(store.entries)) + " pages into " + arguments.directory)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,81 @@
+"""Round trips of collections through RecordCodec, the format of the cache
+files: a decoded item has to equal the parsed one, types included.
+
+Usage:
+python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import librus  # noqa: E402
+import librus_synthetic  # noqa: E402
+
+
+def typed(value):
+	"""Returns a value with the types of everything in it, as == treats
+	1, 1.0 and True alike.
+	"""
+	if isinstance(value, dict):
+		return dict((typed(key), typed(item)) for key, item in value.items())
+	if isinstance(value, (list, tuple)):
+		return (type(value), [typed(item) for item in value])
+	return (type(value), value)
+
+
+class RecordCodecRoundTrip(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		generator = librus_synthetic.PageGenerator(seed=3)
+		cls.librus = librus.Librus()
+		cls.librus.parse_cache = None
+		cls.collections = {
+			'grades': cls.librus.grade_book_from_html(generator.grades_page(300)),
+			'events': cls.librus.event_calendar_from_html(
+				generator.events_page(200, 3, 2016)
+			),
+			'announcements': cls.librus.announcement_board_from_html(
+				generator.announcements_page(30)
+			),
+			'attendance': cls.librus.attendance_table_from_html(
+				generator.attendance_page(200)
+			),
+			'timetable': cls.librus.timetable_from_html(
+				generator.timetable_page(40, 0.1, 0.1, 0.1)
+			)
+		}
+
+	def round_trip(self, kind):
+		codec = librus.RecordCodec()
+		collection = self.collections[kind]
+		decoded = codec.decode(codec.encode(collection))
+		return codec.items_of(kind, collection), codec.items_of(kind, decoded)
+
+	def assert_items_equal(self, kind):
+		parsed, decoded = self.round_trip(kind)
+		self.assertEqual(len(parsed), len(decoded))
+		for parsed_item, decoded_item in zip(parsed, decoded):
+			self.assertEqual(typed(vars(parsed_item)), typed(vars(decoded_item)))
+
+	def test_grades(self):
+		self.assert_items_equal('grades')
+
+	def test_events(self):
+		self.assert_items_equal('events')
+
+	def test_announcements(self):
+		self.assert_items_equal('announcements')
+
+	def test_attendance(self):
+		self.assert_items_equal('attendance')
+
+	def test_timetable(self):
+		(parsed,), (decoded,) = self.round_trip('timetable')
+		self.assertEqual(typed(parsed.timetable), typed(decoded.timetable))
+		self.assertEqual(parsed.grid, decoded.grid)
+
+
+if __name__ == '__main__':
+	unittest.main()